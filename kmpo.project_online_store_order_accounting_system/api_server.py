@@ -0,0 +1,328 @@
+import argparse
+import asyncio
+import json
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qs, unquote
+
+from archive import OrderArchiver
+from database import Database, WriteQueue
+from inventory import StockLedger
+from services import (OrderService, ProductService, InvalidInputError, InsufficientStockError,
+                      OrderNotFoundError, ProductNotFoundError)
+
+# Local HTTP/JSON API over the order and product services, for clients other than the
+# desktop window (a second cashier, a web storefront):
+#
+#   GET    /products[?after_id=&limit=]      GET /products/<id>
+#   POST   /products                         {"name", "price", "quantity"}
+#   PUT    /products/<id>                    {"name", "price", "quantity"[, "previous_quantity"]}
+#   DELETE /products/<id>
+#   GET    /products/<id>/movements[?before_id=&limit=&at=]  stock ledger, newest first
+#   POST   /products/<id>/receipts           {"quantity"[, "note"]}
+#   GET    /orders[?after_id=&limit=&status=] GET /orders/<order_number> (archived ones too)
+#   POST   /orders                           {"items": [{"product_id", "quantity"}, ...]}
+#   PUT    /orders/<order_number>            {"status"[, "items": [...]]}
+#   DELETE /orders/<order_number>
+#   GET    /stats                            group commit metrics
+#   GET    /diagnostics                      query profile (with --query-profile)
+#
+# A one-product order can also be sent as {"product_id", "quantity"} instead of "items".
+# An order edit without either only changes the status and keeps the lines and their prices.
+#
+# Reads run on a thread pool over the reader connections. Every write goes through a
+# WriteQueue: the requests that queued up while the previous batch was committing are
+# executed in a single transaction, each in its own savepoint, so one commit (and one
+# fsync) is shared by the whole batch while a failing request only rolls back itself.
+
+MAX_BODY = 1024 * 1024
+MAX_PAGE = 1000
+
+ERROR_STATUSES = (
+    (ProductNotFoundError, HTTPStatus.NOT_FOUND),
+    (OrderNotFoundError, HTTPStatus.NOT_FOUND),
+    (InsufficientStockError, HTTPStatus.CONFLICT),
+    (InvalidInputError, HTTPStatus.BAD_REQUEST),
+    (sqlite3.IntegrityError, HTTPStatus.CONFLICT),
+)
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ApiServer:
+    def __init__(self, db, max_batch=256, window_ms=0.0, readers=4):
+        self.db = db
+        self.orders = OrderService(db)
+        self.products = ProductService(db)
+        self.ledger = StockLedger(db)
+        self.read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="api-read")
+        self.writes = WriteQueue(db, window_ms=window_ms, max_batch=max_batch)
+        self.routes = [
+            ("GET", re.compile(r"/products"), self.list_products),
+            ("POST", re.compile(r"/products"), self.add_product),
+            ("GET", re.compile(r"/products/(\d+)"), self.get_product),
+            ("PUT", re.compile(r"/products/(\d+)"), self.update_product),
+            ("DELETE", re.compile(r"/products/(\d+)"), self.delete_product),
+            ("GET", re.compile(r"/products/(\d+)/movements"), self.list_movements),
+            ("POST", re.compile(r"/products/(\d+)/receipts"), self.receive_stock),
+            ("GET", re.compile(r"/orders"), self.list_orders),
+            ("POST", re.compile(r"/orders"), self.place_order),
+            ("GET", re.compile(r"/orders/([^/]+)"), self.get_order),
+            ("PUT", re.compile(r"/orders/([^/]+)"), self.edit_order),
+            ("DELETE", re.compile(r"/orders/([^/]+)"), self.delete_order),
+            ("GET", re.compile(r"/stats"), self.get_stats),
+            ("GET", re.compile(r"/diagnostics"), self.get_diagnostics),
+        ]
+
+    # --- reads and writes -------------------------------------------------
+
+    async def read(self, function, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.read_pool, function, *args)
+
+    async def write(self, function, *args):
+        return await asyncio.wrap_future(self.writes.submit(function, *args))
+
+    # --- handlers ---------------------------------------------------------
+
+    async def list_products(self, query, body):
+        after_id, limit = page_params(query)
+        return [product._asdict() for product in await self.read(self.products.list_products, after_id, limit)]
+
+    async def get_product(self, query, body, product_id):
+        return (await self.read(self.products.get_product, int(product_id)))._asdict()
+
+    async def add_product(self, query, body):
+        name, price, quantity = fields(body, ("name", str), ("price", (int, float)), ("quantity", int))
+        return HTTPStatus.CREATED, (await self.write(self.products.add_product, name, price, quantity))._asdict()
+
+    async def update_product(self, query, body, product_id):
+        name, price, quantity = fields(body, ("name", str), ("price", (int, float)), ("quantity", int))
+        # With the quantity the client read earlier only its change is applied
+        previous, = fields(body, ("previous_quantity", (int, type(None))))
+        return (await self.write(self.products.update_product, int(product_id), name, price, quantity, previous))._asdict()
+
+    async def delete_product(self, query, body, product_id):
+        await self.write(self.products.delete_product, int(product_id))
+        return {"deleted": int(product_id)}
+
+    async def list_movements(self, query, body, product_id):
+        try:
+            before_id = int(query["before_id"][0]) if "before_id" in query else None
+            limit = max(1, min(int(query.get("limit", ["100"])[0]), MAX_PAGE))
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "before_id and limit must be integers")
+        product_id = int(product_id)
+        at = query.get("at", [None])[0]
+        if at is None:
+            balance = await self.read(self.ledger.balance, product_id)
+        else:
+            balance = await self.read(self.ledger.balance_at, product_id, at)
+        movements = await self.read(self.ledger.movements, product_id, before_id, limit)
+        return {"product_id": product_id, "balance": balance, "at": at,
+                "movements": [movement._asdict() for movement in movements]}
+
+    async def receive_stock(self, query, body, product_id):
+        quantity, note = fields(body, ("quantity", int), ("note", (str, type(None))))
+        return HTTPStatus.CREATED, (await self.write(self.products.receive_stock, int(product_id), quantity, note))._asdict()
+
+    async def list_orders(self, query, body):
+        after_id, limit = page_params(query)
+        status = query.get("status", [None])[0]
+        return [order_dict(order) for order in await self.read(self.orders.list_orders, after_id, limit, status)]
+
+    async def get_order(self, query, body, order_number):
+        return order_dict(await self.read(self.orders.get_order, order_number, True))
+
+    async def place_order(self, query, body):
+        return HTTPStatus.CREATED, order_dict(await self.write(self.orders.place_cart, order_items(body)))
+
+    async def edit_order(self, query, body, order_number):
+        items = order_items(body) if isinstance(body, dict) and ("items" in body or "product_id" in body) else None
+        status, = fields(body, ("status", str))
+        await self.write(self.orders.edit_order, order_number, items, status)
+        return order_dict(await self.read(self.orders.get_order, order_number))
+
+    async def delete_order(self, query, body, order_number):
+        await self.write(self.orders.delete_order, order_number)
+        return {"deleted": order_number}
+
+    async def get_stats(self, query, body):
+        return self.writes.stats()
+
+    async def get_diagnostics(self, query, body):
+        if self.db.profiler is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, "Query profiling is off (start the server with --query-profile)")
+        return self.db.profiler.snapshot()
+
+    # --- HTTP -------------------------------------------------------------
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path = unquote(url.path).rstrip("/") or "/"
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if match is None:
+                continue
+            allowed = True
+            if route_method == method:
+                break
+        else:
+            if allowed:
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED, f"{method} is not supported for {path}")
+            raise HttpError(HTTPStatus.NOT_FOUND, f"No such resource: {path}")
+
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise HttpError(HTTPStatus.BAD_REQUEST, "The request body is not valid JSON")
+        try:
+            result = await handler(parse_qs(url.query), body, *match.groups())
+        except HttpError:
+            raise
+        except Exception as error:
+            for error_type, status in ERROR_STATUSES:
+                if isinstance(error, error_type):
+                    raise HttpError(status, str(error))
+            raise
+        if isinstance(result, tuple):
+            return result
+        return HTTPStatus.OK, result
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Malformed request line"}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = (headers.get("connection", "").lower() != "close"
+                              and (version == "HTTP/1.1" or headers.get("connection", "").lower() == "keep-alive"))
+
+                # Digits only: int() would also take a sign, spaces and underscores
+                length = headers.get("content-length", "0") or "0"
+                if not re.fullmatch(r"[0-9]+", length):
+                    await self.respond(writer, HTTPStatus.BAD_REQUEST, {"error": "Invalid Content-Length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self.respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                try:
+                    status, payload = await self.dispatch(method.upper(), target, body)
+                except HttpError as error:
+                    status, payload = error.status, {"error": str(error)}
+                except Exception as error:
+                    status, payload = HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(error)}
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+        await writer.drain()
+
+    async def serve(self, host="127.0.0.1", port=8080, ready=None):
+        server = await asyncio.start_server(self.handle_connection, host, port)
+        if ready is not None:
+            ready(server)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.writes.close()
+            self.read_pool.shutdown(wait=True)
+
+
+def page_params(query):
+    try:
+        after_id = int(query.get("after_id", ["0"])[0])
+        limit = int(query.get("limit", ["100"])[0])
+    except ValueError:
+        raise HttpError(HTTPStatus.BAD_REQUEST, "after_id and limit must be integers")
+    return after_id, max(1, min(limit, MAX_PAGE))
+
+
+def fields(body, *specs):
+    if not isinstance(body, dict):
+        raise HttpError(HTTPStatus.BAD_REQUEST, "Expected a JSON object")
+    values = []
+    for name, types in specs:
+        value = body.get(name)
+        if not isinstance(value, types) or isinstance(value, bool):
+            raise HttpError(HTTPStatus.BAD_REQUEST, f"Field '{name}' is missing or has a wrong type")
+        values.append(value)
+    return values
+
+
+def order_items(body):
+    if isinstance(body, dict) and "items" not in body:
+        return [fields(body, ("product_id", int), ("quantity", int))]
+    items = fields(body, ("items", list))[0]
+    return [fields(item, ("product_id", int), ("quantity", int)) for item in items]
+
+
+def order_dict(order):
+    result = order._asdict()
+    result["items"] = [item._asdict() for item in order.items]
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for orders and products")
+    parser.add_argument("--db", default="store.db", help="database file (default: store.db)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--profile", default="default", help="Database connection profile")
+    parser.add_argument("--max-batch", type=int, default=256, help="most writes committed together")
+    parser.add_argument("--window-ms", type=float, default=0.0, help="extra wait for more writes per batch")
+    parser.add_argument("--query-profile", action="store_true", help="profile statements, see GET /diagnostics")
+    parser.add_argument("--archive-days", type=int, metavar="DAYS",
+                        help="move finished orders older than DAYS to the archive files in the background")
+    args = parser.parse_args(argv)
+
+    db = Database(args.db, profile=args.profile)
+    if args.query_profile:
+        db.enable_profiling()
+    if args.archive_days is not None:
+        OrderArchiver(db, days=args.archive_days).start()
+    server = ApiServer(db, max_batch=args.max_batch, window_ms=args.window_ms)
+    print(f"Serving on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
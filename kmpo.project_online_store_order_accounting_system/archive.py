@@ -0,0 +1,298 @@
+import glob
+import os
+import re
+import sqlite3
+import threading
+from urllib.parse import quote
+
+from migrations import product_sales_sql, raise_id_sequence
+
+# Archival of finished orders. Completed and Cancelled orders older than a number of
+# days are moved, a batch at a time, from the hot orders/order_items tables into one
+# SQLite file per period (orders_2024.db, or orders_2024_01.db with period="month").
+# The archive files are attached to every connection of the Database and the temporary
+# views orders_history and order_items_history put the hot tables and all archives
+# together, so old orders stay queryable while the grid, its indexes and every write
+# only deal with the recent ones.
+#
+# product_sales and daily_sales keep counting archived orders: before a batch is deleted
+# its sales are added back, so the delete triggers leave the reports unchanged.
+#
+# A batch is first committed to the archive file and only then deleted from the hot
+# tables. After a crash in between, the orders exist in both places until the next run
+# finds them already archived, skips the copy and deletes them. An archived row is never
+# overwritten: an id that is taken by a different order stops the batch.
+#
+# Every archive file stays attached, so there can be at most MAX_ATTACHED periods; with
+# period="month" that is nine months. Archiving into one more period fails with
+# ArchiveError instead of hiding the oldest files from the history views.
+
+ARCHIVED_STATUSES = ("Completed", "Cancelled")
+
+PERIOD_FORMATS = {"year": "%Y", "month": "%Y_%m"}
+
+# SQLite attaches at most 10 databases to a connection; one slot is left free
+MAX_ATTACHED = 9
+
+class ArchiveError(Exception):
+    pass
+
+
+ARCHIVE_NAME = re.compile(r"orders_(\d{4}(?:_\d{2})?|undated)\.db$")
+
+ORDER_COLUMNS = "id, order_number, quantity, price, status, created_at"
+ITEM_COLUMNS = "id, order_id, product_id, quantity, unit_price, price"
+
+# PRAGMA user_version of an archive file whose schema is complete
+ARCHIVE_VERSION = 1
+
+ARCHIVE_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY,
+        order_number TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        price REAL NOT NULL,
+        status TEXT,
+        created_at TEXT NOT NULL,
+        archived_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS order_items (
+        id INTEGER PRIMARY KEY,
+        order_id INTEGER NOT NULL,
+        product_id INTEGER,
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        price REAL NOT NULL
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_orders_order_number ON orders(order_number)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_order_items_order_id ON order_items(order_id)",
+    "CREATE INDEX IF NOT EXISTS idx_order_items_product_id ON order_items(product_id)",
+)
+
+
+def default_directory(db_name):
+    # store.db -> store_archive/
+    return os.path.splitext(os.path.abspath(db_name))[0] + "_archive"
+
+
+class OrderArchiver:
+    def __init__(self, db, days=90, directory=None, period="year", batch_size=500):
+        if period not in PERIOD_FORMATS:
+            raise ValueError(f"Unknown archive period: {period}.")
+        if directory is None:
+            if not db.connections.shared:
+                raise ValueError("An in-memory database needs an explicit archive directory.")
+            directory = default_directory(db.connections.db_name)
+        self.db = db
+        self.days = days
+        self.directory = directory
+        self.period = period
+        self.batch_size = batch_size
+        os.makedirs(directory, exist_ok=True)
+        matches = (ARCHIVE_NAME.search(path) for path in glob.glob(os.path.join(directory, "orders_*.db")))
+        self.periods = sorted(match.group(1) for match in matches if match)
+        if len(self.periods) > MAX_ATTACHED:
+            raise ArchiveError(f"{directory} holds {len(self.periods)} archive files; at most {MAX_ATTACHED} can be attached.")
+        # Connections to the archive files, used only by the archiving batches
+        self.archives = {}
+        for period_name in self.periods:
+            self.archive(period_name)
+        self.reserve_archived_ids()
+        self.archived = 0
+        self.last_error = None
+        self.stopping = threading.Event()
+        self.thread = None
+        db.archiver = self
+        db.connections.add_setup(self.setup_connection)
+
+    def path(self, period):
+        return os.path.join(self.directory, f"orders_{period}.db")
+
+    def archive(self, period):
+        conn = self.archives.get(period)
+        if conn is None:
+            conn = sqlite3.connect(self.path(period), check_same_thread=False)
+            # The copy must be on disk before the orders are deleted from the main file
+            conn.execute("PRAGMA synchronous = full")
+            # Existing files are opened on every start; their schema is only checked by version
+            if conn.execute("PRAGMA user_version").fetchone()[0] < ARCHIVE_VERSION:
+                conn.execute("PRAGMA journal_mode = wal")
+                with conn:
+                    for statement in ARCHIVE_SCHEMA:
+                        conn.execute(statement)
+                    conn.execute(f"PRAGMA user_version = {ARCHIVE_VERSION}")
+            self.archives[period] = conn
+        return conn
+
+    def reserve_archived_ids(self):
+        # Archived orders keep their ids, so the hot tables never give them out again, even
+        # when the archive holds larger ids than the main file remembers (a restored backup)
+        used = {"orders": 0, "order_items": 0}
+        for conn in self.archives.values():
+            for table in used:
+                used[table] = max(used[table], conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0])
+        if any(used.values()):
+            with self.db.transaction() as conn:
+                for table, value in used.items():
+                    raise_id_sequence(conn, table, value)
+
+    def setup_connection(self, conn, read_only):
+        # Attaches the archive files and (re)creates the history views on one connection
+        wanted = {f"archive_{period}": period for period in self.periods}
+        attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+        for schema in attached:
+            if schema.startswith("archive_") and schema not in wanted:
+                conn.execute(f"DETACH {schema}")
+        # Read-only even on the writer: BEGIN IMMEDIATE would otherwise lock every attached file
+        # and the archiving batches write them through their own connections
+        for schema, period in wanted.items():
+            if schema not in attached:
+                conn.execute(f"ATTACH ? AS {schema}", (f"file:{quote(self.path(period))}?mode=ro",))
+
+        orders = [f"SELECT {ORDER_COLUMNS}, NULL AS archived_at FROM main.orders"]
+        items = [f"SELECT {ITEM_COLUMNS} FROM main.order_items"]
+        for schema in wanted:
+            orders.append(f"SELECT {ORDER_COLUMNS}, archived_at FROM {schema}.orders")
+            items.append(f"SELECT {ITEM_COLUMNS} FROM {schema}.order_items")
+        # Readers run with query_only, which also forbids creating temporary views
+        if read_only:
+            conn.execute("PRAGMA query_only = OFF")
+        try:
+            conn.execute("DROP VIEW IF EXISTS temp.orders_history")
+            conn.execute("DROP VIEW IF EXISTS temp.order_items_history")
+            conn.execute("CREATE TEMP VIEW orders_history AS " + " UNION ALL ".join(orders))
+            conn.execute("CREATE TEMP VIEW order_items_history AS " + " UNION ALL ".join(items))
+        finally:
+            if read_only:
+                conn.execute("PRAGMA query_only = ON")
+
+    def archive_batch(self):
+        # Moves up to batch_size orders; returns how many were moved
+        period_format = PERIOD_FORMATS[self.period]
+        statuses = ", ".join("?" * len(ARCHIVED_STATUSES))
+        with self.db.transaction() as conn:
+            # Oldest first, along idx_orders_created_at; "+status" keeps the planner from
+            # reading every finished order through idx_orders_status and sorting them
+            candidates = conn.execute(f"""
+                SELECT id, strftime(?, created_at) FROM orders
+                WHERE created_at < datetime('now', ?) AND +status IN ({statuses})
+                ORDER BY created_at LIMIT ?
+            """, (period_format, f"-{self.days} days", *ARCHIVED_STATUSES, self.batch_size)).fetchall()
+            if not candidates:
+                return 0
+            ids = [row[0] for row in candidates]
+            placeholders = ", ".join("?" * len(ids))
+            orders = {row[0]: row for row in conn.execute(f"SELECT {ORDER_COLUMNS} FROM orders WHERE id IN ({placeholders})", ids)}
+            items = {}
+            for row in conn.execute(f"SELECT {ITEM_COLUMNS} FROM order_items WHERE order_id IN ({placeholders})", ids):
+                items.setdefault(row[1], []).append(row)
+
+            by_period = {}
+            for order_id, period in candidates:
+                by_period.setdefault(period or "undated", []).append(order_id)
+            new_periods = by_period.keys() - set(self.periods)
+            if len(self.periods) + len(new_periods) > MAX_ATTACHED:
+                raise ArchiveError(f"Archiving into {', '.join(sorted(new_periods))} would need more than "
+                                   f"{MAX_ATTACHED} archive files, which cannot all be attached.")
+            added = False
+            for period, order_ids in by_period.items():
+                archive = self.archive(period)
+                with archive:
+                    order_ids = self.unarchived(archive, period, [orders[order_id] for order_id in order_ids])
+                    archive.executemany(f"INSERT INTO orders ({ORDER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                                        [orders[order_id] for order_id in order_ids])
+                    archive.executemany(f"INSERT INTO order_items ({ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                                        [item for order_id in order_ids for item in items.get(order_id, ())])
+                if period not in self.periods:
+                    self.periods = sorted(self.periods + [period])
+                    added = True
+
+            # Add the sales back first; the delete triggers then subtract them again
+            conn.execute(f"""
+                INSERT INTO daily_sales (day, status, orders, quantity, revenue)
+                SELECT COALESCE(date(created_at), ''), COALESCE(status, ''), COUNT(*), TOTAL(quantity), TOTAL(price)
+                FROM orders WHERE id IN ({placeholders}) GROUP BY 1, 2
+                ON CONFLICT (day, status) DO UPDATE SET
+                    orders = orders + excluded.orders,
+                    quantity = quantity + excluded.quantity,
+                    revenue = revenue + excluded.revenue
+            """, ids)
+            conn.execute(product_sales_sql(f"""
+                SELECT order_items.product_id AS product_id, orders.status AS status,
+                       order_items.quantity AS quantity, order_items.price AS price
+                FROM order_items JOIN orders ON orders.id = order_items.order_id
+                WHERE order_items.order_id IN ({placeholders})""", ""), ids)
+            # orders_sales_delete also deletes the lines
+            conn.execute(f"DELETE FROM orders WHERE id IN ({placeholders})", ids)
+        if added:
+            # Connections attach the new file the next time they are used
+            self.db.connections.refresh_setup()
+        self.archived += len(ids)
+        return len(ids)
+
+    def unarchived(self, archive, period, rows):
+        # Ids of the orders not in the file yet. One that is already there with the same number
+        # was copied with its lines before a crash; any other order under that id is an error.
+        placeholders = ", ".join("?" * len(rows))
+        archived = dict(archive.execute(f"SELECT id, order_number FROM orders WHERE id IN ({placeholders})",
+                                        [row[0] for row in rows]))
+        for row in rows:
+            if row[0] in archived and archived[row[0]] != row[1]:
+                raise ArchiveError(f"Order id {row[0]} of {row[1]} is already taken by {archived[row[0]]} "
+                                   f"in {self.path(period)}.")
+        return [row[0] for row in rows if row[0] not in archived]
+
+    def archive_all(self, progress=None):
+        moved = 0
+        while not self.stopping.is_set():
+            count = self.archive_batch()
+            if not count:
+                break
+            moved += count
+            if progress is not None:
+                progress.written += count
+                progress.update(count)
+        if progress is not None:
+            progress.update(0, force=True)
+        return moved
+
+    def start(self, interval=600.0, pause=0.05):
+        # Background archiving: batches follow each other with a short pause, so that
+        # interactive writes get the write lock in between, then the thread sleeps
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, args=(interval, pause), name="archiver", daemon=True)
+            self.thread.start()
+
+    def run(self, interval, pause):
+        while not self.stopping.is_set():
+            try:
+                moved = self.archive_batch()
+                self.last_error = None
+            except (sqlite3.Error, ArchiveError) as error:
+                moved = 0
+                self.last_error = error
+            self.stopping.wait(pause if moved else interval)
+
+    def stats(self):
+        return {
+            "directory": self.directory,
+            "periods": list(self.periods),
+            "archived": self.archived,
+            "last_error": None if self.last_error is None else str(self.last_error),
+        }
+
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        # A batch started from another thread finishes before the files are closed
+        with self.db.locked():
+            for conn in self.archives.values():
+                conn.close()
+            self.archives = {}
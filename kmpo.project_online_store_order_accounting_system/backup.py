@@ -0,0 +1,324 @@
+import glob
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import quote
+
+from archive import default_directory as default_archive_directory
+
+# Online backups of the database file (and the order archive files next to it) with the
+# sqlite3 backup API, while the application keeps writing.
+#
+# In WAL mode the source connection opens a read transaction first and the backup runs
+# inside it: every step copies pages of the same snapshot, so commits made meanwhile
+# neither restart the copy nor wait for it. Only checkpoints cannot move past the
+# snapshot until the backup ends, so the -wal file grows for that time. With a rollback
+# journal ("legacy" profile) a held read lock would block every commit, so the copy is
+# stepped a few pages at a time without it and restarts when the file changes.
+#
+# Each snapshot is a directory <db name>-YYYYmmdd-HHMMSS/ holding the gzip-compressed
+# copies and a manifest.json with their checksums. A copy is checked with
+# PRAGMA integrity_check before it is compressed. The directory appears under its final
+# name only when it is complete, and all but the newest `keep` snapshots are deleted.
+# BackupManager.restore() writes a snapshot back through the backup API; the application
+# should not be running, since its caches would not notice.
+
+Snapshot = namedtuple("Snapshot", ["name", "path", "created", "size"])
+
+MANIFEST = "manifest.json"
+PARTIAL = ".partial"
+TIME_FORMAT = "%Y%m%d-%H%M%S"
+CHUNK = 1024 * 1024
+
+
+class BackupError(Exception):
+    pass
+
+
+class BackupCancelled(BackupError):
+    pass
+
+
+def default_directory(db_name):
+    # store.db -> store_backups/
+    return os.path.splitext(os.path.abspath(db_name))[0] + "_backups"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHUNK), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def check_integrity(path, quick=False):
+    conn = sqlite3.connect(f"file:{quote(path)}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA quick_check" if quick else "PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    if rows != [("ok",)]:
+        raise BackupError(f"{os.path.basename(path)} failed the integrity check: "
+                          + "; ".join(row[0] for row in rows[:5]))
+
+
+def copy_database(source_path, target_path, pages, pause, progress=None):
+    # Returns (pages copied, restarts)
+    source = sqlite3.connect(f"file:{quote(source_path)}?mode=ro", uri=True, isolation_level=None)
+    target = sqlite3.connect(target_path)
+    state = {"remaining": None, "restarts": 0}
+
+    def step(status, remaining, total):
+        if state["remaining"] is not None and remaining > state["remaining"]:
+            state["restarts"] += 1
+        state["remaining"] = remaining
+        if progress is not None:
+            progress(total - remaining, total)
+
+    try:
+        snapshot = source.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        if snapshot:
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        source.backup(target, pages=pages, progress=step, sleep=pause)
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        if snapshot:
+            source.execute("ROLLBACK")
+    finally:
+        target.close()
+        source.close()
+    return page_count, state["restarts"]
+
+
+def compress(source_path, target_path, level):
+    with open(source_path, "rb") as source, gzip.open(target_path, "wb", compresslevel=level) as target:
+        shutil.copyfileobj(source, target, CHUNK)
+    fsync_path(target_path)
+
+
+def decompress(source_path, target_path):
+    with gzip.open(source_path, "rb") as source, open(target_path, "wb") as target:
+        shutil.copyfileobj(source, target, CHUNK)
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST), encoding="utf-8") as file:
+        return json.load(file)
+
+
+class BackupManager:
+    def __init__(self, db_name, directory=None, archive_directory=None, keep=7, pages=1024, pause=0.05,
+                 compresslevel=3, quick_check=False):
+        self.db_name = os.path.abspath(db_name)
+        self.directory = directory or default_directory(db_name)
+        self.archive_directory = archive_directory or default_archive_directory(db_name)
+        self.keep = keep
+        self.pages = pages
+        self.pause = pause
+        self.compresslevel = compresslevel
+        self.quick_check = quick_check
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.thread = None
+        self.last_error = None
+        self.last_result = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def sources(self):
+        # (file name in the snapshot, live path) of the database and its archive files
+        files = [(os.path.basename(self.db_name), self.db_name)]
+        for path in sorted(glob.glob(os.path.join(self.archive_directory, "orders_*.db"))):
+            files.append(("archive/" + os.path.basename(path), path))
+        return files
+
+    def snapshots(self):
+        result = []
+        for path in glob.glob(os.path.join(self.directory, "*")):
+            if path.endswith(PARTIAL) or not os.path.isfile(os.path.join(path, MANIFEST)):
+                continue
+            manifest = read_manifest(path)
+            result.append(Snapshot(os.path.basename(path), path, manifest["created"],
+                                   sum(entry["compressed_size"] for entry in manifest["files"])))
+        return sorted(result, key=lambda snapshot: (snapshot.created, snapshot.name))
+
+    def find(self, name=None, before=None):
+        # By name, the newest one created at or before a "YYYY-mm-dd HH:MM:SS" time, or the newest
+        snapshots = self.snapshots()
+        if name is not None:
+            snapshots = [snapshot for snapshot in snapshots if snapshot.name == name]
+        if before is not None:
+            snapshots = [snapshot for snapshot in snapshots if snapshot.created <= before]
+        if not snapshots:
+            raise BackupError("No matching snapshot.")
+        return snapshots[-1]
+
+    def create(self, progress=None, prune=True):
+        # progress(file name, pages copied, total pages) is called after every backup step
+        with self.lock:
+            start = time.perf_counter()
+            created = time.strftime("%Y-%m-%d %H:%M:%S")
+            stem = os.path.splitext(os.path.basename(self.db_name))[0]
+            name = f"{stem}-{time.strftime(TIME_FORMAT)}"
+            if os.path.exists(os.path.join(self.directory, name)):
+                name += f"-{int(time.time() * 1000) % 1000:03d}"
+            path = os.path.join(self.directory, name)
+            partial = path + PARTIAL
+            os.makedirs(os.path.join(partial, "archive"), exist_ok=True)
+            try:
+                files = [self.back_up_file(label, source, partial, progress) for label, source in self.sources()]
+                manifest = {"created": created, "db_name": self.db_name, "files": files,
+                            "seconds": time.perf_counter() - start}
+                with open(os.path.join(partial, MANIFEST), "w", encoding="utf-8") as file:
+                    json.dump(manifest, file, indent=2)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.rename(partial, path)
+            except BaseException:
+                shutil.rmtree(partial, ignore_errors=True)
+                raise
+            if prune:
+                self.prune()
+            return self.find(name)
+
+    def back_up_file(self, label, source, partial, progress):
+        copy = os.path.join(partial, label)
+
+        def step(done, total):
+            if self.stopping.is_set():
+                raise BackupCancelled("Backup cancelled.")
+            if progress is not None:
+                progress(label, done, total)
+
+        copy_start = time.perf_counter()
+        pages, restarts = copy_database(source, copy, self.pages, self.pause, step)
+        check_start = time.perf_counter()
+        check_integrity(copy, self.quick_check)
+        compress_start = time.perf_counter()
+        size = os.path.getsize(copy)
+        compress(copy, copy + ".gz", self.compresslevel)
+        os.remove(copy)
+        return {"name": label, "file": label + ".gz", "pages": pages, "size": size,
+                "compressed_size": os.path.getsize(copy + ".gz"), "sha256": file_sha256(copy + ".gz"),
+                "restarts": restarts, "copy_seconds": check_start - copy_start,
+                "check_seconds": compress_start - check_start, "compress_seconds": time.perf_counter() - compress_start}
+
+    def prune(self):
+        for snapshot in self.snapshots()[:-self.keep] if self.keep else []:
+            shutil.rmtree(snapshot.path, ignore_errors=True)
+        # Left over by a backup that was interrupted
+        for path in glob.glob(os.path.join(self.directory, "*" + PARTIAL)):
+            shutil.rmtree(path, ignore_errors=True)
+
+    def verify(self, name=None):
+        # Checksums of the compressed files and the integrity check of every copy
+        snapshot = self.find(name)
+        manifest = read_manifest(snapshot.path)
+        scratch = snapshot.path + ".verify"
+        os.makedirs(scratch, exist_ok=True)
+        try:
+            for entry in manifest["files"]:
+                compressed = os.path.join(snapshot.path, entry["file"])
+                if file_sha256(compressed) != entry["sha256"]:
+                    raise BackupError(f"{entry['file']} does not match its checksum.")
+                copy = os.path.join(scratch, os.path.basename(entry["name"]))
+                try:
+                    decompress(compressed, copy)
+                    check_integrity(copy, self.quick_check)
+                except (OSError, EOFError, sqlite3.DatabaseError) as error:
+                    # A damaged gzip stream or a copy SQLite cannot open at all
+                    raise BackupError(f"{entry['file']} cannot be read: {error}") from error
+                os.remove(copy)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return snapshot
+
+    def restore(self, name=None, before=None, progress=None):
+        # The current files are saved as a snapshot first (not pruned, so the one being
+        # restored stays), and a restore can be undone by restoring that one
+        snapshot = self.verify(self.find(name, before).name)
+        self.create(prune=False)
+        manifest = read_manifest(snapshot.path)
+        scratch = snapshot.path + ".restore"
+        os.makedirs(scratch, exist_ok=True)
+        restored = set()
+        try:
+            for entry in manifest["files"]:
+                label = entry["name"]
+                copy = os.path.join(scratch, os.path.basename(label))
+                decompress(os.path.join(snapshot.path, entry["file"]), copy)
+                if label.startswith("archive/"):
+                    os.makedirs(self.archive_directory, exist_ok=True)
+                    target = os.path.join(self.archive_directory, os.path.basename(label))
+                else:
+                    target = self.db_name
+                restore_file(copy, target, label, progress)
+                restored.add(os.path.abspath(target))
+                os.remove(copy)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        # Archive files created after the snapshot hold orders that are back in the main file
+        for path in glob.glob(os.path.join(self.archive_directory, "orders_*.db")):
+            if os.path.abspath(path) not in restored:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+        return snapshot
+
+    def start(self, interval=24 * 3600.0):
+        # Takes a snapshot whenever the newest one is older than interval seconds
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, args=(interval,), name="backup", daemon=True)
+            self.thread.start()
+
+    def run(self, interval):
+        while not self.stopping.is_set():
+            snapshots = self.snapshots()
+            last = time.mktime(time.strptime(snapshots[-1].created, "%Y-%m-%d %H:%M:%S")) if snapshots else 0
+            wait = last + interval - time.time()
+            if wait <= 0:
+                try:
+                    self.last_result = self.create()
+                    self.last_error = None
+                except BackupCancelled:
+                    break
+                except (OSError, sqlite3.Error, BackupError) as error:
+                    self.last_error = error
+                wait = interval
+            self.stopping.wait(min(wait, interval))
+
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+
+def restore_file(source_path, target_path, label, progress=None):
+    # Through the backup API, so the target's WAL and locks are handled by SQLite
+    source = sqlite3.connect(f"file:{quote(source_path)}?mode=ro", uri=True)
+    target = sqlite3.connect(target_path)
+
+    def step(status, remaining, total):
+        if progress is not None:
+            progress(label, total - remaining, total)
+
+    try:
+        source.backup(target, progress=step)
+    finally:
+        target.close()
+        source.close()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from archive import OrderArchiver
+from database import Database
+from services import OrderService
+
+# An order book spread over the last few years, before and after the finished orders
+# older than --days are moved to the archive files: archiving throughput, the size of
+# the hot table, typical grid/report queries over it, checkout latency and the cost of
+# looking an order up through the orders_history view.
+
+STATUSES = ("Pending", "Completed", "Shipped", "Cancelled")
+
+QUERIES = (
+    ("count all", "SELECT COUNT(*) FROM orders", ()),
+    ("pending page", "SELECT id FROM orders WHERE status = 'Pending' ORDER BY id LIMIT 100", ()),
+    ("price range", "SELECT COUNT(*) FROM orders WHERE price BETWEEN 100 AND 200", ()),
+    ("revenue scan", "SELECT TOTAL(price) FROM orders WHERE status <> 'Cancelled'", ()),
+)
+
+
+def seed(db, orders, products, years):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2), 10 ** 9) for i in range(products)))
+    now = time.time()
+    with db.batch() as batch:
+        # Older orders first, as they were placed
+        moments = sorted(now - random.uniform(0, years * 365 * 86400) for _ in range(orders))
+        batch.execute_many("INSERT INTO orders (id, order_number, status, created_at) VALUES (?, ?, ?, ?)",
+                           ((i, f"ORD-{i}", random.choice(STATUSES),
+                             time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(moment)))
+                            for i, moment in enumerate(moments, 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)",
+                           ((i, random.randint(1, products), 1, price, price)
+                            for i, price in ((i, round(random.uniform(1, 500), 2)) for i in range(1, orders + 1))))
+    db.execute_many("UPDATE sequences SET value = ? WHERE name = 'order_number'", [(orders,)])
+
+
+def timed(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure(db, service, products, repeat, carts):
+    results = {name: timed(lambda: db.fetch_all(sql, params), repeat) for name, sql, params in QUERIES}
+    start = time.perf_counter()
+    for _ in range(carts):
+        service.place_cart([(random.randint(1, products), 1), (random.randint(1, products), 2)])
+    results["place_cart"] = (time.perf_counter() - start) / carts * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Hot orders table before and after archiving")
+    parser.add_argument("--orders", type=int, default=300_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--years", type=float, default=3.0, help="orders are spread over this many years")
+    parser.add_argument("--days", type=int, default=90, help="archive finished orders older than this")
+    parser.add_argument("--period", choices=("year", "month"), default="year",
+                        help="month allows at most nine months of archived orders (see archive.MAX_ATTACHED)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--carts", type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db = Database(os.path.join(directory, "bench.db"))
+    start = time.perf_counter()
+    seed(db, args.orders, args.products, args.years)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+    service = OrderService(db)
+
+    before = measure(db, service, args.products, args.repeat, args.carts)
+    hot_before = db.fetch_one("SELECT COUNT(*) FROM orders")[0]
+
+    archiver = OrderArchiver(db, args.days, period=args.period, batch_size=args.batch_size)
+    start = time.perf_counter()
+    moved = archiver.archive_all()
+    elapsed = time.perf_counter() - start
+    print(f"archived {moved} orders into {len(archiver.periods)} files in {elapsed:.1f}s "
+          f"({moved / elapsed if elapsed else 0:.0f} orders/s, {args.batch_size} per batch)")
+
+    after = measure(db, service, args.products, args.repeat, args.carts)
+    hot_after = db.fetch_one("SELECT COUNT(*) FROM orders")[0]
+    print(f"hot orders: {hot_before} -> {hot_after}")
+    print(f"{'query':<16}{'before, ms':>12}{'after, ms':>12}")
+    for name in before:
+        print(f"{name:<16}{before[name]:>12.2f}{after[name]:>12.2f}")
+
+    archived_number = db.fetch_one("SELECT order_number FROM orders_history WHERE archived_at IS NOT NULL LIMIT 1")
+    if archived_number:
+        lookup = timed(lambda: service.get_order(archived_number[0], archived=True), args.repeat)
+        print(f"{'history lookup':<16}{'':>12}{lookup:>12.2f}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+
+# Write throughput of one commit per row (Database.query) against one commit
+# per batch (Database.execute_many and Database.batch) on a file-backed database.
+
+INSERT_PRODUCT = "INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)"
+INSERT_ORDER = "INSERT INTO orders (id, order_number, status) VALUES (?, ?, ?)"
+INSERT_ITEM = "INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)"
+
+
+def fresh_db():
+    return Database(os.path.join(tempfile.mkdtemp(), "bench.db"))
+
+
+def per_row(db, rows):
+    for i in range(rows):
+        db.query(INSERT_PRODUCT, (f"Product {i}", 10.0, 100))
+
+
+def execute_many(db, rows):
+    db.execute_many(INSERT_PRODUCT, ((f"Product {i}", 10.0, 100) for i in range(rows)))
+
+
+def mixed_batch(db, rows):
+    # Catalog load followed by an order backfill in the same transaction
+    with db.batch() as batch:
+        batch.execute_many(INSERT_PRODUCT, ((f"Product {i}", 10.0, 100) for i in range(rows // 2)))
+        batch.execute_many(INSERT_ORDER, ((i, f"BF-{i}", "Completed") for i in range(1, rows // 4 + 1)))
+        batch.execute_many(INSERT_ITEM, ((i, i % (rows // 2) + 1, 1, 10.0, 10.0) for i in range(1, rows // 4 + 1)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rows/sec for per-row commits vs. batched commits")
+    parser.add_argument("--per-row", type=int, default=2_000, help="rows written with a commit each")
+    parser.add_argument("--batched", type=int, default=200_000, help="rows written per batched run")
+    args = parser.parse_args()
+
+    for name, function, rows in (("query per row", per_row, args.per_row),
+                                 ("execute_many", execute_many, args.batched),
+                                 ("batch (mixed)", mixed_batch, args.batched)):
+        db = fresh_db()
+        start = time.perf_counter()
+        function(db, rows)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16}{rows:>10} rows {elapsed:>8.2f}s {rows / elapsed:>12.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
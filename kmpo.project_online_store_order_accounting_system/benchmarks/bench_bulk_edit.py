@@ -0,0 +1,51 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from services import ProductEdit, ProductService
+
+# Saving a bulk edit of the catalog: every product gets a new price and a stock change,
+# written by ProductService.apply_edits in one transaction, against calling update_product
+# once per product (one transaction and one commit each, as the edit dialog does).
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk product edits in one transaction against one per product")
+    parser.add_argument("--products", type=int, default=50_000)
+    parser.add_argument("--single", type=int, default=2000, help="products updated one by one (then extrapolated)")
+    parser.add_argument("--profile", default="durable", help="Database durability profile")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db = Database(os.path.join(directory, "bench.db"), profile=args.profile)
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2), 1000) for i in range(args.products)))
+    service = ProductService(db)
+
+    edits = [ProductEdit(product_id, None, round(random.uniform(1, 500), 2), random.randint(-5, 5))
+             for product_id in range(1, args.products + 1)]
+    start = time.perf_counter()
+    updated, _ = service.apply_edits(edits)
+    bulk = time.perf_counter() - start
+    print(f"apply_edits: {updated} products in {bulk:.2f}s ({updated / bulk:.0f}/s, one commit)")
+
+    start = time.perf_counter()
+    for product_id in range(1, args.single + 1):
+        service.update_product(product_id, f"Product {product_id}", 10.0, 990)
+    single = time.perf_counter() - start
+    print(f"update_product: {args.single} products in {single:.2f}s ({args.single / single:.0f}/s, a commit each); "
+          f"{args.products} would take {single / args.single * args.products:.0f}s")
+    db.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from services import OrderService
+
+# A cart of N products placed the old way (one order, one transaction and one commit
+# per product) against one multi-line order placed by OrderService.place_cart, where
+# the whole cart is checked, reserved and priced by a few set-based statements.
+
+
+def fresh_db(profile, products):
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile=profile)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2), 10 ** 9) for i in range(products)))
+    return db
+
+
+def measure(place, carts):
+    start = time.perf_counter()
+    for cart in carts:
+        place(cart)
+    return (time.perf_counter() - start) / len(carts) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cart checkout: one order per product vs. one multi-line order")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--carts", type=int, default=200, help="carts placed per size")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--profile", default="durable")
+    args = parser.parse_args()
+
+    random.seed(1)
+    print(f"{'lines':<8}{'per line, ms':>14}{'place_cart, ms':>16}{'speedup':>10}")
+    for size in args.sizes:
+        carts = [[(product_id, random.randint(1, 3)) for product_id in random.sample(range(1, args.products + 1), size)]
+                 for _ in range(args.carts)]
+
+        db = fresh_db(args.profile, args.products)
+        service = OrderService(db)
+        per_line = measure(lambda cart: [service.place_order(product_id, quantity) for product_id, quantity in cart], carts)
+        db.close()
+
+        db = fresh_db(args.profile, args.products)
+        service = OrderService(db)
+        per_cart = measure(service.place_cart, carts)
+        db.close()
+        print(f"{size:<8}{per_line:>14.2f}{per_cart:>16.2f}{per_line / per_cart:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from services import OrderService, InsufficientStockError
+
+# Report-style readers run aggregate queries while one writer places orders.
+# Compares the legacy rollback-journal settings with the WAL connection profiles.
+
+REPORT_SQL = "SELECT status, COUNT(*), SUM(price) FROM orders GROUP BY status"
+
+
+def seed(path, orders):
+    db = Database(path, profile="bulk")
+    db.query("INSERT INTO products (name, price, quantity) VALUES ('Product', 10.0, ?)", (10 ** 9,))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, ?)",
+                           ((i, f"SEED-{i}", ("Pending", "Completed", "Shipped")[i % 3]) for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, 1, 1, 10.0, 10.0)",
+                           ((i,) for i in range(1, orders + 1)))
+    db.close()
+
+
+def run(path, profile, readers, seconds):
+    db = Database(path, profile=profile, readers=readers)
+    service = OrderService(db)
+    stop = threading.Event()
+    counters = {"reads": 0, "writes": 0, "locked": 0}
+    write_latencies = []
+    lock = threading.Lock()
+
+    def read_loop():
+        while not stop.is_set():
+            try:
+                db.fetch_all(REPORT_SQL)
+                with lock:
+                    counters["reads"] += 1
+            except sqlite3.OperationalError:
+                with lock:
+                    counters["locked"] += 1
+
+    def write_loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                service.place_order(1, 1)
+            except sqlite3.OperationalError:
+                counters["locked"] += 1
+                continue
+            except InsufficientStockError:
+                break
+            write_latencies.append(time.perf_counter() - start)
+            counters["writes"] += 1
+
+    threads = [threading.Thread(target=read_loop) for _ in range(readers)] + [threading.Thread(target=write_loop)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    db.close()
+
+    write_latencies.sort()
+    p99 = write_latencies[int(len(write_latencies) * 0.99)] * 1000 if write_latencies else float("nan")
+    print(f"{profile:<10}{counters['reads'] / seconds:>12.0f}{counters['writes'] / seconds:>12.0f}"
+          f"{p99:>14.2f}{counters['locked']:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent readers and one writer per connection profile")
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'profile':<10}{'reads/s':>12}{'writes/s':>12}{'write p99, ms':>14}{'locked':>10}")
+    for profile in ("legacy", "default", "durable"):
+        path = os.path.join(tempfile.mkdtemp(), "bench.db")
+        seed(path, args.orders)
+        if profile == "legacy":
+            # journal_mode is stored in the file, switch it back before measuring
+            conn = sqlite3.connect(path)
+            conn.execute("PRAGMA journal_mode = delete")
+            conn.close()
+        run(path, profile, args.readers, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
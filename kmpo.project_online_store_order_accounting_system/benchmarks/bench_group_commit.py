@@ -0,0 +1,81 @@
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database, WriteQueue
+from services import OrderService
+
+# Sustained order placement from many concurrent callers: every call in its own
+# transaction (OrderService.place_order directly) against the same calls coalesced by
+# WriteQueue into one transaction per batch.
+
+
+def fresh_db(profile, products):
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile=profile)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, 10.0, ?)",
+                    ((f"Product {i}", 10 ** 9) for i in range(products)))
+    return db
+
+
+def run(db, producers, seconds, products, place):
+    latencies = []
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def producer(index):
+        own = []
+        product_id = index % products + 1
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            place(product_id)
+            own.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(own)
+
+    threads = [threading.Thread(target=producer, args=(i,)) for i in range(producers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return len(latencies) / seconds, latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orders/s with and without group commit")
+    parser.add_argument("--producers", type=int, default=64, help="concurrent callers")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--profile", default="durable")
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.0, 1.0, 2.0, 5.0], help="WriteQueue windows, ms")
+    parser.add_argument("--max-batch", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'mode':<18}{'orders/s':>10}{'p50, ms':>10}{'p99, ms':>10}{'avg batch':>11}{'commit p50':>12}")
+    db = fresh_db(args.profile, args.products)
+    service = OrderService(db)
+    rate, p50, p99 = run(db, args.producers, args.seconds, args.products, lambda product_id: service.place_order(product_id, 1))
+    print(f"{'direct':<18}{rate:>10.0f}{p50:>10.2f}{p99:>10.2f}{1:>11.1f}{'':>12}")
+    db.close()
+    baseline = rate
+
+    for window in args.windows:
+        db = fresh_db(args.profile, args.products)
+        service = OrderService(db)
+        writes = WriteQueue(db, window_ms=window, max_batch=args.max_batch)
+        rate, p50, p99 = run(db, args.producers, args.seconds, args.products,
+                             lambda product_id: writes.submit(service.place_order, product_id, 1).result())
+        writes.close()
+        stats = writes.stats()
+        print(f"{f'queue {window:g} ms':<18}{rate:>10.0f}{p50:>10.2f}{p99:>10.2f}{stats['average_batch']:>11.1f}"
+              f"{stats['commit_p50_ms']:>12.2f}   x{rate / baseline:.1f}")
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QApplication
+
+from database import Database
+from db_worker import DatabaseExecutor
+
+# Measures how long the Qt event loop stalls while heavy queries run, once with the
+# queries called directly from a slot and once through DatabaseExecutor.
+
+HEAVY_SQL = """
+    SELECT products.name, COUNT(*), SUM(order_items.price)
+    FROM order_items LEFT JOIN products ON products.id = order_items.product_id
+    GROUP BY products.name ORDER BY SUM(order_items.price) DESC
+"""
+
+
+def seed(db, orders, products):
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", 10.0, 100) for i in range(products)))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, 'Pending')",
+                           ((i, f"SEED-{i}") for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, 1, 10.0, 10.0)",
+                           ((i, i % products + 1) for i in range(1, orders + 1)))
+
+
+def measure(app, start_work, queries):
+    # A 1 ms timer records the gaps between event loop iterations
+    gaps = []
+    last = [time.perf_counter()]
+    remaining = [queries]
+
+    def tick():
+        now = time.perf_counter()
+        gaps.append(now - last[0])
+        last[0] = now
+
+    def query_done(*_):
+        remaining[0] -= 1
+        if remaining[0]:
+            QTimer.singleShot(0, lambda: start_work(query_done))
+        else:
+            tick()
+            app.quit()
+
+    timer = QTimer()
+    timer.timeout.connect(tick)
+    timer.start(1)
+    QTimer.singleShot(0, lambda: start_work(query_done))
+    app.exec()
+    timer.stop()
+    gaps.sort()
+    return gaps[-1] * 1000, gaps[int(len(gaps) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event loop frame time during heavy queries")
+    parser.add_argument("--orders", type=int, default=500_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--queries", type=int, default=5)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile="bulk")
+    seed(db, args.orders, args.products)
+    executor = DatabaseExecutor(db)
+
+    def synchronous(done):
+        done(db.fetch_all(HEAVY_SQL))
+
+    def background(done):
+        executor.fetch_all(HEAVY_SQL, on_result=done)
+
+    print(f"{'mode':<14}{'max frame, ms':>16}{'p99 frame, ms':>16}")
+    for name, start_work in (("in GUI thread", synchronous), ("executor", background)):
+        worst, p99 = measure(app, start_work, args.queries)
+        print(f"{name:<14}{worst:>16.1f}{p99:>16.1f}")
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
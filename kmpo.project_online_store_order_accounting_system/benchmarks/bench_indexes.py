@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from migrations import MIGRATIONS, SCHEMA_VERSION, migrate
+
+# Compares order lookups on the original schema (full table scans) with the
+# indexed schema produced by the migrations, on the same synthetic order book.
+
+
+def seed(conn, orders, products):
+    MIGRATIONS[0](conn)
+    conn.execute("PRAGMA user_version = 1")
+    conn.executemany("INSERT INTO products (id, name, price, quantity) VALUES (?, ?, ?, ?)",
+                     ((i, f"Product {i}", 10.0 + i % 100, 1000) for i in range(1, products + 1)))
+    statuses = ("Pending", "Completed", "Shipped", "Cancelled")
+    conn.executemany("INSERT INTO orders (id, order_number, product_name, quantity, price, status) VALUES (?, ?, ?, ?, ?, ?)",
+                     ((i, f"ORD-{i}", f"Product {i % products + 1}", 1, 10.0, statuses[i % 4]) for i in range(1, orders + 1)))
+    conn.commit()
+
+
+def measure(conn, sql, params_list):
+    start = time.perf_counter()
+    for params in params_list:
+        conn.execute(sql, params).fetchall()
+    return (time.perf_counter() - start) / len(params_list) * 1000
+
+
+def run_lookups(conn, orders, products, lookups, by_product_sql):
+    numbers = [(f"ORD-{random.randint(1, orders)}",) for _ in range(lookups)]
+    product_ids = [(random.randint(1, products),) for _ in range(lookups)]
+    return {
+        "order_number": measure(conn, "SELECT id FROM orders WHERE order_number = ?", numbers),
+        "product": measure(conn, by_product_sql, product_ids),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order lookup latency: full scan vs. index seek")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--lookups", type=int, default=20)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "bench.db")
+    conn = sqlite3.connect(path)
+    start = time.perf_counter()
+    seed(conn, args.orders, args.products)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    scan = run_lookups(conn, args.orders, args.products, args.lookups,
+                       "SELECT o.id FROM orders o JOIN products p ON p.name = o.product_name WHERE p.id = ?")
+
+    start = time.perf_counter()
+    migrate(conn)
+    print(f"migrated to version {SCHEMA_VERSION} in {time.perf_counter() - start:.1f}s")
+
+    seek = run_lookups(conn, args.orders, args.products, args.lookups,
+                       "SELECT order_id FROM order_items WHERE product_id = ?")
+
+    print(f"{'lookup':<14}{'scan, ms':>12}{'index, ms':>12}{'speedup':>10}")
+    for name in scan:
+        print(f"{name:<14}{scan[name]:>12.3f}{seek[name]:>12.3f}{scan[name] / seek[name]:>9.0f}x")
+
+    conn.close()
+    os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from inventory import StockLedger
+from services import OrderService
+
+# Stock ledger with a long history: the cost of reading a balance now (products.quantity)
+# against adding up the ledger, balance-at-time reads before and after the checkpoints
+# are built, the checkpoint job itself, quick and full reconciliation (and whether they
+# find balances changed behind the ledger's back) and checkout throughput with the sale
+# movements written in the same transaction.
+
+
+def seed(db, products, movements, days):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2), 10 ** 9) for i in range(products)))
+    start = time.time() - days * 86400
+    step = days * 86400 / movements
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO stock_movements (product_id, kind, quantity, created_at) VALUES (?, ?, ?, ?)",
+                           ((random.randint(1, products), kind, quantity if kind == "receipt" else -quantity,
+                             time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * step)))
+                            for i, kind, quantity in ((i, random.choice(("receipt", "sale", "sale")), random.randint(1, 5))
+                                                      for i in range(movements))))
+    return start
+
+
+def timed(function, calls):
+    start = time.perf_counter()
+    for args in calls:
+        function(*args)
+    return (time.perf_counter() - start) / len(calls) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stock ledger balances, checkpoints and reconciliation")
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--movements", type=int, default=2_000_000)
+    parser.add_argument("--days", type=int, default=365, help="the movements are spread over this many days")
+    parser.add_argument("--spacing", type=int, default=256, help="movements per product between checkpoints")
+    parser.add_argument("--reads", type=int, default=200)
+    parser.add_argument("--carts", type=int, default=2000)
+    parser.add_argument("--drift", type=int, default=10, help="balances changed directly before reconciling")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db = Database(os.path.join(directory, "bench.db"))
+    start = time.perf_counter()
+    first = seed(db, args.products, args.movements, args.days)
+    print(f"seeded {args.movements} movements over {args.products} products in {time.perf_counter() - start:.1f}s")
+    ledger = StockLedger(db, spacing=args.spacing)
+
+    products = [(random.randint(1, args.products),) for _ in range(args.reads)]
+    moments = [(product_id, time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(first + random.uniform(0, args.days * 86400))))
+               for (product_id,) in products]
+    print(f"{'balance now':<28}{timed(ledger.balance, products):>9.3f} ms  (products.quantity)")
+    ledger_sum = lambda product_id: db.fetch_one("SELECT SUM(quantity) FROM stock_movements WHERE product_id = ?", (product_id,))
+    print(f"{'sum of the ledger':<28}{timed(ledger_sum, products):>9.3f} ms")
+    print(f"{'balance at, no checkpoints':<28}{timed(ledger.balance_at, moments):>9.3f} ms")
+
+    start = time.perf_counter()
+    seen, written = ledger.checkpoint()
+    print(f"checkpoints: {written} over {seen} movements in {time.perf_counter() - start:.2f}s")
+    print(f"{'balance at, checkpoints':<28}{timed(ledger.balance_at, moments):>9.3f} ms")
+
+    service = OrderService(db)
+    start = time.perf_counter()
+    for _ in range(args.carts):
+        service.place_cart([(random.randint(1, args.products), 1) for _ in range(3)])
+    elapsed = time.perf_counter() - start
+    print(f"place_cart, 3 lines: {args.carts / elapsed:.0f} orders/s ({elapsed / args.carts * 1000:.3f} ms each)")
+    start = time.perf_counter()
+    seen, written = ledger.checkpoint()
+    print(f"incremental checkpoints: {written} over {seen} movements in {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"(write lock held for the insert only)")
+
+    drifted = random.sample(range(1, args.products + 1), args.drift)
+    db.execute_many("UPDATE products SET quantity = quantity + 1 WHERE id = ?", [(product_id,) for product_id in drifted])
+    for full in (False, True):
+        mismatches = ledger.reconcile(full)
+        found = {mismatch.product_id for mismatch in mismatches} == set(drifted)
+        print(f"reconcile {'full' if full else 'quick':<6}{ledger.last_result['seconds'] * 1000:>9.1f} ms  "
+              f"{len(mismatches)} mismatches, {'all' if found else 'NOT all'} of the {args.drift} changed balances")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
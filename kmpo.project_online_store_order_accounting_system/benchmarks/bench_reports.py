@@ -0,0 +1,108 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from reports import SalesReports
+from services import OrderService
+
+# Compares the summary-table reports with the same aggregates computed from orders and their lines,
+# checks that both agree, and measures what the summary triggers cost per placed order.
+
+STATUSES = ("Pending", "Completed", "Shipped", "Cancelled")
+
+RAW_QUERIES = {
+    "by product": """
+        SELECT order_items.product_id, COUNT(*), TOTAL(order_items.quantity), TOTAL(order_items.price)
+        FROM order_items JOIN orders ON orders.id = order_items.order_id
+        WHERE orders.status <> 'Cancelled' GROUP BY order_items.product_id ORDER BY TOTAL(order_items.price) DESC""",
+    "by status": "SELECT status, COUNT(*), TOTAL(quantity), TOTAL(price) FROM orders GROUP BY status",
+    "by day": """
+        SELECT date(created_at), COUNT(*), TOTAL(quantity), TOTAL(price) FROM orders
+        WHERE status <> 'Cancelled' GROUP BY 1 ORDER BY 1 DESC""",
+    "top sellers": """
+        SELECT order_items.product_id, COUNT(*), TOTAL(order_items.quantity), TOTAL(order_items.price)
+        FROM order_items JOIN orders ON orders.id = order_items.order_id
+        WHERE orders.status <> 'Cancelled' GROUP BY order_items.product_id ORDER BY TOTAL(order_items.quantity) DESC LIMIT 10""",
+}
+
+
+def seed(db, orders, products, days):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, 10.0, ?)",
+                    ((f"Product {i}", random.randint(0, 100)) for i in range(products)))
+    with db.batch() as batch:
+        batch.execute_many("""
+            INSERT INTO orders (id, order_number, status, created_at)
+            VALUES (?, ?, ?, date('2024-01-01', '+' || ? || ' days'))""",
+                           ((i, f"SEED-{i}", random.choice(STATUSES), random.randrange(days)) for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)",
+                           ((i, random.randint(1, products), quantity, price / quantity, price)
+                            for i, quantity, price in ((i, random.randint(1, 5), round(random.uniform(1, 500), 2))
+                                                       for i in range(1, orders + 1))))
+
+
+def timed(function, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def place_orders(db, count):
+    service = OrderService(db)
+    start = time.perf_counter()
+    for _ in range(count):
+        service.place_order(1, 1)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summary-table reports vs. aggregates over orders")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--writes", type=int, default=2_000)
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile="bulk")
+    start = time.perf_counter()
+    seed(db, args.orders, args.products, args.days)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    reports = SalesReports(db)
+    summary_calls = {
+        "by product": reports.revenue_by_product,
+        "by status": reports.revenue_by_status,
+        "by day": reports.revenue_by_day,
+        "top sellers": reports.top_sellers,
+    }
+    print(f"{'report':<14}{'from orders, ms':>18}{'summary, ms':>14}{'groups':>10}")
+    for name, raw_sql in RAW_QUERIES.items():
+        raw_ms, raw_rows = timed(lambda: db.fetch_all(raw_sql), args.repeat)
+        summary_ms, summary_rows = timed(summary_calls[name], args.repeat)
+        raw_revenue = sum(row[3] for row in raw_rows)
+        summary_revenue = sum(row.revenue for row in summary_rows)
+        assert abs(raw_revenue - summary_revenue) < 0.01 * len(raw_rows) + 1e-6, (name, raw_revenue, summary_revenue)
+        print(f"{name:<14}{raw_ms:>18.1f}{summary_ms:>14.2f}{len(summary_rows):>10}")
+
+    db.query("UPDATE products SET quantity = ? WHERE id = 1", (10 ** 9,))
+    with_triggers = place_orders(db, args.writes)
+    for trigger in ("orders_sales_insert", "orders_sales_update", "orders_sales_delete", "orders_status_update",
+                    "order_items_sales_insert", "order_items_sales_update", "order_items_sales_delete"):
+        db.query(f"DROP TRIGGER {trigger}")
+    without_triggers = place_orders(db, args.writes)
+    print(f"place_order: {with_triggers:.0f} orders/s with summary triggers, {without_triggers:.0f} without")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
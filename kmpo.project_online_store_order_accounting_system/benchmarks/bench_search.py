@@ -0,0 +1,87 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from PyQt6.QtCore import QCoreApplication, Qt
+
+from database import Database
+from models import OrdersTableModel
+
+# Time to the first page of the orders grid for typical searches and header sorts
+# on a large synthetic order book. The model runs synchronously (no executor), so the
+# measured time is the keyset query plus filling the model.
+
+WORDS = ("red", "blue", "green", "steel", "wooden", "small", "large", "chair", "table", "lamp", "shelf", "desk")
+STATUSES = ("Pending", "Completed", "Shipped", "Cancelled")
+
+
+def seed(db, orders, products):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, 1000)",
+                    ((f"{random.choice(WORDS)} {random.choice(WORDS)} {i}", round(random.uniform(1, 500), 2))
+                     for i in range(products)))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, ?)",
+                           ((i, f"ORD-{i}", random.choice(STATUSES)) for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)",
+                           ((i, random.randint(1, products), 1, price, price)
+                            for i, price in ((i, round(random.uniform(1, 2500), 2)) for i in range(1, orders + 1))))
+
+
+CASES = (
+    ("all orders", {}, -1, False),
+    ("number prefix", {"number_prefix": "ORD-4242"}, -1, False),
+    ("status", {"status": "Shipped"}, -1, False),
+    ("product text", {"product": "steel lamp"}, -1, False),
+    ("rare product", {"product": "wooden desk 77"}, -1, False),
+    ("price range", {"min_price": 100.0, "max_price": 110.0}, -1, False),
+    ("sort price desc", {}, 3, True),
+    ("sort number", {}, 0, False),
+    ("sort status", {}, 4, False),
+    ("sort quantity desc", {}, 2, True),
+    ("status + price sort", {"status": "Pending"}, 3, False),
+    ("price range + sort", {"min_price": 100.0, "max_price": 110.0}, 3, True),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First-page latency of orders search and sort")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    app = QCoreApplication([])
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile="bulk")
+    start = time.perf_counter()
+    seed(db, args.orders, args.products)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    model = OrdersTableModel(db)
+    print(f"{'case':<22}{'rows':>8}{'first page, ms':>16}")
+    failed = 0
+    for name, search, column, descending in CASES:
+        model.set_search(**search)
+        order = Qt.SortOrder.DescendingOrder if descending else Qt.SortOrder.AscendingOrder
+        model.sort(column, order)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            model.reload()
+            timings.append((time.perf_counter() - start) * 1000)
+        best = min(timings)
+        mark = "" if best <= args.budget_ms else "  over budget"
+        failed += bool(mark)
+        print(f"{name:<22}{model.rowCount():>8}{best:>16.1f}{mark}")
+    db.close()
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
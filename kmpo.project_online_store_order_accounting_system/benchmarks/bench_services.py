@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from services import OrderService, ProductService, ORDER_STATUSES
+
+# Latency and throughput of the order and product services on a synthetic store,
+# without any GUI. Results can be appended to a JSON-lines history file and compared
+# with a saved baseline; the script exits with status 1 when an operation regressed
+# by more than the tolerance, so it can run as a gate:
+#
+#   python benchmarks/bench_services.py --orders 1000000 --save baseline.json
+#   python benchmarks/bench_services.py --orders 1000000 --baseline baseline.json --history history.jsonl
+
+
+def seed(db, products, orders):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (id, name, price, quantity) VALUES (?, ?, ?, ?)",
+                    ((i, f"Product {i}", round(random.uniform(1, 500), 2), 10 ** 9) for i in range(1, products + 1)))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, ?)",
+                           ((i, f"ORD-{i}", random.choice(ORDER_STATUSES)) for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)",
+                           ((i, random.randint(1, products), quantity, price / quantity, price)
+                            for i, quantity, price in ((i, random.randint(1, 5), round(random.uniform(1, 2500), 2))
+                                                       for i in range(1, orders + 1))))
+    db.query("UPDATE sequences SET value = ? WHERE name = 'order_number'", (orders,))
+
+
+def measure(operation, count):
+    latencies = []
+    start = time.perf_counter()
+    for i in range(count):
+        begin = time.perf_counter()
+        operation(i)
+        latencies.append(time.perf_counter() - begin)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(int(len(latencies) * 0.99), len(latencies) - 1)] * 1000,
+        "ops_per_s": count / elapsed,
+    }
+
+
+def run(db, products, orders, count):
+    order_service = OrderService(db)
+    product_service = ProductService(db)
+    random.seed(2)
+    existing = [f"ORD-{random.randint(1, orders)}" for _ in range(count)]
+    # Orders picked for deletion are left out of the edits and lookups
+    deleted = random.sample(range(1, orders + 1), min(count, orders))
+    deleted_set = set(deleted)
+    edited = [number for number in existing if int(number[4:]) not in deleted_set]
+
+    operations = {
+        "place_order": lambda i: order_service.place_order(random.randint(1, products), 1),
+        "place_cart_10": lambda i: order_service.place_cart([(random.randint(1, products), 1) for _ in range(10)]),
+        "edit_order": lambda i: order_service.edit_order(edited[i % len(edited)], [(random.randint(1, products), 2)],
+                                                         "Shipped"),
+        "get_order": lambda i: order_service.get_order(edited[i % len(edited)]),
+        "list_orders": lambda i: order_service.list_orders(after_id=random.randint(0, orders), limit=100),
+        "list_by_status": lambda i: order_service.list_orders(after_id=random.randint(0, orders), limit=100,
+                                                              status="Pending"),
+        "update_product": lambda i: product_service.update_product(random.randint(1, products), f"Product {i}",
+                                                                   10.0, 10 ** 9),
+        "delete_order": lambda i: order_service.delete_order(f"ORD-{deleted[i]}"),
+    }
+    return {name: measure(operation, min(count, len(deleted)) if name == "delete_order" else count)
+            for name, operation in operations.items()}
+
+
+def compare(results, baseline, tolerance):
+    # An operation regresses when its median latency grew or its throughput fell by more than tolerance
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        if result["p50_ms"] > base["p50_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {base['p50_ms']:.3f} -> {result['p50_ms']:.3f} ms")
+        if result["ops_per_s"] < base["ops_per_s"] * (1 - tolerance):
+            regressions.append(f"{name}: {base['ops_per_s']:.0f} -> {result['ops_per_s']:.0f} ops/s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Order/product service latency and throughput")
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--orders", type=int, default=100_000, help="order book size, 10k to 10M")
+    parser.add_argument("--operations", type=int, default=2_000, help="calls per measured operation")
+    parser.add_argument("--profile", default="default", help="Database connection profile")
+    parser.add_argument("--save", help="write the results to this JSON file (a new baseline)")
+    parser.add_argument("--baseline", help="compare with a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, 0.25 = 25%%")
+    parser.add_argument("--history", help="append the results to this JSON-lines file")
+    args = parser.parse_args()
+
+    db = Database(os.path.join(tempfile.mkdtemp(), "bench.db"), profile=args.profile)
+    start = time.perf_counter()
+    seed(db, args.products, args.orders)
+    print(f"seeded {args.products} products and {args.orders} orders in {time.perf_counter() - start:.1f}s")
+
+    results = run(db, args.products, args.orders, args.operations)
+    db.close()
+
+    print(f"{'operation':<16}{'p50, ms':>10}{'p99, ms':>10}{'ops/s':>10}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}{result['ops_per_s']:>10.0f}")
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "profile": args.profile,
+        "products": args.products,
+        "orders": args.orders,
+        "operations": args.operations,
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+    if args.history:
+        with open(args.history, "a", encoding="utf-8") as file:
+            file.write(json.dumps(report) + "\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            baseline = json.load(file)
+        if (baseline.get("orders"), baseline.get("products")) != (args.orders, args.products):
+            print("warning: the baseline was measured on a different data size", file=sys.stderr)
+        regressions = compare(results, baseline, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print(f"no regressions beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import snapshot
+from database import Database
+from services import OrderService
+from snapshot import OrderSnapshot
+
+# Columnar order snapshot against the list of row tuples it replaces: memory and time to
+# load the orders and lines, group-bys (totals by status, by product, by day with a date
+# and status filter) over the NumPy and plain-Python paths and in SQL, and an incremental
+# refresh after a few hundred new and changed orders against a full reload.
+
+STATUSES = ("Pending", "Processing", "Shipped", "Completed", "Cancelled")
+
+
+def seed(db, orders, products, chunk=100_000):
+    random.seed(1)
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2), 10 ** 9) for i in range(products)))
+    start = time.time() - 365 * 86400
+    for first in range(1, orders + 1, chunk):
+        ids = range(first, min(first + chunk, orders + 1))
+        with db.batch() as batch:
+            batch.execute_many("INSERT INTO orders (id, order_number, status, created_at) VALUES (?, ?, ?, ?)",
+                               ((i, f"ORD-{i}", random.choice(STATUSES),
+                                 time.strftime("%Y-%m-%d %H:%M:%S", time.gmtime(start + i * 365 * 86400 / orders)))
+                                for i in ids))
+            batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, ?, ?, ?)",
+                               ((i, random.randint(1, products), quantity, 10.0, 10.0 * quantity)
+                                for i in ids for quantity in [random.randint(1, 3)] * random.randint(1, 3)))
+    db.execute_many("UPDATE sequences SET value = ? WHERE name = 'order_number'", [(orders + 1,)])
+
+
+def measured(function):
+    # (result, seconds, peak MB allocated while it ran); the time is taken on a second run
+    # without tracemalloc, which slows allocations down several times
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start, peak / 1024 ** 2
+
+
+def timed(function, repeat=5):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def loaded(columns):
+    columns.reload()
+    return columns
+
+
+def tuples_by_status(rows):
+    totals = {}
+    for _, quantity, price, status, _ in rows:
+        total = totals.setdefault(status, [0, 0, 0.0])
+        total[0] += 1
+        total[1] += quantity
+        total[2] += price
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar order snapshot: memory, group-bys and incremental refresh")
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, default=5000)
+    parser.add_argument("--changes", type=int, default=500, help="orders placed and orders edited before the refresh")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    db = Database(os.path.join(directory, "bench.db"))
+    start = time.perf_counter()
+    seed(db, args.orders, args.products)
+    print(f"seeded {args.orders} orders in {time.perf_counter() - start:.1f}s, numpy "
+          f"{'available' if snapshot.numpy is not None else 'NOT installed'}")
+
+    rows, elapsed, peak = measured(lambda: db.fetch_all(snapshot.ORDER_SQL))
+    print(f"{'fetch_all orders, no lines':<28}{elapsed:>7.2f}s  {peak:>8.1f} MB")
+    del rows
+    columns, elapsed, peak = measured(lambda: loaded(OrderSnapshot(db)))
+    print(f"{'snapshot of orders + lines':<28}{elapsed:>7.2f}s  {peak:>8.1f} MB peak, {columns.memory() / 1024 ** 2:.1f} MB held")
+
+    rows = db.fetch_all(snapshot.ORDER_SQL)
+    python = loaded(OrderSnapshot(db, use_numpy=False))
+    filters = {"statuses": ["Completed", "Shipped"], "start": time.strftime("%Y-%m-%d", time.gmtime(time.time() - 90 * 86400))}
+    print(f"{'':<28}{'numpy':>9}{'python':>11}{'sql/tuples':>12}  (ms)")
+    cases = (
+        ("by status", lambda snap: snap.by_status(),
+         lambda: db.fetch_all("SELECT status, COUNT(*), SUM(quantity), TOTAL(price) FROM orders GROUP BY status"),
+         lambda: tuples_by_status(rows)),
+        ("by product", lambda snap: snap.by_product(limit=20),
+         lambda: db.fetch_all("SELECT product_id, COUNT(*), SUM(quantity), TOTAL(price) FROM order_items "
+                              "GROUP BY product_id ORDER BY 4 DESC LIMIT 20"), None),
+        ("by day, last 90, 2 statuses", lambda snap: snap.by_day(**filters),
+         lambda: db.fetch_all("SELECT date(created_at), COUNT(*), SUM(quantity), TOTAL(price) FROM orders "
+                              "WHERE status IN ('Completed', 'Shipped') AND created_at >= ? GROUP BY 1", (filters["start"],)), None),
+    )
+    for label, query, sql, tuples in cases:
+        fast = timed(lambda: query(columns)) if snapshot.numpy is not None else float("nan")
+        slow = timed(lambda: query(python), 1)
+        line = f"{label:<28}{fast:>9.1f}{slow:>11.1f}{timed(sql, 1):>12.1f}"
+        if tuples is not None:
+            line += f"  / {timed(tuples, 1):.1f} over the tuples"
+        print(line)
+    del rows
+
+    service = OrderService(db)
+    random.seed(2)
+    for _ in range(args.changes):
+        service.place_cart([(random.randint(1, args.products), 1) for _ in range(2)])
+    db.execute_many("UPDATE orders SET status = 'Completed' WHERE id = ?",
+                    [(random.randint(1, args.orders),) for _ in range(args.changes)])
+    start = time.perf_counter()
+    added, changed = columns.refresh()
+    elapsed = time.perf_counter() - start
+    print(f"refresh: {added} new, {changed} changed orders in {elapsed * 1000:.1f} ms")
+    start = time.perf_counter()
+    columns.reload()
+    print(f"full reload in {(time.perf_counter() - start) * 1000:.0f} ms")
+    db.close()
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
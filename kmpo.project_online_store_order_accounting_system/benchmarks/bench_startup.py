@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, PROJECT)
+
+# Time from process start to the first screen of orders, for an empty database and a
+# large one, each started cold (database and project files evicted from the OS page
+# cache with posix_fadvise before every run) and warm (straight after a previous run).
+# Every run is a fresh interpreter running main.py's steps with the offscreen Qt platform:
+#   imports   - interpreter start-up and import of ui_main (PyQt6 included)
+#   window    - QApplication, MainApp() and show(); the window touches the database only
+#               after this, when start_background hands the schema check to a worker thread
+#   first page - schema check (migrations), then the first page of orders delivered to the grid
+#   idle      - all background work started at start-up (catalog preload etc.) finished
+
+
+def seed(path, orders, products):
+    from database import Database
+    random.seed(1)
+    db = Database(path, profile="bulk")
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, 1000)",
+                    ((f"Product {i}", round(random.uniform(1, 500), 2)) for i in range(products)))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, ?)",
+                           ((i, f"ORD-{i}", random.choice(("Pending", "Completed", "Shipped"))) for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, 1, ?, ?)",
+                           ((i, random.randint(1, products), 10.0, 10.0) for i in range(1, orders + 1)))
+    db.close()
+
+
+def evict(paths):
+    # Drops the files' pages from the page cache; best effort, without root privileges
+    os.sync()
+    for path in paths:
+        if not os.path.isfile(path):
+            continue
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def project_files():
+    for root, _, names in os.walk(PROJECT):
+        for name in names:
+            if name.endswith((".py", ".pyc")):
+                yield os.path.join(root, name)
+
+
+def child(started):
+    marks = {}
+    from PyQt6.QtWidgets import QApplication
+    import ui_main
+    marks["imports"] = time.time() - started
+
+    app = QApplication([])
+    window = ui_main.MainApp()
+    window.show()
+    marks["window"] = time.time() - started
+
+    model = window.orders_model
+    deadline = time.time() + 60
+    app.processEvents()
+    # The model is attached once the schema check on a worker thread has finished
+    while (window.orders_table.model() is None or model.fetching) and time.time() < deadline:
+        app.processEvents()
+    marks["first page"] = time.time() - started
+    while window.executor.pending and time.time() < deadline:
+        app.processEvents()
+    marks["idle"] = time.time() - started
+    window.close()
+    print(json.dumps({name: value * 1000 for name, value in marks.items()}))
+
+
+def run(directory):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", str(time.time())],
+                            cwd=directory, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Start-up time to the first screen of orders")
+    parser.add_argument("--orders", type=int, nargs="+", default=[0, 1_000_000])
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child is not None:
+        child(args.child)
+        return
+
+    print(f"{'orders':<10}{'start':<7}{'imports':>10}{'window':>10}{'first page':>12}{'idle':>10}  (median ms)")
+    for orders in args.orders:
+        directory = tempfile.mkdtemp()
+        seed(os.path.join(directory, "store.db"), orders, args.products)
+        # The first run creates the archive directory and whatever else start-up leaves behind
+        run(directory)
+        for mode in ("cold", "warm"):
+            results = []
+            for _ in range(args.runs):
+                if mode == "cold":
+                    evict([os.path.join(directory, name) for name in os.listdir(directory)] + list(project_files()))
+                results.append(run(directory))
+            medians = {name: statistics.median(result[name] for result in results) for name in results[0]}
+            print(f"{orders:<10}{mode:<7}{medians['imports']:>10.1f}{medians['window']:>10.1f}"
+                  f"{medians['first page']:>12.1f}{medians['idle']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
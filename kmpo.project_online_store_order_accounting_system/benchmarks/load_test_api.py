@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from database import Database
+
+# Load test for api_server.py: many keep-alive clients placing orders and listing pages
+# against a local SQLite file. By default a server is started for each --max-batch value
+# (1 disables group commit), so the effect of batching writes is visible side by side.
+
+
+def seed(path, products, orders):
+    db = Database(path, profile="bulk")
+    db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, 10.0, ?)",
+                    ((f"Product {i}", 10 ** 9) for i in range(products)))
+    with db.batch() as batch:
+        batch.execute_many("INSERT INTO orders (id, order_number, status) VALUES (?, ?, 'Pending')",
+                           ((i, f"SEED-{i}") for i in range(1, orders + 1)))
+        batch.execute_many("INSERT INTO order_items (order_id, product_id, quantity, unit_price, price) VALUES (?, ?, 1, 10.0, 10.0)",
+                           ((i, i % products + 1) for i in range(1, orders + 1)))
+    db.close()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def request(reader, writer, method, path, payload=None):
+    body = b"" if payload is None else json.dumps(payload).encode()
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = next(int(line.split(":", 1)[1]) for line in lines if line.lower().startswith("content-length"))
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def client(host, port, stop_at, products, orders, write_ratio, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            if random.random() < write_ratio:
+                status, _ = await request(reader, writer, "POST", "/orders",
+                                          {"product_id": random.randint(1, products), "quantity": 1})
+                kind = "write"
+            else:
+                status, _ = await request(reader, writer, "GET", f"/orders?after_id={random.randint(0, orders)}&limit=20")
+                kind = "read"
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+            latencies[kind].append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, clients, seconds, products, orders, write_ratio):
+    latencies = {"read": [], "write": []}
+    errors = {}
+    stop_at = time.perf_counter() + seconds
+    await asyncio.gather(*(client(host, port, stop_at, products, orders, write_ratio, latencies, errors)
+                           for _ in range(clients)))
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    return latencies, errors, stats
+
+
+def percentile(values, fraction):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+
+def wait_for_port(host, port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("the server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requests/s of the HTTP API against a local SQLite file")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--write-ratio", type=float, default=0.5, help="share of POST /orders requests")
+    parser.add_argument("--products", type=int, default=1_000)
+    parser.add_argument("--orders", type=int, default=100_000)
+    parser.add_argument("--profile", default="durable", help="server connection profile")
+    parser.add_argument("--max-batch", type=int, nargs="+", default=[1, 256])
+    parser.add_argument("--url", help="host:port of a running server instead of starting one")
+    args = parser.parse_args()
+
+    print(f"{'max batch':<10}{'req/s':>9}{'writes/s':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}"
+          f"{'avg batch':>11}{'errors':>8}")
+    targets = [(args.url, None)] if args.url else [(None, max_batch) for max_batch in args.max_batch]
+    for url, max_batch in targets:
+        server = None
+        if url:
+            host, port = url.rsplit(":", 1)
+            port = int(port)
+        else:
+            path = os.path.join(tempfile.mkdtemp(), "load.db")
+            seed(path, args.products, args.orders)
+            host, port = "127.0.0.1", free_port()
+            server = subprocess.Popen([sys.executable, os.path.join(ROOT, "api_server.py"), "--db", path,
+                                       "--port", str(port), "--profile", args.profile,
+                                       "--max-batch", str(max_batch)], stdout=subprocess.DEVNULL)
+            wait_for_port(host, port)
+        try:
+            latencies, errors, stats = asyncio.run(run_load(host, port, args.clients, args.seconds, args.products,
+                                                            args.orders, args.write_ratio))
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+        total = len(latencies["read"]) + len(latencies["write"])
+        print(f"{max_batch or '-':<10}{total / args.seconds:>9.0f}{len(latencies['write']) / args.seconds:>10.0f}"
+              f"{percentile(latencies['read'], 0.99):>10.1f}{percentile(latencies['write'], 0.5):>11.1f}"
+              f"{percentile(latencies['write'], 0.99):>11.1f}{stats['average_batch']:>11.1f}"
+              f"{sum(errors.values()):>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from database import Database
+from services import OrderService, InsufficientStockError
+
+# Several processes place orders against the same small stock at once.
+# Afterwards the stock, the orders and the order numbers must all agree.
+
+
+def worker(path, product_ids, attempts, seed, results):
+    random.seed(seed)
+    service = OrderService(Database(path))
+    placed = 0
+    rejected = 0
+    for _ in range(attempts):
+        try:
+            service.place_order(random.choice(product_ids), random.randint(1, 3))
+            placed += 1
+        except InsufficientStockError:
+            rejected += 1
+    results.put((placed, rejected))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent order placement: no oversell, no duplicate numbers")
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--attempts", type=int, default=300)
+    parser.add_argument("--products", type=int, default=3)
+    parser.add_argument("--stock", type=int, default=500)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "stress.db")
+    db = Database(path)
+    for i in range(args.products):
+        db.query("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)", (f"Product {i}", 10.0, args.stock))
+    product_ids = [row[0] for row in db.fetch_all("SELECT id FROM products")]
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(path, product_ids, args.attempts, seed, results))
+                 for seed in range(args.processes)]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    totals = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    placed = sum(total[0] for total in totals)
+    rejected = sum(total[1] for total in totals)
+    print(f"{placed} orders placed, {rejected} rejected in {elapsed:.2f}s ({placed / elapsed:.0f} orders/s)")
+
+    failures = []
+    for product_id, quantity in db.fetch_all("SELECT id, quantity FROM products"):
+        sold = db.fetch_one("SELECT COALESCE(SUM(quantity), 0) FROM order_items WHERE product_id = ?", (product_id,))[0]
+        if quantity < 0 or sold + quantity != args.stock:
+            failures.append(f"product {product_id}: stock {quantity}, sold {sold}, initial {args.stock}")
+    orders, numbers = db.fetch_one("SELECT COUNT(*), COUNT(DISTINCT order_number) FROM orders")
+    if orders != placed or numbers != orders:
+        failures.append(f"{orders} orders stored, {numbers} distinct numbers, {placed} reported as placed")
+
+    if failures:
+        print("FAILED:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("OK: no oversell, every placed order stored once with a unique number")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+import threading
+import weakref
+from array import array
+
+from database import INSERTED, UPDATED, DELETED, RESET
+from services import Product
+
+PRODUCT_SQL = "SELECT id, name, price, quantity FROM products"
+# Ids per "WHERE id IN (...)" query when stale rows are re-read, below SQLite's variable limit
+REFRESH_CHUNK = 500
+
+
+class ProductCatalog:
+    # In-memory copy of the products table shared by every dialog of the process.
+    # Columns are kept in parallel arrays addressed by a slot number, with an id -> slot
+    # index and a name -> ids index on top. Product mutations committed through Database
+    # mark the affected rows stale; the next read re-fetches them in one query (deleted rows
+    # are dropped right away), so the copy never needs a full reload.
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by every product change, so a full load that raced with a write is repeated
+        self.version = 0
+        # Bumped by RESET, so a refresh that raced with a clear() does not store its rows
+        self.resets = 0
+        self.clear()
+        db.subscribe(self.on_change)
+
+    def clear(self):
+        with self.lock:
+            self.loaded = False
+            self.slots = {}
+            self.free_slots = []
+            self.ids = array('q')
+            self.prices = array('d')
+            self.quantities = array('q')
+            self.names = []
+            self.by_name = {}
+            self.sorted_ids = None
+            self.stale = set()
+
+    def __len__(self):
+        return len(self.slots)
+
+    def stats(self):
+        with self.lock:
+            requests = self.hits + self.misses
+            return {
+                "products": len(self.slots),
+                "loaded": self.loaded,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / requests if requests else 0.0,
+            }
+
+    def product(self, slot):
+        return Product(self.ids[slot], self.names[slot], self.prices[slot], self.quantities[slot])
+
+    def store(self, product_id, name, price, quantity):
+        price = 0.0 if price is None else price
+        quantity = 0 if quantity is None else quantity
+        slot = self.slots.get(product_id)
+        if slot is not None:
+            self.unindex_name(slot, product_id)
+            self.names[slot] = name
+            self.prices[slot] = price
+            self.quantities[slot] = quantity
+        elif self.free_slots:
+            slot = self.free_slots.pop()
+            self.ids[slot] = product_id
+            self.names[slot] = name
+            self.prices[slot] = price
+            self.quantities[slot] = quantity
+        else:
+            slot = len(self.ids)
+            self.ids.append(product_id)
+            self.names.append(name)
+            self.prices.append(price)
+            self.quantities.append(quantity)
+        self.slots[product_id] = slot
+        self.by_name.setdefault(name, set()).add(product_id)
+        self.sorted_ids = None
+
+    def unindex_name(self, slot, product_id):
+        ids = self.by_name[self.names[slot]]
+        ids.discard(product_id)
+        if not ids:
+            del self.by_name[self.names[slot]]
+
+    def drop(self, product_id):
+        slot = self.slots.pop(product_id, None)
+        if slot is None:
+            return
+        self.unindex_name(slot, product_id)
+        self.names[slot] = None
+        self.free_slots.append(slot)
+        self.sorted_ids = None
+
+    def load(self):
+        # The first call reads the whole table once; later calls are hits
+        with self.lock:
+            if self.loaded:
+                self.hits += 1
+                return
+            self.misses += 1
+        while True:
+            version = self.version
+            rows = self.db.fetch_all(PRODUCT_SQL)
+            with self.lock:
+                if self.loaded:
+                    return
+                if version == self.version:
+                    for row in rows:
+                        self.store(*row)
+                    # Nothing changed since the read started, so every row is current
+                    self.stale.clear()
+                    self.loaded = True
+                    return
+
+    def refresh(self):
+        # Re-reads the rows marked stale by on_change, outside the lock
+        with self.lock:
+            if not self.stale:
+                return
+            ids = sorted(self.stale)
+            self.stale.clear()
+            resets = self.resets
+        rows = {}
+        for start in range(0, len(ids), REFRESH_CHUNK):
+            chunk = ids[start:start + REFRESH_CHUNK]
+            placeholders = ", ".join("?" * len(chunk))
+            for row in self.db.fetch_all(f"{PRODUCT_SQL} WHERE id IN ({placeholders})", chunk):
+                rows[row[0]] = row
+        with self.lock:
+            if resets != self.resets:
+                return
+            for product_id in ids:
+                if product_id in self.stale:
+                    # Changed again while we were reading; the next refresh picks it up
+                    continue
+                row = rows.get(product_id)
+                if row is None:
+                    self.drop(product_id)
+                else:
+                    self.store(*row)
+
+    def get(self, product_id):
+        self.refresh()
+        with self.lock:
+            slot = self.slots.get(product_id)
+            if slot is not None:
+                self.hits += 1
+                return self.product(slot)
+            self.misses += 1
+            if self.loaded:
+                # A fully loaded catalog is kept complete by the change events
+                return None
+        row = self.db.fetch_one(f"{PRODUCT_SQL} WHERE id = ?", (product_id,))
+        if row is None:
+            return None
+        with self.lock:
+            self.store(*row)
+        return Product(*row)
+
+    def find(self, name):
+        self.load()
+        self.refresh()
+        with self.lock:
+            return [self.product(self.slots[product_id]) for product_id in sorted(self.by_name.get(name, ()))]
+
+    def all(self):
+        # Sorted by name, the order used by the product combo boxes
+        self.load()
+        self.refresh()
+        with self.lock:
+            if self.sorted_ids is None:
+                self.sorted_ids = sorted(self.slots, key=lambda product_id: (self.names[self.slots[product_id]] or "", product_id))
+            return [self.product(self.slots[product_id]) for product_id in self.sorted_ids]
+
+    def on_change(self, change):
+        if change.table != "products":
+            return
+        # No queries here: a bulk edit sends one event per row, and all of them are
+        # re-read together by the next refresh()
+        with self.lock:
+            self.version += 1
+            if change.kind == RESET:
+                self.resets += 1
+                self.clear()
+            elif change.kind in (INSERTED, UPDATED, DELETED) and (self.loaded or change.rowid in self.slots):
+                if change.kind == DELETED:
+                    self.drop(change.rowid)
+                # For a deleted row this also stops a refresh already reading it from storing it back
+                self.stale.add(change.rowid)
+
+
+catalogs = weakref.WeakKeyDictionary()
+catalogs_lock = threading.Lock()
+
+
+def get_catalog(db):
+    # One catalog per Database object, shared across the whole process
+    with catalogs_lock:
+        catalog = catalogs.get(db)
+        if catalog is None:
+            catalog = catalogs[db] = ProductCatalog(db)
+        return catalog
@@ -0,0 +1,135 @@
+import argparse
+import sys
+
+from archive import PERIOD_FORMATS, OrderArchiver
+from backup import BackupManager
+from database import Database
+from import_export import IMPORTERS, Progress, export_table
+from inventory import StockLedger
+
+# Command line entry point for bulk work that does not need the GUI:
+#   python cli.py import products catalog.csv
+#   python cli.py export orders orders.jsonl --db store.db
+#   python cli.py --query-profile profile.json import orders orders.csv
+#   python cli.py archive --days 90 --period month
+#   python cli.py backup --keep 14
+#   python cli.py restore --before "2024-05-01 12:00:00"
+#   python cli.py reconcile --full --fix
+#   python cli.py stock 42 --at "2024-05-01 12:00:00"
+
+
+def print_progress(progress):
+    print(f"\r{progress.rows} rows, {progress.rate:.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+
+def print_pages(label, done, total):
+    print(f"\r{label}: {done}/{total} pages", end="", file=sys.stderr, flush=True)
+
+
+def run_backup_command(args):
+    # Works on the files directly; restore expects the application to be closed
+    manager = BackupManager(args.db, args.backup_dir, keep=args.keep)
+    if args.command == "backup":
+        snapshot = manager.create(print_pages)
+        print(file=sys.stderr)
+        print(f"backup: {snapshot.name}, {snapshot.size} bytes compressed")
+    elif args.command == "snapshots":
+        for snapshot in manager.snapshots():
+            print(f"{snapshot.name}  {snapshot.created}  {snapshot.size} bytes")
+    elif args.command == "verify":
+        print(f"verify: {manager.verify(args.name).name} is intact")
+    else:
+        snapshot = manager.restore(args.name, args.before, print_pages)
+        print(file=sys.stderr)
+        print(f"restore: {args.db} restored from {snapshot.name}")
+
+
+def run_stock_command(db, args):
+    ledger = StockLedger(db)
+    if args.command == "reconcile":
+        movements, checkpoints = ledger.checkpoint()
+        mismatches = ledger.reconcile(args.full, args.fix)
+        for mismatch in mismatches:
+            print(f"product {mismatch.product_id}: balance {mismatch.balance}, ledger {mismatch.ledger}")
+        result = ledger.last_result
+        print(f"reconcile: {result['products']} products, {len(mismatches)} mismatches"
+              f"{' corrected' if args.fix and mismatches else ''}, {result['bad_checkpoints']} bad checkpoints "
+              f"in {result['seconds']:.2f}s ({checkpoints} new checkpoints over {movements} movements)")
+        return
+    if args.at:
+        print(f"product {args.product_id}: {ledger.balance_at(args.product_id, args.at)} at {args.at}")
+    else:
+        print(f"product {args.product_id}: {ledger.balance(args.product_id)} in stock")
+    for movement in ledger.movements(args.product_id, limit=args.limit):
+        print(f"{movement.id:>10}  {movement.created_at}  {movement.kind:<10} {movement.quantity:>+8}"
+              f"  {'' if movement.order_id is None else 'order ' + str(movement.order_id)}  {movement.note or ''}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Order accounting system command line tools")
+    parser.add_argument("--db", default="store.db", help="database file (default: store.db)")
+    parser.add_argument("--chunk-size", type=int, default=5000, help="rows per transaction / fetchmany call")
+    parser.add_argument("--query-profile", metavar="PATH", help="write per-statement timings and plans to this JSON file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="stream a CSV/JSONL file into a table")
+    import_parser.add_argument("table", choices=sorted(IMPORTERS))
+    import_parser.add_argument("path")
+
+    export_parser = commands.add_parser("export", help="stream a table into a CSV/JSONL file")
+    export_parser.add_argument("table", choices=sorted(IMPORTERS))
+    export_parser.add_argument("path")
+
+    archive_parser = commands.add_parser("archive", help="move finished orders into the per-period archive files")
+    archive_parser.add_argument("--days", type=int, default=90, help="archive orders older than this (default: 90)")
+    archive_parser.add_argument("--period", choices=sorted(PERIOD_FORMATS), default="year", help="one archive file per period")
+    archive_parser.add_argument("--dir", help="archive directory (default: <db name>_archive)")
+
+    for name, help_text in (("backup", "take a compressed online snapshot of the database and its archives"),
+                            ("snapshots", "list the snapshots"),
+                            ("verify", "check a snapshot's checksums and integrity (default: the newest)"),
+                            ("restore", "restore a snapshot (default: the newest); close the application first")):
+        backup_parser = commands.add_parser(name, help=help_text)
+        backup_parser.add_argument("--backup-dir", help="snapshot directory (default: <db name>_backups)")
+        backup_parser.add_argument("--keep", type=int, default=7, help="snapshots kept after a backup (default: 7)")
+        if name in ("verify", "restore"):
+            backup_parser.add_argument("name", nargs="?", help="snapshot name")
+        if name == "restore":
+            backup_parser.add_argument("--before", metavar="TIME", help='newest snapshot taken at or before "YYYY-mm-dd HH:MM:SS"')
+
+    reconcile_parser = commands.add_parser("reconcile", help="check the stock ledger against the product balances")
+    reconcile_parser.add_argument("--full", action="store_true", help="add up the whole ledger and check every checkpoint")
+    reconcile_parser.add_argument("--fix", action="store_true", help="record a correction for every mismatch")
+
+    stock_parser = commands.add_parser("stock", help="show a product's balance and its latest stock movements")
+    stock_parser.add_argument("product_id", type=int)
+    stock_parser.add_argument("--at", metavar="TIME", help='balance at "YYYY-mm-dd HH:MM:SS" (UTC) instead of now')
+    stock_parser.add_argument("--limit", type=int, default=20, help="movements shown (default: 20)")
+
+    args = parser.parse_args(argv)
+    if args.command in ("backup", "snapshots", "verify", "restore"):
+        run_backup_command(args)
+        return
+    db = Database(args.db)
+    if args.query_profile:
+        db.enable_profiling()
+    if args.command in ("reconcile", "stock"):
+        run_stock_command(db, args)
+    else:
+        progress = Progress(print_progress)
+        if args.command == "archive":
+            archiver = OrderArchiver(db, args.days, args.dir, args.period, args.chunk_size)
+            archiver.archive_all(progress)
+        elif args.command == "import":
+            IMPORTERS[args.table](db, args.path, args.chunk_size, progress)
+        else:
+            export_table(db, args.table, args.path, args.chunk_size, progress)
+        print(file=sys.stderr)
+        print(f"{args.command}: {progress.written} rows written, {progress.skipped} skipped "
+              f"in {progress.elapsed:.1f}s ({progress.rate:.0f} rows/s)")
+    if args.query_profile:
+        db.profiler.dump(args.query_profile)
+
+
+if __name__ == "__main__":
+    main()
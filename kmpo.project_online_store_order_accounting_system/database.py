@@ -1,59 +1,569 @@
+import queue
 import sqlite3
+import threading
+import time
+import weakref
+from collections import deque, namedtuple
+from concurrent.futures import Future
+from contextlib import contextmanager
+from urllib.parse import quote
+
+from migrations import migrate
+from profiler import ProfiledConnection, QueryProfiler
+
+#     
+INSERTED = "inserted"
+UPDATED = "updated"
+DELETED = "deleted"
+#     :     
+RESET = "reset"
+
+ChangeEvent = namedtuple("ChangeEvent", ["table", "kind", "rowid"])
+
+#  :   (UPDATED)   (DELETED);  
+#      
+PRODUCT_NAMES = "product_names"
+
+#      WriteQueue: ,       ( )
+BatchMetrics = namedtuple("BatchMetrics", ["size", "wait", "commit"])
+
+#   SQLite. cache_size   ( ), mmap_size  busy_timeout    
+PROFILES = {
+    "default": {"journal_mode": "wal", "synchronous": "normal", "cache_size": -16000,
+                "mmap_size": 256 * 1024 * 1024, "busy_timeout": 5000, "temp_store": "memory"},
+    #  commit   ,       
+    "durable": {"journal_mode": "wal", "synchronous": "full", "cache_size": -16000,
+                "mmap_size": 256 * 1024 * 1024, "busy_timeout": 10000, "temp_store": "memory"},
+    #      
+    "bulk": {"journal_mode": "wal", "synchronous": "normal", "cache_size": -256000,
+             "mmap_size": 2 * 1024 * 1024 * 1024, "busy_timeout": 30000, "temp_store": "memory"},
+    "low_memory": {"journal_mode": "wal", "synchronous": "normal", "cache_size": -2000,
+                   "mmap_size": 0, "busy_timeout": 5000, "temp_store": "file"},
+    #  :  ,      
+    "legacy": {"journal_mode": "delete", "synchronous": "full", "cache_size": -2000,
+               "mmap_size": 0, "busy_timeout": 5000, "temp_store": "default"},
+}
+
+# ,        
+READER_PRAGMAS = ("cache_size", "mmap_size", "busy_timeout", "temp_store")
+
+class ConnectionManager:
+    #  -       .
+    #   WAL    ,     .
+    def __init__(self, db_name, profile="default", readers=4, cached_statements=256):
+        self.db_name = db_name
+        self.settings = PROFILES[profile] if isinstance(profile, str) else profile
+        self.cached_statements = cached_statements
+        self.max_readers = readers
+        self.timeout = self.settings["busy_timeout"] / 1000
+        #        ,   
+        self.profiler = None
+        self.trace = None
+        #    (ATTACH,  ): function(conn, read_only).
+        #      ,  setup_version 
+        self.setup_functions = []
+        self.setup_version = 0
+        # uri=True:      ,  ATTACH  "file:...?mode=ro"
+        self.writer = sqlite3.connect(db_name, timeout=self.timeout, check_same_thread=False, uri=True,
+                                      cached_statements=cached_statements, factory=ProfiledConnection)
+        self.writer.setup_version = 0
+        self.apply_pragmas(self.writer, self.settings)
+        self.idle_readers = queue.LifoQueue()
+        self.opened_readers = []
+        self.lock = threading.Lock()
+        #        ,    
+        self.shared = db_name != ":memory:" and not db_name.startswith("file::memory:")
+
+    def apply_pragmas(self, conn, settings, names=None):
+        for name in names or settings:
+            conn.execute(f"PRAGMA {name} = {settings[name]}")
+
+    def open_reader(self):
+        conn = sqlite3.connect(f"file:{quote(self.db_name)}?mode=ro", uri=True, timeout=self.timeout,
+                               check_same_thread=False, cached_statements=self.cached_statements,
+                               factory=ProfiledConnection)
+        self.apply_pragmas(conn, self.settings, READER_PRAGMAS)
+        conn.execute("PRAGMA query_only = ON")
+        conn.profiler = self.profiler
+        conn.set_trace_callback(self.trace)
+        conn.setup_version = 0
+        return conn
+
+    def all_connections(self):
+        with self.lock:
+            return [self.writer] + self.opened_readers
+
+    def set_profiler(self, profiler):
+        self.profiler = profiler
+        for conn in self.all_connections():
+            conn.profiler = profiler
+
+    def set_trace(self, callback):
+        self.trace = callback
+        for conn in self.all_connections():
+            conn.set_trace_callback(callback)
+
+    def add_setup(self, function):
+        with self.lock:
+            self.setup_functions.append(function)
+            self.setup_version += 1
+
+    def refresh_setup(self):
+        with self.lock:
+            self.setup_version += 1
+
+    def prepare(self, conn, read_only):
+        #  ,    ,  
+        version = self.setup_version
+        if conn.setup_version == version:
+            return
+        for function in list(self.setup_functions):
+            function(conn, read_only)
+        conn.setup_version = version
+
+    @contextmanager
+    def reader(self):
+        if not self.shared or not self.max_readers:
+            yield self.writer
+            return
+        try:
+            conn = self.idle_readers.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                can_open = len(self.opened_readers) < self.max_readers
+                if can_open:
+                    conn = self.open_reader()
+                    self.opened_readers.append(conn)
+            if not can_open:
+                #   :     
+                start = time.perf_counter()
+                conn = self.idle_readers.get()
+                if self.profiler is not None:
+                    self.profiler.record_wait("reader_pool", time.perf_counter() - start)
+        try:
+            self.prepare(conn, True)
+            yield conn
+        finally:
+            self.idle_readers.put(conn)
+
+    def close(self):
+        with self.lock:
+            for conn in self.opened_readers:
+                conn.close()
+            self.opened_readers = []
+            self.idle_readers = queue.LifoQueue()
+        self.writer.close()
+
+class Batch:
+    #      SQL     executemany
+    # (     ), commit  Database.batch()
+    def __init__(self, conn, chunk_size=5000):
+        self.conn = conn
+        self.chunk_size = chunk_size
+        self.sql = None
+        self.rows = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        if sql != self.sql:
+            self.flush()
+            self.sql = sql
+        self.rows.append(params)
+        if len(self.rows) >= self.chunk_size:
+            self.flush()
+
+    def execute_many(self, sql, rows):
+        for params in rows:
+            self.execute(sql, params)
+
+    def flush(self):
+        if self.rows:
+            self.rowcount += self.conn.executemany(self.sql, self.rows).rowcount
+            self.rows = []
 
 class Database:
-    def __init__(self, db_name="orders.db"):
-        self.conn = sqlite3.connect(db_name)
-        self.create_tables()
+    # ,      
+    WATCHED_TABLES = ("orders", "products")
+    #       ,      RESET
+    MAX_PENDING_CHANGES = 1000
+
+    def __init__(self, db_name="orders.db", profile="default", readers=4, create_schema=True):
+        #      ,  -   (. ConnectionManager)
+        self.connections = ConnectionManager(db_name, profile, readers)
+        self.conn = self.connections.writer
+        self.write_lock = threading.RLock()
+        self.writer_thread = None
+        self.listeners = []
+        self.pending_changes = []
+        self.reset_tables = set()
+        #     :     
+        # ,     commit  
+        self.notifications = deque()
+        self.notify_lock = threading.Lock()
+        self.notifying_thread = None
+        # OrderArchiver,    
+        self.archiver = None
+        self.conn.create_function("notify_change", 3, self.record_change)
+        # create_schema=False:   ,  open_schema   
+        self.schema_version = None
+        if create_schema:
+            self.open_schema()
+
+    def open_schema(self):
+        #       :        .
+        #     ,     
+        with self.write_lock:
+            self.create_tables()
+            self.create_change_triggers()
+        return self.schema_version
 
     def create_tables(self):
-        with self.conn:
-            #   
-            self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS orders (
-                id INTEGER PRIMARY KEY,
-                order_number TEXT,
-                product_name TEXT,
-                quantity INTEGER,
-                price REAL,
-                status TEXT
-            )
-            """)
+        #        (PRAGMA user_version)
+        self.schema_version = migrate(self.conn)
 
-            #        'quantity'
-            self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                id INTEGER PRIMARY KEY,
-                name TEXT,
-                price REAL,
-                quantity INTEGER DEFAULT 0
-            )
+    def create_change_triggers(self):
+        #          id   
+        for table in self.WATCHED_TABLES:
+            for kind, operation, row in ((INSERTED, "INSERT", "NEW"), (UPDATED, "UPDATE", "NEW"), (DELETED, "DELETE", "OLD")):
+                self.conn.execute(f"""
+                CREATE TEMP TRIGGER IF NOT EXISTS {table}_{kind}_notify AFTER {operation} ON main.{table}
+                BEGIN
+                    SELECT notify_change('{table}', '{kind}', {row}.id);
+                END
+                """)
+        #   ,    :    
+        for kind, operation, condition in ((UPDATED, "UPDATE OF name", "WHEN OLD.name IS NOT NEW.name"), (DELETED, "DELETE", "")):
+            self.conn.execute(f"""
+            CREATE TEMP TRIGGER IF NOT EXISTS {PRODUCT_NAMES}_{kind}_notify AFTER {operation} ON main.products {condition}
+            BEGIN
+                SELECT notify_change('{PRODUCT_NAMES}', '{kind}', OLD.id);
+            END
             """)
 
-            # ,    'quantity'   'products'
-            self.check_and_add_quantity_column()
+    def subscribe(self, callback):
+        #   ,       
+        if hasattr(callback, "__self__"):
+            self.listeners.append(weakref.WeakMethod(callback))
+        else:
+            self.listeners.append(weakref.ref(callback))
+
+    def unsubscribe(self, callback):
+        self.listeners = [ref for ref in self.listeners if ref() not in (None, callback)]
 
-    def check_and_add_quantity_column(self):
-        cursor = self.conn.cursor()
-        cursor.execute("PRAGMA table_info(products);")
-        columns = cursor.fetchall()
+    def record_change(self, table, kind, rowid):
+        if table in self.reset_tables:
+            return
+        self.pending_changes.append(ChangeEvent(table, kind, rowid))
+        if len(self.pending_changes) > self.MAX_PENDING_CHANGES:
+            #  :       RESET  
+            self.reset_tables.update(change.table for change in self.pending_changes)
+            self.pending_changes = []
 
-        # ,    'quantity'
-        column_names = [column[1] for column in columns]
-        if 'quantity' not in column_names:
-            print("Adding 'quantity' column to 'products' table.")
-            self.conn.execute("ALTER TABLE products ADD COLUMN quantity INTEGER DEFAULT 0;")
-            self.conn.commit()
+    def discard_changes(self):
+        self.pending_changes = []
+        self.reset_tables = set()
+
+    def changes_mark(self):
+        #       SAVEPOINT
+        return len(self.pending_changes), len(self.reset_tables)
+
+    def rollback_changes(self, mark):
+        # ROLLBACK TO:      
+        count, resets = mark
+        if len(self.reset_tables) == resets:
+            del self.pending_changes[count:]
+        else:
+            #        RESET;   
+            # ,  ,      RESET
+            self.reset_tables.update(change.table for change in self.pending_changes)
+            self.pending_changes = []
+
+    def queue_changes(self):
+        #    commit,    
+        changes = [ChangeEvent(table, RESET, None) for table in sorted(self.reset_tables)] + self.pending_changes
+        self.discard_changes()
+        if changes:
+            self.notifications.append(changes)
+
+    def flush_changes(self):
+        #     locked(),      
+        if self.notifying_thread == threading.get_ident():
+            #    - :     
+            return
+        with self.notify_lock:
+            self.notifying_thread = threading.get_ident()
+            try:
+                while self.notifications:
+                    self.notify(self.notifications.popleft())
+            finally:
+                self.notifying_thread = None
+
+    def notify(self, changes):
+        self.listeners = [ref for ref in self.listeners if ref() is not None]
+        for change in changes:
+            for ref in list(self.listeners):
+                callback = ref()
+                if callback is not None:
+                    callback(change)
+
+    def in_transaction(self):
+        #   -   
+        return self.writer_thread == threading.get_ident()
 
     def query(self, query, params=()):
-        with self.conn:
-            cursor = self.conn.execute(query, params)
-            self.conn.commit()
-            return cursor
+        #  transaction()/batch()     , commit  
+        if self.in_transaction():
+            return self.conn.execute(query, params)
+        #      commit   (with self.conn   commit)
+        with self.locked():
+            try:
+                with self.conn:
+                    cursor = self.conn.execute(query, params)
+            except Exception:
+                self.discard_changes()
+                raise
+            self.queue_changes()
+        self.flush_changes()
+        return cursor
+
+    def execute_many(self, query, rows):
+        #        commit
+        with self.batch() as batch:
+            batch.execute_many(query, rows)
+        return batch.rowcount
+
+    @contextmanager
+    def locked(self):
+        #   ;      
+        profiler = self.connections.profiler
+        start = time.perf_counter()
+        with self.write_lock:
+            if profiler is not None:
+                profiler.record_wait("write_lock", time.perf_counter() - start)
+            #   (ATTACH )   
+            if not self.conn.in_transaction:
+                self.connections.prepare(self.conn, False)
+            yield
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE    ,    
+        #        (     )
+        if self.in_transaction():
+            #       :
+            #     , commit   
+            self.conn.execute("SAVEPOINT nested")
+            mark = self.changes_mark()
+            try:
+                yield self.conn
+            except BaseException:
+                self.conn.execute("ROLLBACK TO nested")
+                self.conn.execute("RELEASE nested")
+                self.rollback_changes(mark)
+                raise
+            self.conn.execute("RELEASE nested")
+            return
+        with self.locked():
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.writer_thread = threading.get_ident()
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                self.discard_changes()
+                raise
+            finally:
+                self.writer_thread = None
+            self.queue_changes()
+        self.flush_changes()
+
+    @contextmanager
+    def batch(self, chunk_size=5000):
+        #      ;    
+        with self.transaction() as conn:
+            batch = Batch(conn, chunk_size)
+            yield batch
+            batch.flush()
+
+    @contextmanager
+    def reader(self):
+        #         
+        if self.in_transaction():
+            yield self.conn
+        else:
+            with self.connections.reader() as conn:
+                yield conn
 
     def fetch_all(self, query, params=()):
-        cursor = self.query(query, params)
-        return cursor.fetchall()
+        with self.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+        if conn.profiler is not None:
+            conn.profiler.add_rows(query, len(rows))
+        return rows
 
     def fetch_one(self, query, params=()):
-        cursor = self.query(query, params)
-        return cursor.fetchone()
+        with self.reader() as conn:
+            row = conn.execute(query, params).fetchone()
+        if conn.profiler is not None and row is not None:
+            conn.profiler.add_rows(query, 1)
+        return row
+
+    def fetch_iter(self, query, params=(), size=1000):
+        #     fetchmany,      
+        with self.reader() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                if conn.profiler is not None:
+                    conn.profiler.add_rows(query, len(rows))
+                yield from rows
+
+    def enable_profiling(self, explain=True, trace=False):
+        #      SQL,  ,  
+        #     (EXPLAIN QUERY PLAN). trace=True  
+        #     sqlite3.set_trace_callback
+        profiler = self.connections.profiler or QueryProfiler(explain)
+        profiler.explain = explain
+        self.connections.set_profiler(profiler)
+        self.set_trace(profiler.record_trace if trace else None)
+        return profiler
+
+    def disable_profiling(self):
+        self.connections.set_profiler(None)
+        self.set_trace(None)
+
+    @property
+    def profiler(self):
+        return self.connections.profiler
+
+    def set_trace(self, callback):
+        # callback(sql)    ,    ; None 
+        self.connections.set_trace(callback)
+
+    def close(self):
+        if self.archiver is not None:
+            self.archiver.close()
+        self.connections.close()
+
+class WriteQueue:
+    #  :          
+    #    -     commit ( fsync)   .
+    #       ,    
+    #   .   Future     commit.
+    def __init__(self, db, window_ms=0.0, max_batch=256, history=1000):
+        self.db = db
+        #      ,    .
+        #  0    ,  ,    
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.queue = queue.Queue()
+        self.metrics = deque(maxlen=history)
+        self.metrics_lock = threading.Lock()
+        self.batches = 0
+        self.writes = 0
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="write-queue", daemon=True)
+        self.thread.start()
+
+    def submit(self, function, *args):
+        # function(*args)       
+        if self.closed:
+            raise RuntimeError("WriteQueue is closed")
+        future = Future()
+        self.queue.put((function, args, future, time.perf_counter()))
+        return future
+
+    def run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.perf_counter() + self.window
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                try:
+                    item = self.queue.get(timeout=timeout) if timeout > 0 else self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            self.commit(batch)
+        # ,       close()
+        leftovers = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                leftovers.append(item)
+        if leftovers:
+            self.commit(leftovers)
+
+    def commit(self, batch):
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        start = time.perf_counter()
+        results = []
+        try:
+            with self.db.transaction():
+                for function, args, _, _ in batch:
+                    try:
+                        with self.db.transaction():
+                            results.append((function(*args), None))
+                    except Exception as error:
+                        results.append((None, error))
+        except Exception as error:
+            # commit  :      
+            results = [(None, error)] * len(batch)
+        finished = time.perf_counter()
+        with self.metrics_lock:
+            self.batches += 1
+            self.writes += len(batch)
+            self.metrics.append(BatchMetrics(len(batch), start - batch[0][3], finished - start))
+        for (_, _, future, _), (result, error) in zip(batch, results):
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def stats(self):
+        #          ( )
+        with self.metrics_lock:
+            metrics = list(self.metrics)
+            batches, writes = self.batches, self.writes
+
+        def percentile(values, fraction):
+            if not values:
+                return 0.0
+            values = sorted(values)
+            return values[min(int(len(values) * fraction), len(values) - 1)] * 1000
+
+        sizes = [batch.size for batch in metrics]
+        commits = [batch.commit for batch in metrics]
+        waits = [batch.wait for batch in metrics]
+        return {
+            "batches": batches,
+            "writes": writes,
+            "average_batch": writes / batches if batches else 0.0,
+            "largest_batch": max(sizes, default=0),
+            "commit_p50_ms": percentile(commits, 0.5),
+            "commit_p99_ms": percentile(commits, 0.99),
+            "wait_p50_ms": percentile(waits, 0.5),
+            "wait_p99_ms": percentile(waits, 0.99),
+        }
+
+    def close(self):
+        #      
+        if not self.closed:
+            self.closed = True
+            self.queue.put(None)
+            self.thread.join()
@@ -0,0 +1,56 @@
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+
+class DatabaseExecutor(QObject):
+    # Runs database calls on worker threads so that Qt slots never wait for SQLite.
+    # Results and errors are delivered back on the GUI thread through a queued signal.
+    finished = pyqtSignal(object, object)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, db, max_workers=2):
+        super().__init__()
+        self.db = db
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db")
+        self.pending = 0
+        self.finished.connect(self.deliver)
+
+    def submit(self, function, *args, on_result=None, on_error=None):
+        # function runs on a worker thread; on_result/on_error run on the GUI thread
+        return self.track(self.pool.submit(function, *args), on_result, on_error)
+
+    def track(self, future, on_result=None, on_error=None):
+        # Delivers the outcome of a future created elsewhere (e.g. by WriteQueue) like a submitted call
+        self.pending += 1
+        if self.pending == 1:
+            self.busy_changed.emit(True)
+        future.add_done_callback(lambda done: self.finished.emit(done, (on_result, on_error)))
+        return future
+
+    def fetch_all(self, query, params=(), on_result=None, on_error=None):
+        return self.submit(self.db.fetch_all, query, params, on_result=on_result, on_error=on_error)
+
+    def fetch_one(self, query, params=(), on_result=None, on_error=None):
+        return self.submit(self.db.fetch_one, query, params, on_result=on_result, on_error=on_error)
+
+    def deliver(self, future, callbacks):
+        on_result, on_error = callbacks
+        self.pending -= 1
+        if self.pending == 0:
+            self.busy_changed.emit(False)
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            if on_error is None:
+                # An exception escaping a slot would abort the application
+                sys.excepthook(type(error), error, error.__traceback__)
+            else:
+                on_error(error)
+        elif on_result is not None:
+            on_result(future.result())
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,217 @@
+import csv
+import json
+import os
+import time
+
+from services import OrderService
+
+# Streaming import/export of products and orders in CSV or JSONL.
+# Input is read row by row and written in chunks, each chunk in its own batched
+# transaction, so memory use does not depend on the file size.
+# Orders are written one line item per record; consecutive records with the same
+# order_number form one order.
+
+PRODUCT_FIELDS = ("id", "name", "price", "quantity")
+ORDER_FIELDS = ("order_number", "product_id", "product", "quantity", "price", "status", "created_at")
+
+EXPORT_QUERIES = {
+    "products": "SELECT id, name, price, quantity FROM products ORDER BY id",
+    "orders": """
+        SELECT orders.order_number, order_items.product_id, products.name AS product,
+               order_items.quantity, order_items.price, orders.status, orders.created_at
+        FROM orders JOIN order_items ON order_items.order_id = orders.id
+        LEFT JOIN products ON products.id = order_items.product_id
+        ORDER BY orders.id, order_items.id
+    """,
+}
+
+
+class Progress:
+    # Counts processed rows and reports rows/sec at most once per interval
+    def __init__(self, callback=None, interval=1.0):
+        self.callback = callback
+        self.interval = interval
+        self.rows = 0
+        self.written = 0
+        self.skipped = 0
+        self.start = time.perf_counter()
+        self.last_report = self.start
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def rate(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def update(self, rows, force=False):
+        self.rows += rows
+        now = time.perf_counter()
+        if self.callback and (force or now - self.last_report >= self.interval):
+            self.last_report = now
+            self.callback(self)
+
+
+def file_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Unsupported file type '{extension}', expected .csv or .jsonl")
+
+
+def read_rows(path):
+    # Yields one dict per record; the file is never read as a whole
+    with open(path, newline="", encoding="utf-8") as file:
+        if file_format(path) == "csv":
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def blank(value):
+    return value is None or value == ""
+
+
+def product_params(row):
+    return (
+        None if blank(row.get("id")) else int(row["id"]),
+        str(row["name"]),
+        float(row["price"]),
+        0 if blank(row.get("quantity")) else int(row["quantity"]),
+    )
+
+
+def import_products(db, path, chunk_size=5000, progress=None):
+    # Rows with an existing id update that product, the rest are appended. A changed quantity
+    # of an existing product is recorded as an 'adjustment' stock movement, whose trigger
+    # sets the new balance; new products get their 'opening' movement from a trigger.
+    progress = progress or Progress()
+    for chunk in chunks(read_rows(path), chunk_size):
+        rows = []
+        for row in chunk:
+            try:
+                rows.append(product_params(row))
+            except (KeyError, TypeError, ValueError):
+                progress.skipped += 1
+        with db.batch(chunk_size) as batch:
+            batch.conn.executemany("""
+                INSERT INTO stock_movements (product_id, kind, quantity, note)
+                SELECT id, 'adjustment', ? - COALESCE(quantity, 0), 'import' FROM products WHERE id = ? AND COALESCE(quantity, 0) <> ?
+            """, [(quantity, product_id, quantity) for product_id, _, _, quantity in rows if product_id is not None])
+            batch.execute_many("""
+                INSERT INTO products (id, name, price, quantity) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET name = excluded.name, price = excluded.price
+            """, rows)
+        progress.written += batch.rowcount
+        progress.update(len(chunk))
+    progress.update(0, force=True)
+    return progress
+
+
+def import_orders(db, path, chunk_size=5000, progress=None):
+    # Historical orders are loaded as they are: stock is not touched and every line keeps
+    # its price. Records without a number become one-line orders numbered from the order
+    # sequence; orders whose number is already taken are skipped with all their lines.
+    progress = progress or Progress()
+    service = OrderService(db)
+    # (number, skipped) of the order the previous chunk ended with; its lines may continue
+    # into the next chunk
+    previous = None
+    for chunk in chunks(read_rows(path), chunk_size):
+        lines = []
+        for row in chunk:
+            try:
+                quantity = int(row["quantity"])
+                price = float(row["price"])
+                lines.append((
+                    None if blank(row.get("order_number")) else str(row["order_number"]),
+                    row.get("status") or "Pending",
+                    None if blank(row.get("created_at")) else row["created_at"],
+                    None if blank(row.get("product_id")) else int(row["product_id"]),
+                    row.get("product"),
+                    quantity,
+                    price / quantity if quantity else price,
+                    price,
+                ))
+            except (KeyError, TypeError, ValueError, ZeroDivisionError):
+                progress.skipped += 1
+
+        with db.batch(chunk_size) as batch:
+            numbers = iter(service.reserve_order_numbers(batch.conn, sum(line[0] is None for line in lines)))
+            lines = [(line[0] or next(numbers),) + line[1:] for line in lines]
+            continuing = previous[0] if previous else None
+            new_numbers = {line[0] for line in lines} - {continuing}
+            taken = set()
+            candidates = sorted(new_numbers)
+            for start in range(0, len(candidates), 500):
+                part = candidates[start:start + 500]
+                placeholders = ", ".join("?" * len(part))
+                taken.update(row[0] for row in batch.conn.execute(
+                    f"SELECT order_number FROM orders WHERE order_number IN ({placeholders})", part))
+            if previous is not None and previous[1]:
+                # The previous order was skipped, so are its remaining lines
+                taken.add(continuing)
+
+            accepted = [line for line in lines if line[0] not in taken]
+            created = set()
+            for line in accepted:
+                if line[0] in new_numbers and line[0] not in created:
+                    created.add(line[0])
+                    batch.execute("INSERT INTO orders (order_number, status, created_at) VALUES (?, ?, COALESCE(?, CURRENT_TIMESTAMP))",
+                                  line[:3])
+            for line in accepted:
+                batch.execute("""
+                    INSERT INTO order_items (order_id, product_id, quantity, unit_price, price)
+                    VALUES ((SELECT id FROM orders WHERE order_number = ?),
+                            COALESCE(?, (SELECT MIN(id) FROM products WHERE name = ?)), ?, ?, ?)
+                """, (line[0],) + line[3:])
+        if lines:
+            previous = (lines[-1][0], lines[-1][0] in taken)
+        progress.written += len(accepted)
+        progress.skipped += len(lines) - len(accepted)
+        progress.update(len(chunk))
+    progress.update(0, force=True)
+    return progress
+
+
+def export_table(db, table, path, chunk_size=5000, progress=None):
+    progress = progress or Progress()
+    rows = db.fetch_iter(EXPORT_QUERIES[table], size=chunk_size)
+    fields = PRODUCT_FIELDS if table == "products" else ORDER_FIELDS
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        if file_format(path) == "csv":
+            writer = csv.writer(file)
+            writer.writerow(fields)
+            write = writer.writerow
+        else:
+            def write(row):
+                file.write(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n")
+        for chunk in chunks(rows, chunk_size):
+            for row in chunk:
+                write(row)
+            progress.written += len(chunk)
+            progress.update(len(chunk))
+    progress.update(0, force=True)
+    return progress
+
+
+IMPORTERS = {
+    "products": import_products,
+    "orders": import_orders,
+}
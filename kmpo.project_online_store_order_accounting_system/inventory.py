@@ -0,0 +1,212 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+from services import ProductNotFoundError
+
+# Reads over the stock ledger (the stock_movements table, see migrations.add_stock_ledger),
+# its checkpoints and the reconciliation of the ledger against products.quantity.
+#
+# The current balance of a product is products.quantity, one row away. The balance at an
+# earlier time is the newest checkpoint before that time plus the movements after it, so
+# it adds up at most the movements between two checkpoints of the product instead of its
+# whole history. A checkpoint is written for a product once it has `spacing` movements
+# since its previous one; the checkpoint job only looks at movements it has not seen yet
+# (the 'stock_checkpoint' row in sequences), a batch of ids at a time.
+#
+# Movement ids and created_at grow together, since both are assigned at insert time;
+# balance_at() relies on that to find the movements up to a time by id.
+
+StockMovement = namedtuple("StockMovement", ["id", "product_id", "kind", "quantity", "order_id", "note", "created_at"])
+Mismatch = namedtuple("Mismatch", ["product_id", "balance", "ledger"])
+
+MOVEMENT_KINDS = ("opening", "receipt", "sale", "return", "adjustment", "correction", "removal")
+
+# Larger than any rowid
+MAX_ID = 2 ** 63 - 1
+
+MOVEMENT_SQL = "SELECT id, product_id, kind, quantity, order_id, note, created_at FROM stock_movements"
+
+# Latest checkpoint of the product in the outer query, as (movement_id, quantity) columns
+LAST_CHECKPOINT_SQL = """
+    SELECT {column} FROM stock_checkpoints AS checkpoint
+    WHERE checkpoint.product_id = {product} ORDER BY checkpoint.movement_id DESC LIMIT 1
+"""
+
+
+def last_checkpoint(product, column):
+    return f"COALESCE(({LAST_CHECKPOINT_SQL.format(column=column, product=product)}), 0)"
+
+
+class StockLedger:
+    def __init__(self, db, spacing=256, batch_size=100_000):
+        self.db = db
+        self.spacing = spacing
+        self.batch_size = batch_size
+        self.last_result = None
+        self.last_error = None
+        self.stopping = threading.Event()
+        self.thread = None
+
+    def movements(self, product_id, before_id=None, limit=100):
+        # Newest first; pass the id of the last returned movement to get the next page
+        return [StockMovement(*row) for row in self.db.fetch_all(
+            f"{MOVEMENT_SQL} WHERE product_id = ? AND id < ? ORDER BY id DESC LIMIT ?",
+            (product_id, MAX_ID if before_id is None else before_id, limit))]
+
+    def balance(self, product_id):
+        row = self.db.fetch_one("SELECT COALESCE(quantity, 0) FROM products WHERE id = ?", (product_id,))
+        if row is None:
+            raise ProductNotFoundError(f"Product {product_id} does not exist.")
+        return row[0]
+
+    def balance_at(self, product_id, moment):
+        # Balance after every movement created at or before moment ("YYYY-mm-dd HH:MM:SS")
+        with self.db.reader() as conn:
+            start = conn.execute("""
+                SELECT movement_id, quantity FROM stock_checkpoints
+                WHERE product_id = ? AND created_at <= ? ORDER BY movement_id DESC LIMIT 1
+            """, (product_id, moment)).fetchone() or (0, 0)
+            # The next checkpoint bounds the movements to add up
+            end = conn.execute("""
+                SELECT movement_id FROM stock_checkpoints
+                WHERE product_id = ? AND movement_id > ? AND created_at > ? ORDER BY movement_id LIMIT 1
+            """, (product_id, start[0], moment)).fetchone()
+            since = conn.execute("""
+                SELECT TOTAL(quantity) FROM stock_movements
+                WHERE product_id = ? AND id > ? AND id <= ? AND created_at <= ?
+            """, (product_id, start[0], end[0] if end else MAX_ID, moment)).fetchone()[0]
+        return start[1] + int(since)
+
+    def checkpoint_batch(self):
+        # Checkpoints the products with `spacing` movements since their previous checkpoint
+        # among the next batch of movements; returns (movements looked at, checkpoints written).
+        # Movements never change once written, so the checkpoints are computed on a reader and
+        # only their insert takes the write lock.
+        with self.db.reader() as conn:
+            seen = conn.execute("SELECT value FROM sequences WHERE name = 'stock_checkpoint'").fetchone()[0]
+            last = conn.execute("SELECT MAX(id) FROM stock_movements").fetchone()[0] or 0
+            high = min(last, seen + self.batch_size)
+            if high <= seen:
+                return 0, 0
+            rows = conn.execute(f"""
+                SELECT since.product_id, MAX(movement.id), since.quantity + SUM(movement.quantity), MAX(movement.created_at)
+                FROM (
+                    SELECT moved.product_id, {last_checkpoint("moved.product_id", "movement_id")} AS movement_id,
+                           {last_checkpoint("moved.product_id", "quantity")} AS quantity
+                    FROM (SELECT DISTINCT product_id FROM stock_movements WHERE id > :seen AND id <= :high) AS moved
+                ) AS since
+                JOIN stock_movements AS movement
+                    ON movement.product_id = since.product_id AND movement.id > since.movement_id AND movement.id <= :high
+                GROUP BY since.product_id
+                HAVING COUNT(*) >= :spacing
+            """, {"seen": seen, "high": high, "spacing": self.spacing}).fetchall()
+        with self.db.transaction() as conn:
+            # Another job may have done this batch meanwhile
+            if not conn.execute("UPDATE sequences SET value = ? WHERE name = 'stock_checkpoint' AND value = ?",
+                                (high, seen)).rowcount:
+                return 0, 0
+            conn.executemany("INSERT INTO stock_checkpoints (product_id, movement_id, quantity, created_at) VALUES (?, ?, ?, ?)",
+                             rows)
+        return high - seen, len(rows)
+
+    def checkpoint(self):
+        movements = written = 0
+        while not self.stopping.is_set():
+            seen, count = self.checkpoint_batch()
+            if not seen:
+                break
+            movements += seen
+            written += count
+        return movements, written
+
+    def reconcile(self, full=False, fix=False):
+        # Compares every product's balance with its ledger, read from one snapshot. The quick
+        # pass starts from each product's latest checkpoint; the full pass adds up the whole
+        # ledger and also checks every checkpoint against the previous one and the movements since.
+        # fix=True records a 'correction' for each product whose ledger disagrees with the
+        # balance (the balance is what has been sold from) and drops the wrong checkpoints.
+        start = time.perf_counter()
+        with self.db.reader() as conn:
+            if full:
+                rows = conn.execute("""
+                    SELECT products.id, COALESCE(products.quantity, 0), COALESCE(ledger.total, 0)
+                    FROM products LEFT JOIN (
+                        SELECT product_id, SUM(quantity) AS total FROM stock_movements GROUP BY product_id
+                    ) AS ledger ON ledger.product_id = products.id
+                """).fetchall()
+                # Each checkpoint against the one before it and the movements in between
+                bad_checkpoints = conn.execute("""
+                    SELECT product_id FROM (
+                        SELECT product_id, movement_id, quantity, LAG(movement_id, 1, 0) OVER previous AS previous_id,
+                               LAG(quantity, 1, 0) OVER previous AS previous_quantity
+                        FROM stock_checkpoints WINDOW previous AS (PARTITION BY product_id ORDER BY movement_id)
+                    ) AS checkpoint
+                    WHERE quantity <> previous_quantity + (
+                        SELECT COALESCE(SUM(quantity), 0) FROM stock_movements
+                        WHERE product_id = checkpoint.product_id AND id > previous_id AND id <= movement_id)
+                    GROUP BY product_id
+                """).fetchall()
+            else:
+                rows = conn.execute(f"""
+                    SELECT id, COALESCE(quantity, 0), {last_checkpoint("products.id", "quantity")} + (
+                        SELECT COALESCE(SUM(quantity), 0) FROM stock_movements
+                        WHERE product_id = products.id AND id > {last_checkpoint("products.id", "movement_id")})
+                    FROM products
+                """).fetchall()
+                bad_checkpoints = []
+        mismatches = [Mismatch(*row) for row in rows if row[1] != row[2]]
+        if fix and (mismatches or bad_checkpoints):
+            self.fix([mismatch.product_id for mismatch in mismatches], [row[0] for row in bad_checkpoints])
+        self.last_result = {
+            "full": full,
+            "products": len(rows),
+            "mismatches": len(mismatches),
+            "bad_checkpoints": len(bad_checkpoints),
+            "fixed": fix,
+            "seconds": time.perf_counter() - start,
+        }
+        return mismatches
+
+    def fix(self, product_ids, checkpoint_product_ids):
+        # Compared again under the write lock: the snapshot may be behind by a few sales
+        with self.db.transaction() as conn:
+            conn.executemany("DELETE FROM stock_checkpoints WHERE product_id = ?",
+                             [(product_id,) for product_id in checkpoint_product_ids])
+            conn.executemany("""
+                INSERT INTO stock_movements (product_id, kind, quantity, note)
+                SELECT id, 'correction', balance - ledger, 'reconcile' FROM (
+                    SELECT id, COALESCE(quantity, 0) AS balance,
+                           (SELECT COALESCE(SUM(quantity), 0) FROM stock_movements WHERE product_id = products.id) AS ledger
+                    FROM products WHERE id = ?
+                ) WHERE balance <> ledger
+            """, [(product_id,) for product_id in product_ids])
+
+    def start(self, interval=3600.0):
+        # Background job: new checkpoints, then the quick reconciliation, once per interval
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, args=(interval,), name="stock-ledger", daemon=True)
+            self.thread.start()
+
+    def run(self, interval):
+        while not self.stopping.is_set():
+            try:
+                self.checkpoint()
+                self.reconcile()
+                self.last_error = None
+            except sqlite3.Error as error:
+                self.last_error = error
+            self.stopping.wait(interval)
+
+    def stats(self):
+        return {
+            "last_result": self.last_result,
+            "last_error": None if self.last_error is None else str(self.last_error),
+        }
+
+    def close(self):
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
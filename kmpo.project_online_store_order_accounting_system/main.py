@@ -4,7 +4,8 @@ from ui_main import MainApp
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
-    window = MainApp()
+    # --query-profile: collect the query profile (Diagnostics menu) from the start
+    window = MainApp(query_profile="--query-profile" in sys.argv[1:])
     window.show()
     sys.exit(app.exec())
 
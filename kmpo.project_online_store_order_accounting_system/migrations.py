@@ -0,0 +1,520 @@
+import sqlite3
+
+# Schema migrations, applied in order. The number of the last applied migration
+# is stored in PRAGMA user_version, so every migration runs exactly once per file.
+
+
+def create_base_tables(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS orders (
+        id INTEGER PRIMARY KEY,
+        order_number TEXT,
+        product_name TEXT,
+        quantity INTEGER,
+        price REAL,
+        status TEXT
+    )
+    """)
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS products (
+        id INTEGER PRIMARY KEY,
+        name TEXT,
+        price REAL,
+        quantity INTEGER DEFAULT 0
+    )
+    """)
+
+    # Old databases were created without the 'quantity' column
+    column_names = [column[1] for column in conn.execute("PRAGMA table_info(products)")]
+    if 'quantity' not in column_names:
+        conn.execute("ALTER TABLE products ADD COLUMN quantity INTEGER DEFAULT 0")
+
+
+# created_at of orders placed before it was recorded; far enough back to be recognized
+# as such in the reports, and archived into orders_0001.db once finished
+LEGACY_CREATED_AT = "0001-01-01 00:00:00"
+
+
+def link_orders_to_products(conn):
+    # Replace the denormalized product_name with a product_id reference and add created_at.
+    # Duplicate order numbers left by the old COUNT(*)+1 numbering get the row id appended.
+    # A name that matches no product becomes a placeholder product without stock, priced as
+    # in its last order, so that what was sold is still known; the old orders get LEGACY_CREATED_AT.
+    conn.execute("""
+    INSERT INTO products (name, price, quantity)
+    SELECT product_name,
+           COALESCE((SELECT CASE WHEN last.quantity > 0 THEN last.price / last.quantity END FROM orders AS last
+                     WHERE last.product_name = orders.product_name ORDER BY last.id DESC LIMIT 1), 0),
+           0
+    FROM orders
+    WHERE product_name IS NOT NULL AND product_name NOT IN (SELECT name FROM products WHERE name IS NOT NULL)
+    GROUP BY product_name ORDER BY MIN(id)
+    """)
+    conn.execute("""
+    CREATE TABLE orders_new (
+        id INTEGER PRIMARY KEY,
+        order_number TEXT NOT NULL,
+        product_id INTEGER REFERENCES products(id),
+        quantity INTEGER,
+        price REAL,
+        status TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    INSERT INTO orders_new (id, order_number, product_id, quantity, price, status, created_at)
+    SELECT o.id,
+           CASE WHEN o.duplicate > 1 THEN o.number || '-' || o.id ELSE o.number END,
+           p.id, o.quantity, o.price, o.status, ?
+    FROM (
+        SELECT *, COALESCE(order_number, 'ORD-' || id) AS number,
+               ROW_NUMBER() OVER (PARTITION BY COALESCE(order_number, 'ORD-' || id) ORDER BY id) AS duplicate
+        FROM orders
+    ) AS o
+    LEFT JOIN (SELECT name, MIN(id) AS id FROM products GROUP BY name) AS p ON p.name = o.product_name
+    """, (LEGACY_CREATED_AT,))
+    conn.execute("DROP TABLE orders")
+    conn.execute("ALTER TABLE orders_new RENAME TO orders")
+
+    conn.execute("CREATE UNIQUE INDEX idx_orders_order_number ON orders(order_number)")
+    conn.execute("CREATE INDEX idx_orders_product_id ON orders(product_id)")
+    conn.execute("CREATE INDEX idx_orders_status ON orders(status)")
+    conn.execute("CREATE INDEX idx_orders_created_at ON orders(created_at)")
+
+
+def add_sequences(conn):
+    # Monotonic counters; order numbers no longer depend on COUNT(*) of existing rows
+    conn.execute("""
+    CREATE TABLE sequences (
+        name TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT INTO sequences (name, value)
+    SELECT 'order_number', MAX(
+        COALESCE((SELECT MAX(id) FROM orders), 0),
+        COALESCE((SELECT MAX(CAST(SUBSTR(order_number, 5) AS INTEGER)) FROM orders WHERE order_number LIKE 'ORD-%'), 0)
+    )
+    """)
+
+
+def add_product_name_index(conn):
+    # Imports resolve products by name
+    conn.execute("CREATE INDEX idx_products_name ON products(name)")
+
+
+def add_search_indexes(conn):
+    # Indexes for sorting the orders table and a full-text index over product names.
+    # idx_orders_status keeps the status filter in id order; (status, price) serves it sorted by price.
+    # products_fts is an external-content table kept in sync by triggers; it is only
+    # created when the SQLite library was built with FTS5.
+    conn.execute("CREATE INDEX idx_orders_price ON orders(price)")
+    conn.execute("CREATE INDEX idx_orders_quantity ON orders(quantity)")
+    conn.execute("CREATE INDEX idx_orders_status_price ON orders(status, price)")
+    if not conn.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')").fetchone()[0]:
+        return
+    conn.execute("CREATE VIRTUAL TABLE products_fts USING fts5(name, content='products', content_rowid='id')")
+    conn.execute("""
+    CREATE TRIGGER products_fts_insert AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER products_fts_delete AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+    END
+    """)
+    # Stock changes and re-imports that keep the name do not touch the index
+    conn.execute("""
+    CREATE TRIGGER products_fts_update AFTER UPDATE OF name ON products WHEN old.name IS NOT new.name BEGIN
+        INSERT INTO products_fts (products_fts, rowid, name) VALUES ('delete', old.id, old.name);
+        INSERT INTO products_fts (rowid, name) VALUES (new.id, new.name);
+    END
+    """)
+    conn.execute("INSERT INTO products_fts (products_fts) VALUES ('rebuild')")
+
+
+SUMMARY_TABLES = {
+    # table: (key column, expression over an orders row)
+    "product_sales": ("product_id", "COALESCE({row}.product_id, 0)"),
+    "daily_sales": ("day", "COALESCE(date({row}.created_at), '')"),
+}
+
+
+def summary_add_sql(table, row, sign):
+    key, expression = SUMMARY_TABLES[table]
+    key_value = expression.format(row=row)
+    return f"""
+    INSERT INTO {table} ({key}, status, orders, quantity, revenue)
+    VALUES ({key_value}, COALESCE({row}.status, ''), {sign}1, {sign}COALESCE({row}.quantity, 0), {sign}COALESCE({row}.price, 0))
+    ON CONFLICT ({key}, status) DO UPDATE SET
+        orders = orders + excluded.orders,
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue;
+    """
+
+
+def rebuild_sales_summaries(conn):
+    # Recomputes the summary tables from orders; the triggers keep them current afterwards
+    for table, (key, expression) in SUMMARY_TABLES.items():
+        key_value = expression.format(row="orders")
+        conn.execute(f"DELETE FROM {table}")
+        conn.execute(f"""
+        INSERT INTO {table} ({key}, status, orders, quantity, revenue)
+        SELECT {key_value}, COALESCE(status, ''), COUNT(*), TOTAL(quantity), TOTAL(price)
+        FROM orders GROUP BY 1, 2
+        """)
+
+
+def add_sales_summaries(conn):
+    # Aggregates per (product, status) and per (day, status), maintained by triggers on orders,
+    # so they change in the same transaction as the order itself and reports read O(groups) rows.
+    # Groups that drop to zero orders are kept; reports filter them out.
+    for table, (key, _) in SUMMARY_TABLES.items():
+        key_type = "INTEGER" if key == "product_id" else "TEXT"
+        conn.execute(f"""
+        CREATE TABLE {table} (
+            {key} {key_type} NOT NULL,
+            status TEXT NOT NULL,
+            orders INTEGER NOT NULL,
+            quantity INTEGER NOT NULL,
+            revenue REAL NOT NULL,
+            PRIMARY KEY ({key}, status)
+        )
+        """)
+    add_new = "".join(summary_add_sql(table, "new", "") for table in SUMMARY_TABLES)
+    remove_old = "".join(summary_add_sql(table, "old", "-") for table in SUMMARY_TABLES)
+    conn.execute(f"CREATE TRIGGER orders_sales_insert AFTER INSERT ON orders BEGIN {add_new} END")
+    conn.execute(f"CREATE TRIGGER orders_sales_delete AFTER DELETE ON orders BEGIN {remove_old} END")
+    conn.execute(f"""
+    CREATE TRIGGER orders_sales_update AFTER UPDATE OF product_id, quantity, price, status, created_at ON orders
+    BEGIN {remove_old} {add_new} END
+    """)
+    rebuild_sales_summaries(conn)
+    # Low-stock alerts read the products below a threshold
+    conn.execute("CREATE INDEX idx_products_quantity ON products(quantity)")
+
+
+def product_sales_sql(source, sign):
+    # source selects (product_id, status, quantity, price) order lines to add to product_sales,
+    # or with sign "-" to remove from it
+    return f"""
+    INSERT INTO product_sales (product_id, status, orders, quantity, revenue)
+    SELECT COALESCE(product_id, 0), COALESCE(status, ''), {sign}1, {sign}quantity, {sign}price FROM ({source}) WHERE true
+    ON CONFLICT (product_id, status) DO UPDATE SET
+        orders = orders + excluded.orders,
+        quantity = quantity + excluded.quantity,
+        revenue = revenue + excluded.revenue;
+    """
+
+
+def line_sales_sql(row, sign):
+    # One order line under the status of its order; nothing when the order is already gone
+    return product_sales_sql(f"""
+        SELECT {row}.product_id AS product_id, orders.status AS status, {row}.quantity AS quantity, {row}.price AS price
+        FROM orders WHERE orders.id = {row}.order_id""", sign)
+
+
+def order_sales_sql(status, sign):
+    # Every line of the order the trigger fired for, under the given status
+    return product_sales_sql(f"""
+        SELECT product_id, {status} AS status, quantity, price FROM order_items WHERE order_id = old.id""", sign)
+
+
+def add_order_items(conn):
+    # An order becomes a header (number, status, date, totals) with one order_items row per
+    # product. Every existing order turns into a one-line order with the same totals.
+    # The header totals are kept equal to the sum of the lines by triggers, so the orders
+    # grid, its price/quantity indexes and daily_sales keep working on the header alone.
+    # product_sales is now fed by the lines; orders_sales_* only maintain daily_sales.
+    conn.execute("""
+    CREATE TABLE order_items (
+        id INTEGER PRIMARY KEY,
+        order_id INTEGER NOT NULL REFERENCES orders(id),
+        product_id INTEGER REFERENCES products(id),
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        price REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT INTO order_items (order_id, product_id, quantity, unit_price, price)
+    SELECT id, product_id, COALESCE(quantity, 0),
+           CASE WHEN quantity > 0 THEN COALESCE(price, 0) / quantity ELSE COALESCE(price, 0) END,
+           COALESCE(price, 0)
+    FROM orders ORDER BY id
+    """)
+
+    # Dropping the table also drops its indexes and the orders_sales_* triggers
+    conn.execute("""
+    CREATE TABLE orders_new (
+        id INTEGER PRIMARY KEY,
+        order_number TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        price REAL NOT NULL DEFAULT 0,
+        status TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    INSERT INTO orders_new (id, order_number, quantity, price, status, created_at)
+    SELECT id, order_number, COALESCE(quantity, 0), COALESCE(price, 0), status, created_at FROM orders
+    """)
+    conn.execute("DROP TABLE orders")
+    conn.execute("ALTER TABLE orders_new RENAME TO orders")
+    create_order_indexes(conn)
+    create_order_triggers(conn)
+
+    conn.execute("DELETE FROM product_sales")
+    conn.execute("""
+    INSERT INTO product_sales (product_id, status, orders, quantity, revenue)
+    SELECT COALESCE(order_items.product_id, 0), COALESCE(orders.status, ''), COUNT(*),
+           TOTAL(order_items.quantity), TOTAL(order_items.price)
+    FROM order_items JOIN orders ON orders.id = order_items.order_id
+    GROUP BY 1, 2
+    """)
+
+
+def create_order_indexes(conn):
+    conn.execute("CREATE UNIQUE INDEX idx_orders_order_number ON orders(order_number)")
+    conn.execute("CREATE INDEX idx_orders_status ON orders(status)")
+    conn.execute("CREATE INDEX idx_orders_created_at ON orders(created_at)")
+    conn.execute("CREATE INDEX idx_orders_price ON orders(price)")
+    conn.execute("CREATE INDEX idx_orders_quantity ON orders(quantity)")
+    conn.execute("CREATE INDEX idx_orders_status_price ON orders(status, price)")
+    conn.execute("CREATE INDEX idx_order_items_order_id ON order_items(order_id)")
+    conn.execute("CREATE INDEX idx_order_items_product_id ON order_items(product_id)")
+
+
+def create_order_triggers(conn):
+    # Header totals follow the lines
+    conn.execute("""
+    CREATE TRIGGER order_items_insert AFTER INSERT ON order_items BEGIN
+        UPDATE orders SET quantity = quantity + new.quantity, price = price + new.price WHERE id = new.order_id;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER order_items_delete AFTER DELETE ON order_items BEGIN
+        UPDATE orders SET quantity = quantity - old.quantity, price = price - old.price WHERE id = old.order_id;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER order_items_update AFTER UPDATE OF order_id, quantity, price ON order_items BEGIN
+        UPDATE orders SET quantity = quantity - old.quantity, price = price - old.price WHERE id = old.order_id;
+        UPDATE orders SET quantity = quantity + new.quantity, price = price + new.price WHERE id = new.order_id;
+    END
+    """)
+
+    # product_sales per line, under the status of its order. The line triggers only see
+    # lines of an existing order; a deleted order removes its lines from the summary
+    # itself and then deletes them.
+    conn.execute(f"CREATE TRIGGER order_items_sales_insert AFTER INSERT ON order_items BEGIN {line_sales_sql('new', '')} END")
+    conn.execute(f"CREATE TRIGGER order_items_sales_delete AFTER DELETE ON order_items BEGIN {line_sales_sql('old', '-')} END")
+    conn.execute(f"""
+    CREATE TRIGGER order_items_sales_update AFTER UPDATE OF order_id, product_id, quantity, price ON order_items
+    BEGIN {line_sales_sql('old', '-')} {line_sales_sql('new', '')} END
+    """)
+
+    add_day = summary_add_sql("daily_sales", "new", "")
+    remove_day = summary_add_sql("daily_sales", "old", "-")
+    conn.execute(f"CREATE TRIGGER orders_sales_insert AFTER INSERT ON orders BEGIN {add_day} END")
+    conn.execute(f"""
+    CREATE TRIGGER orders_sales_delete AFTER DELETE ON orders BEGIN
+        {remove_day}
+        {order_sales_sql("old.status", "-")}
+        DELETE FROM order_items WHERE order_id = old.id;
+    END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER orders_sales_update AFTER UPDATE OF quantity, price, status, created_at ON orders
+    BEGIN {remove_day} {add_day} END
+    """)
+    conn.execute(f"""
+    CREATE TRIGGER orders_status_update AFTER UPDATE OF status ON orders WHEN old.status IS NOT new.status BEGIN
+        {order_sales_sql("old.status", "-")}
+        {order_sales_sql("new.status", "")}
+    END
+    """)
+
+
+def add_stock_ledger(conn):
+    # Every stock change becomes an append-only row in stock_movements (signed quantity);
+    # products.quantity stays as the materialized balance, moved by a trigger in the same
+    # statement, so SUM(stock_movements.quantity) per product equals products.quantity.
+    # 'opening' records the quantity a product was created with, 'correction' a difference
+    # found by reconciliation and 'removal' zeroes the ledger of a deleted product; those
+    # three only record what the balance already is and do not move it.
+    conn.execute("""
+    CREATE TABLE stock_movements (
+        id INTEGER PRIMARY KEY,
+        product_id INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK (kind IN ('opening', 'receipt', 'sale', 'return', 'adjustment', 'correction', 'removal')),
+        quantity INTEGER NOT NULL,
+        order_id INTEGER,
+        note TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    # A product's history and its movements after a checkpoint, in id order; quantity is in
+    # the index so that balances are added up without reading the table
+    conn.execute("CREATE INDEX idx_stock_movements_product_id ON stock_movements(product_id, id, quantity)")
+    conn.execute("CREATE INDEX idx_stock_movements_order_id ON stock_movements(order_id) WHERE order_id IS NOT NULL")
+
+    conn.execute("""
+    CREATE TRIGGER stock_movements_no_update BEFORE UPDATE ON stock_movements BEGIN
+        SELECT RAISE(ABORT, 'Stock movements cannot be changed; record a new movement instead.');
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER stock_movements_no_delete BEFORE DELETE ON stock_movements BEGIN
+        SELECT RAISE(ABORT, 'Stock movements cannot be deleted; record a new movement instead.');
+    END
+    """)
+    # The last guard against overselling, whoever writes the sale
+    conn.execute("""
+    CREATE TRIGGER stock_movements_sale_check BEFORE INSERT ON stock_movements
+    WHEN new.kind = 'sale' AND (SELECT COALESCE(quantity, 0) FROM products WHERE id = new.product_id) < -new.quantity
+    BEGIN
+        SELECT RAISE(ABORT, 'Not enough product in stock to complete this order.');
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER stock_movements_balance AFTER INSERT ON stock_movements
+    WHEN new.kind NOT IN ('opening', 'correction', 'removal')
+    BEGIN
+        UPDATE products SET quantity = COALESCE(quantity, 0) + new.quantity WHERE id = new.product_id;
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER products_stock_opening AFTER INSERT ON products WHEN COALESCE(new.quantity, 0) <> 0 BEGIN
+        INSERT INTO stock_movements (product_id, kind, quantity) VALUES (new.id, 'opening', new.quantity);
+    END
+    """)
+    # A product id can be given out again after the product with the largest id is deleted
+    conn.execute("""
+    CREATE TRIGGER products_stock_removal AFTER DELETE ON products BEGIN
+        INSERT INTO stock_movements (product_id, kind, quantity)
+        SELECT old.id, 'removal', -total FROM (SELECT CAST(TOTAL(quantity) AS INTEGER) AS total
+                                               FROM stock_movements WHERE product_id = old.id)
+        WHERE total <> 0;
+    END
+    """)
+
+    # Balance of a product after the movement movement_id, so that the balance at a point in
+    # time only adds up the movements since the checkpoint before it (see inventory.py)
+    conn.execute("""
+    CREATE TABLE stock_checkpoints (
+        product_id INTEGER NOT NULL,
+        movement_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        created_at TEXT NOT NULL,
+        PRIMARY KEY (product_id, movement_id)
+    ) WITHOUT ROWID
+    """)
+    # The last movement the checkpoint job has looked at
+    conn.execute("INSERT INTO sequences (name, value) VALUES ('stock_checkpoint', 0)")
+
+    conn.execute("""
+    INSERT INTO stock_movements (product_id, kind, quantity)
+    SELECT id, 'opening', quantity FROM products WHERE COALESCE(quantity, 0) <> 0 ORDER BY id
+    """)
+
+
+def raise_id_sequence(conn, table, used):
+    # The next AUTOINCREMENT id of the table will be above used
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    if row is None:
+        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, used))
+    elif row[0] < used:
+        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (used, table))
+
+
+def add_monotonic_ids(conn):
+    # Order and line ids are never given out again, also after the newest orders are deleted
+    # or archived: stock_movements and the archive files refer to them. With AUTOINCREMENT the
+    # largest id ever used is kept in sqlite_sequence. Both tables are rebuilt, so their
+    # triggers are dropped first and created again with the indexes afterwards.
+    for (name,) in conn.execute("""
+        SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name IN ('orders', 'order_items')
+    """).fetchall():
+        conn.execute(f"DROP TRIGGER {name}")
+    conn.execute("""
+    CREATE TABLE orders_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_number TEXT NOT NULL,
+        quantity INTEGER NOT NULL DEFAULT 0,
+        price REAL NOT NULL DEFAULT 0,
+        status TEXT,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    """)
+    conn.execute("""
+    INSERT INTO orders_new (id, order_number, quantity, price, status, created_at)
+    SELECT id, order_number, quantity, price, status, created_at FROM orders ORDER BY id
+    """)
+    conn.execute("""
+    CREATE TABLE order_items_new (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        order_id INTEGER NOT NULL REFERENCES orders(id),
+        product_id INTEGER REFERENCES products(id),
+        quantity INTEGER NOT NULL,
+        unit_price REAL NOT NULL,
+        price REAL NOT NULL
+    )
+    """)
+    conn.execute("""
+    INSERT INTO order_items_new (id, order_id, product_id, quantity, unit_price, price)
+    SELECT id, order_id, product_id, quantity, unit_price, price FROM order_items ORDER BY id
+    """)
+    conn.execute("DROP TABLE orders")
+    conn.execute("DROP TABLE order_items")
+    conn.execute("ALTER TABLE orders_new RENAME TO orders")
+    conn.execute("ALTER TABLE order_items_new RENAME TO order_items")
+    create_order_indexes(conn)
+    create_order_triggers(conn)
+    # Deleted orders may have had larger ids; their stock movements still carry them.
+    # Ids used by archived orders are reserved by the archiver when it opens the files.
+    raise_id_sequence(conn, "orders", conn.execute("SELECT COALESCE(MAX(order_id), 0) FROM stock_movements").fetchone()[0])
+
+
+MIGRATIONS = [
+    create_base_tables,
+    link_orders_to_products,
+    add_sequences,
+    add_product_name_index,
+    add_search_indexes,
+    add_sales_summaries,
+    add_order_items,
+    add_stock_ledger,
+    add_monotonic_ids,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    # Nothing to lock when the file is already up to date: one PRAGMA on every start
+    version = schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    # Each migration runs in its own transaction together with the user_version bump.
+    # The version is re-read under the write lock in case another process migrated first.
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if version >= SCHEMA_VERSION:
+                conn.commit()
+                return version
+            MIGRATIONS[version](conn)
+            conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
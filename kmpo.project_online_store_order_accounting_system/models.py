@@ -0,0 +1,662 @@
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+from PyQt6.QtGui import QColor, QFont
+
+from database import INSERTED, UPDATED, DELETED, RESET, PRODUCT_NAMES
+from services import ProductEdit
+
+
+def prefix_end(prefix):
+    # Smallest string greater than every string starting with prefix, for index range scans
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def fts_query(text):
+    # Every word is quoted, so user input cannot inject FTS5 syntax, and matched as a prefix
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in text.split())
+
+
+class SqlTableModel(QAbstractTableModel):
+    # Rows are fetched lazily in keyset-paginated batches: WHERE (key, id) > (last key, last id)
+    # ORDER BY key, id, so a page never needs an OFFSET. Rows with a NULL key are paged
+    # separately and come last in both directions. The optional filter is a plain WHERE
+    # condition combined with the keyset condition.
+    # Only the row ids (and sort keys) are kept for every fetched row; the row data itself lives in a
+    # bounded LRU cache of pages and is re-read by id when an evicted page is shown again.
+    # Row-level change events from Database are applied as single-row model updates.
+    # With an executor every query runs on a worker thread and the rows are filled in
+    # when the result arrives; without one the model queries synchronously.
+    table = None
+    joins = ""
+    columns = ()
+    headers = ()
+    # Columns without an index-friendly sort key; clicking their header keeps the current order
+    unsortable_columns = ()
+
+    changed = pyqtSignal(object)
+
+    def __init__(self, db, page_size=200, max_pages=50, executor=None):
+        super().__init__()
+        self.db = db
+        self.executor = executor
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.row_ids = array('q')
+        self.row_keys = []
+        self.pages = OrderedDict()
+        self.loading_pages = set()
+        self.has_more = True
+        self.fetching = False
+        self.missed_inserts = False
+        # None sorts by id
+        self.sort_column = None
+        self.descending = False
+        self.where = ""
+        self.where_params = ()
+        # (segment, last key, last id) of the last fetched row
+        self.cursor = (0, None, None)
+        # Bumped on reload, so results of queries started before it are dropped
+        self.generation = 0
+        self.changed.connect(self.apply_change)
+        db.subscribe(self.on_change)
+
+    def on_change(self, change):
+        # Database may commit on a worker thread; the signal hands the event to the model's thread
+        self.changed.emit(change)
+
+    def run(self, function, args, on_result):
+        generation = self.generation
+
+        def deliver(result):
+            if generation == self.generation:
+                on_result(result)
+
+        if self.executor is None:
+            deliver(function(*args))
+        else:
+            self.executor.submit(function, *args, on_result=deliver)
+
+    def select_sql(self):
+        return f"SELECT {self.table}.id, {', '.join(self.columns)} FROM {self.table}{self.joins}"
+
+    def format_value(self, column, value):
+        return "" if value is None else str(value)
+
+    def reload(self):
+        self.beginResetModel()
+        self.generation += 1
+        self.row_ids = array('q')
+        self.row_keys = []
+        self.pages.clear()
+        self.loading_pages.clear()
+        self.has_more = True
+        self.fetching = False
+        self.missed_inserts = False
+        self.cursor = (0, None, None)
+        self.endResetModel()
+        if self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def set_filter(self, where, params=()):
+        params = tuple(params)
+        if (where, params) != (self.where, self.where_params):
+            self.where = where
+            self.where_params = params
+            self.reload()
+
+    def sort(self, column, order=Qt.SortOrder.AscendingOrder):
+        # Called by QTableView when a header is clicked; column -1 restores the id order
+        if column in self.unsortable_columns:
+            return
+        sort_column = column if 0 <= column < len(self.columns) else None
+        descending = order == Qt.SortOrder.DescendingOrder
+        if (sort_column, descending) != (self.sort_column, self.descending):
+            self.sort_column = sort_column
+            self.descending = descending
+            self.reload()
+
+    def id_ordered(self):
+        return self.sort_column is None and not self.descending
+
+    def segments(self):
+        return ("id",) if self.sort_column is None else ("value", "null")
+
+    def segment_of(self, key):
+        if self.sort_column is None:
+            return 0
+        return self.segments().index("null" if key is None else "value")
+
+    def key_of(self, values):
+        # values are the selected columns without the leading id
+        return None if self.sort_column is None else values[self.sort_column]
+
+    def key_at(self, row):
+        return None if self.sort_column is None else self.row_keys[row]
+
+    def page_query(self, segment, last_key, last_id, limit):
+        key = None if self.sort_column is None else self.columns[self.sort_column]
+        id_column = f"{self.table}.id"
+        comparison = "<" if self.descending else ">"
+        direction = " DESC" if self.descending else ""
+        conditions = [f"({self.where})"] if self.where else []
+        params = list(self.where_params)
+        if segment == "value":
+            # Same as IS NOT NULL (every number, string and blob sorts above -inf), but a range
+            # lets SQLite walk an index on the key, also through a LEFT JOIN
+            conditions.append(f"{key} >= ?")
+            params.append(float("-inf"))
+            if last_id is not None:
+                conditions.append(f"({key}, {id_column}) {comparison} (?, ?)")
+                params += [last_key, last_id]
+            order = f"{key}{direction}, {id_column}{direction}"
+        else:
+            if segment == "null":
+                conditions.append(f"{key} IS NULL")
+            if last_id is not None:
+                conditions.append(f"{id_column} {comparison} ?")
+                params.append(last_id)
+            order = f"{id_column}{direction}"
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return f"{self.select_sql()}{where} ORDER BY {order} LIMIT ?", params + [limit]
+
+    def fetch_rows(self, cursor, limit):
+        # Continues from cursor through the remaining segments until limit rows are read.
+        # Returns the rows, the new cursor and whether the last segment is exhausted.
+        segments = self.segments()
+        segment, last_key, last_id = cursor
+        rows = []
+        while True:
+            sql, params = self.page_query(segments[segment], last_key, last_id, limit - len(rows))
+            part = self.db.fetch_all(sql, params)
+            rows.extend(part)
+            if part:
+                last_key, last_id = self.key_of(part[-1][1:]), part[-1][0]
+            if len(rows) == limit:
+                return rows, (segment, last_key, last_id), False
+            if segment + 1 == len(segments):
+                return rows, (segment, last_key, last_id), True
+            segment, last_key, last_id = segment + 1, None, None
+
+    def row_id(self, row):
+        return self.row_ids[row]
+
+    def position(self, row_id):
+        if self.id_ordered():
+            row = bisect_left(self.row_ids, row_id)
+            if row < len(self.row_ids) and self.row_ids[row] == row_id:
+                return row
+            return None
+        try:
+            return self.row_ids.index(row_id)
+        except ValueError:
+            return None
+
+    def insert_position(self, key, row_id):
+        # Binary search in the model order, NULL keys last
+        def sort_tuple(key, row_id):
+            return ((key is None) != self.descending, key, row_id)
+
+        target = sort_tuple(key, row_id)
+        low, high = 0, len(self.row_ids)
+        while low < high:
+            middle = (low + high) // 2
+            current = sort_tuple(self.key_at(middle), self.row_ids[middle])
+            if (current > target) if self.descending else (current < target):
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.row_ids)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.headers[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.has_more or self.fetching:
+            return
+        self.fetching = True
+        self.run(self.fetch_rows, (self.cursor, self.page_size), self.append_rows)
+
+    def append_rows(self, result):
+        rows, self.cursor, exhausted = result
+        self.fetching = False
+        self.has_more = not exhausted
+        if self.missed_inserts and not self.has_more:
+            # Rows inserted while the query was running may have missed its snapshot
+            self.has_more = True
+        self.missed_inserts = False
+        if not rows:
+            return
+
+        first = len(self.row_ids)
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        self.row_ids.extend(row[0] for row in rows)
+        if self.sort_column is not None:
+            self.row_keys.extend(self.key_of(row[1:]) for row in rows)
+        self.endInsertRows()
+
+        # Fetched rows go straight to the page cache, so they are not re-read on paint
+        groups = {}
+        for offset, row in enumerate(rows):
+            groups.setdefault((first + offset) // self.page_size, {})[row[0]] = row[1:]
+        for page, page_rows in groups.items():
+            if page in self.pages:
+                self.pages[page].update(page_rows)
+            self.store_page(page, self.pages.get(page, page_rows))
+
+    def store_page(self, page, rows):
+        self.pages[page] = rows
+        self.pages.move_to_end(page)
+        while len(self.pages) > self.max_pages:
+            self.pages.popitem(last=False)
+
+    def load_page(self, page):
+        if page in self.loading_pages:
+            return
+        self.loading_pages.add(page)
+        ids = tuple(self.row_ids[page * self.page_size:(page + 1) * self.page_size])
+        placeholders = ", ".join("?" * len(ids))
+        self.run(self.db.fetch_all,
+                 (f"{self.select_sql()} WHERE {self.table}.id IN ({placeholders})", ids),
+                 lambda rows: self.page_loaded(page, ids, rows))
+
+    def page_loaded(self, page, ids, rows):
+        self.loading_pages.discard(page)
+        page_rows = dict.fromkeys(ids)
+        page_rows.update((row[0], row[1:]) for row in rows)
+        self.store_page(page, page_rows)
+        if self.executor is not None and self.row_ids:
+            first = min(page * self.page_size, len(self.row_ids) - 1)
+            last = min((page + 1) * self.page_size, len(self.row_ids)) - 1
+            self.dataChanged.emit(self.index(first, 0), self.index(last, self.columnCount() - 1))
+
+    def row_data(self, row):
+        page = row // self.page_size
+        row_id = self.row_ids[row]
+        page_rows = self.pages.get(page)
+        if page_rows is None or row_id not in page_rows:
+            # The page is not cached or was cached only partially
+            self.load_page(page)
+            page_rows = self.pages.get(page)
+            if page_rows is None:
+                return None
+        else:
+            self.pages.move_to_end(page)
+        return page_rows.get(row_id)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        values = self.row_data(index.row())
+        if values is None:
+            return None
+        return self.format_value(index.column(), values[index.column()])
+
+    def apply_change(self, change):
+        if change.table != self.table:
+            return
+        if change.kind == RESET:
+            self.reload()
+        elif change.kind == INSERTED:
+            self.insert_row(change.rowid)
+        elif change.kind == UPDATED:
+            self.update_row(change.rowid)
+        elif change.kind == DELETED:
+            self.remove_row(change.rowid)
+
+    def fetch_row(self, row_id):
+        # None when the row is gone or does not match the filter
+        where = f" AND ({self.where})" if self.where else ""
+        row = self.db.fetch_one(f"{self.select_sql()} WHERE {self.table}.id = ?{where}",
+                                (row_id,) + self.where_params)
+        return None if row is None else row[1:]
+
+    def cache_row(self, row, row_id, values):
+        page = self.pages.get(row // self.page_size)
+        if page is not None:
+            page[row_id] = values
+
+    def insert_row(self, row_id):
+        if self.id_ordered() and bisect_left(self.row_ids, row_id) == len(self.row_ids) and self.has_more:
+            # The row is beyond the fetched window and will arrive with the next fetchMore
+            self.missed_inserts = self.missed_inserts or self.fetching
+            return
+        self.run(self.fetch_row, (row_id,), lambda values: self.row_inserted(row_id, values))
+
+    def row_inserted(self, row_id, values):
+        if values is None or self.position(row_id) is not None:
+            return
+        key = self.key_of(values)
+        row = self.insert_position(key, row_id)
+        if row == len(self.row_ids):
+            if self.has_more:
+                # Sorts after the fetched window, the next fetchMore reads it
+                self.missed_inserts = self.missed_inserts or self.fetching
+                return
+            # Everything is fetched; move the cursor so a later fetch does not read the row twice
+            self.cursor = (self.segment_of(key), key, row_id)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.row_ids.insert(row, row_id)
+        if self.sort_column is not None:
+            self.row_keys.insert(row, key)
+        self.endInsertRows()
+        self.cache_row(row, row_id, values)
+
+    def update_row(self, row_id):
+        # With a filter or a sort key an update can also move a row into the fetched window
+        if self.position(row_id) is not None or self.where or self.sort_column is not None:
+            self.run(self.fetch_row, (row_id,), lambda values: self.row_updated(row_id, values))
+
+    def row_updated(self, row_id, values):
+        row = self.position(row_id)
+        if row is not None and values is not None and self.key_of(values) == self.key_at(row):
+            self.cache_row(row, row_id, values)
+            self.dataChanged.emit(self.index(row, 0), self.index(row, self.columnCount() - 1))
+            return
+        # The row left the filter, entered it or moved to another place in the sort order
+        self.remove_row(row_id)
+        self.row_inserted(row_id, values)
+
+    def remove_row(self, row_id):
+        row = self.position(row_id)
+        if row is None:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.row_ids[row]
+        if self.sort_column is not None:
+            del self.row_keys[row]
+        self.endRemoveRows()
+        page = self.pages.get(row // self.page_size)
+        if page is not None:
+            page.pop(row_id, None)
+
+
+# Product names of an order's lines, read only for the rows on the fetched page
+ORDER_PRODUCTS_SQL = """(
+    SELECT group_concat(COALESCE(products.name, '(deleted product)'), ', ')
+    FROM order_items LEFT JOIN products ON products.id = order_items.product_id
+    WHERE order_items.order_id = orders.id
+)"""
+# Their ids, so a renamed product only invalidates the pages that show it
+ORDER_PRODUCT_IDS_SQL = "(SELECT group_concat(order_items.product_id) FROM order_items WHERE order_items.order_id = orders.id)"
+
+
+class OrdersTableModel(SqlTableModel):
+    table = "orders"
+    # The last column (the product ids) is not shown: there are fewer headers than columns
+    columns = ("orders.order_number", ORDER_PRODUCTS_SQL, "orders.quantity", "orders.price", "orders.status",
+               ORDER_PRODUCT_IDS_SQL)
+    headers = ("Order Number", "Products", "Quantity", "Price(rubles)", "Status")
+    # Sorting by the product list would compute it for every order
+    unsortable_columns = (1,)
+
+    def __init__(self, db, page_size=200, max_pages=50, executor=None):
+        super().__init__(db, page_size, max_pages, executor)
+        self.product_search = ""
+        # Databases created by an SQLite build without FTS5 have no products_fts table;
+        # checked on the first product search rather than while the window is being built
+        self.has_fts = None
+
+    def set_search(self, number_prefix="", status=None, product="", min_price=None, max_price=None):
+        # Every condition maps to an index: the order number prefix to a range on the unique
+        # index, the product text to the full-text index over product names and then to the
+        # order lines of the matching products
+        conditions = []
+        params = []
+        if number_prefix:
+            conditions.append("orders.order_number >= ? AND orders.order_number < ?")
+            params += [number_prefix, prefix_end(number_prefix)]
+        if status:
+            conditions.append("orders.status = ?")
+            params.append(status)
+        product = product.strip()
+        if product and self.has_fts is None:
+            self.has_fts = self.db.fetch_one(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'") is not None
+        if product and self.has_fts:
+            conditions.append("orders.id IN (SELECT order_id FROM order_items WHERE product_id IN "
+                              "(SELECT rowid FROM products_fts WHERE products_fts MATCH ?))")
+            params.append(fts_query(product))
+        elif product:
+            conditions.append("orders.id IN (SELECT order_id FROM order_items WHERE product_id IN "
+                              "(SELECT id FROM products WHERE name LIKE ?))")
+            params.append(f"%{product}%")
+        if min_price is not None:
+            conditions.append("orders.price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("orders.price <= ?")
+            params.append(max_price)
+        self.product_search = product
+        self.set_filter(" AND ".join(conditions), params)
+
+    def apply_change(self, change):
+        if change.table == PRODUCT_NAMES:
+            if self.product_search:
+                # A renamed or deleted product can change which orders match; sales and stock
+                # changes send no product_names event and keep the grid and its scroll position
+                self.reload()
+            else:
+                self.product_renamed(None if change.kind == RESET else change.rowid)
+            return
+        super().apply_change(change)
+
+    def product_renamed(self, product_id):
+        # Product names are joined in, so cached pages may show a stale name. Only the pages
+        # with the product (all of them after a RESET) are dropped; they are re-read when painted.
+        # Stock and price changes send no product_names event and leave the pages alone.
+        product = None if product_id is None else str(product_id)
+        stale = [page for page, rows in self.pages.items()
+                 if product is None or any(values is not None and values[5] and product in values[5].split(",")
+                                           for values in rows.values())]
+        for page in stale:
+            del self.pages[page]
+            first = page * self.page_size
+            last = min(first + self.page_size, len(self.row_ids)) - 1
+            if first <= last:
+                self.dataChanged.emit(self.index(first, 1), self.index(last, 1))
+
+    def format_value(self, column, value):
+        # Round the price to 2 decimal places
+        if column == 3 and value is not None:
+            return "{:.2f}".format(value)
+        return super().format_value(column, value)
+
+
+class ProductsTableModel(SqlTableModel):
+    table = "products"
+    columns = ("id", "name", "price", "quantity")
+    headers = ("ID", "Product Name", "Price(rubles)", "Quantity")
+
+
+class ProductEditorModel(ProductsTableModel):
+    # Products with inline editing, for the bulk editor in ui_products.py. Edits stay in this
+    # model until take_pending() hands them to ProductService.apply_edits, which writes them
+    # all in one transaction: per product the new name and price and the change of quantity,
+    # and the products to delete. A typed quantity is kept as the change from the quantity
+    # shown, so sales made before the save are not overwritten; the cell shows the current
+    # quantity plus the change.
+    editable_columns = (1, 2, 3)
+
+    edits_changed = pyqtSignal()
+
+    def __init__(self, db, page_size=200, max_pages=50, executor=None):
+        super().__init__(db, page_size, max_pages, executor)
+        # product id -> [name or None, price or None, quantity change]
+        self.edits = {}
+        self.deletions = set()
+        # (edits, deletions) being saved; nothing can be edited meanwhile
+        self.saving = None
+
+    def set_name_prefix(self, prefix):
+        if prefix:
+            self.set_filter("name >= ? AND name < ?", (prefix, prefix_end(prefix)))
+        else:
+            self.set_filter("")
+
+    def run_always(self, function, args, on_result):
+        # Unlike run(), the result is delivered after a reload too: staging does not depend on the rows shown
+        if self.executor is None:
+            on_result(function(*args))
+        else:
+            self.executor.submit(function, *args, on_result=on_result)
+
+    def flags(self, index):
+        flags = super().flags(index)
+        if (index.isValid() and index.column() in self.editable_columns and self.saving is None
+                and self.row_ids[index.row()] not in self.deletions):
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def is_edited(self, row_id, column):
+        edit = self.edits.get(row_id)
+        if edit is None or column not in self.editable_columns:
+            return False
+        return edit[2] != 0 if column == 3 else edit[column - 1] is not None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row_id = self.row_ids[index.row()]
+        if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+            values = self.row_data(index.row())
+            if values is None:
+                return None
+            edit = self.edits.get(row_id)
+            if edit is not None:
+                product_id, name, price, quantity = values
+                values = (product_id, name if edit[0] is None else edit[0], price if edit[1] is None else edit[1],
+                          (quantity or 0) + edit[2])
+            return self.format_value(index.column(), values[index.column()])
+        if role == Qt.ItemDataRole.FontRole and (row_id in self.deletions or self.is_edited(row_id, index.column())):
+            font = QFont()
+            font.setStrikeOut(row_id in self.deletions)
+            font.setBold(row_id not in self.deletions)
+            return font
+        if role == Qt.ItemDataRole.ForegroundRole and row_id in self.deletions:
+            return QColor(Qt.GlobalColor.gray)
+        return None
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if role != Qt.ItemDataRole.EditRole or not self.flags(index) & Qt.ItemFlag.ItemIsEditable:
+            return False
+        values = self.row_data(index.row())
+        if values is None:
+            return False
+        row_id = self.row_ids[index.row()]
+        edit = list(self.edits.get(row_id, (None, None, 0)))
+        text = str(value).strip()
+        try:
+            if index.column() == 1:
+                if not text:
+                    return False
+                edit[0] = None if text == values[1] else text
+            elif index.column() == 2:
+                price = float(text.replace(",", "."))
+                if price < 0:
+                    return False
+                edit[1] = None if price == values[2] else price
+            else:
+                quantity = int(text)
+                if quantity < 0:
+                    return False
+                edit[2] = quantity - (values[3] or 0)
+        except ValueError:
+            return False
+        self.store_edit(row_id, edit)
+        self.dataChanged.emit(self.index(index.row(), 0), self.index(index.row(), self.columnCount() - 1))
+        self.edits_changed.emit()
+        return True
+
+    def store_edit(self, row_id, edit):
+        if edit == [None, None, 0]:
+            self.edits.pop(row_id, None)
+        else:
+            self.edits[row_id] = edit
+
+    def current_values(self, product_ids):
+        rows = []
+        for start in range(0, len(product_ids), 500):
+            part = product_ids[start:start + 500]
+            rows += self.db.fetch_all(f"SELECT id, price, quantity FROM products WHERE id IN ({', '.join('?' * len(part))})", part)
+        return rows
+
+    def stage(self, product_ids, price=None, percent=None, quantity=None, change=None):
+        # Bulk change of many products: a new price, a price change in percent (of the edited
+        # price, if there is one), a new quantity or a quantity change. Reads the current
+        # prices and quantities once; products deleted meanwhile are left out.
+        self.run_always(self.current_values, (list(product_ids),),
+                    lambda rows: self.staged(rows, price, percent, quantity, change))
+
+    def staged(self, rows, price, percent, quantity, change):
+        if self.saving is not None:
+            return
+        for product_id, current_price, current_quantity in rows:
+            if product_id in self.deletions:
+                continue
+            edit = list(self.edits.get(product_id, (None, None, 0)))
+            if price is not None:
+                edit[1] = price
+            if percent is not None:
+                edit[1] = round(((current_price or 0) if edit[1] is None else edit[1]) * (1 + percent / 100), 2)
+            if quantity is not None:
+                edit[2] = quantity - (current_quantity or 0)
+            if change is not None:
+                edit[2] += change
+            self.store_edit(product_id, edit)
+        self.refresh_view()
+
+    def stage_deletions(self, product_ids):
+        if self.saving is not None:
+            return
+        for product_id in product_ids:
+            self.deletions.add(product_id)
+            self.edits.pop(product_id, None)
+        self.refresh_view()
+
+    def matching_ids(self, on_result):
+        # Every product matching the filter, fetched or not
+        where = f" WHERE {self.where}" if self.where else ""
+        self.run_always(lambda: [row[0] for row in self.db.fetch_all(f"SELECT id FROM products{where}", self.where_params)],
+                    (), on_result)
+
+    def pending_count(self):
+        return len(self.edits), len(self.deletions)
+
+    def take_pending(self):
+        edits = [ProductEdit(product_id, *edit) for product_id, edit in self.edits.items()]
+        deletions = sorted(self.deletions)
+        self.saving = (self.edits, self.deletions)
+        self.edits, self.deletions = {}, set()
+        self.refresh_view()
+        return edits, deletions
+
+    def finish_saving(self, saved):
+        # A failed save puts the edits back, so they can be corrected and saved again
+        if not saved:
+            self.edits, self.deletions = self.saving
+        self.saving = None
+        self.refresh_view()
+
+    def discard(self):
+        self.edits.clear()
+        self.deletions.clear()
+        self.refresh_view()
+
+    def refresh_view(self):
+        if self.row_ids:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.row_ids) - 1, self.columnCount() - 1))
+        self.edits_changed.emit()
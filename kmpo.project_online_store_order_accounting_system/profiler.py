@@ -0,0 +1,225 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+
+# Statement-level instrumentation for Database. Every connection opened by
+# ConnectionManager is a ProfiledConnection; while a QueryProfiler is attached, each
+# execute/executemany is timed and recorded under its normalized SQL (literals and IN
+# lists collapsed), together with row counts, the time spent waiting for the write lock
+# or a reader connection, and the EXPLAIN QUERY PLAN of the first execution.
+
+# Upper bounds of the histogram buckets, in milliseconds; the last bucket is open
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+def full_scans(plan):
+    # "SCAN orders" reads the whole table; "SCAN orders USING INDEX ..." walks an index in order
+    return [line for line in plan
+            if line.startswith("SCAN ") and " USING " not in line
+            and "CONSTANT ROW" not in line and "VIRTUAL TABLE" not in line]
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, fraction):
+        # Upper bound of the bucket holding the percentile, capped by the observed maximum
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(BUCKETS_MS[index], self.max) if index < len(BUCKETS_MS) else self.max
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total,
+            "avg_ms": self.total / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max,
+            "buckets": {f"<={bound}" if index < len(BUCKETS_MS) else f">{BUCKETS_MS[-1]}": count
+                        for index, (bound, count) in enumerate(zip(BUCKETS_MS + (None,), self.counts)) if count},
+        }
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.timings = Histogram()
+        self.rows = 0
+        self.plan = None
+        self.full_scans = []
+
+    def as_dict(self):
+        stats = self.timings.as_dict()
+        stats.update(sql=self.sql, rows=self.rows, plan=self.plan, full_scans=self.full_scans)
+        return stats
+
+
+class QueryProfiler:
+    def __init__(self, explain=True, trace_size=500):
+        self.explain = explain
+        self.lock = threading.Lock()
+        self.statements = {}
+        self.waits = {}
+        # Raw SQL -> normalized SQL; the same few strings are executed over and over
+        self.normalized = {}
+        self.trace = deque(maxlen=trace_size)
+        self.started = time.time()
+
+    def reset(self):
+        with self.lock:
+            self.statements = {}
+            self.waits = {}
+            self.trace.clear()
+            self.started = time.time()
+
+    def normalize(self, sql):
+        normalized = self.normalized.get(sql)
+        if normalized is None:
+            normalized = normalize(sql)
+            if len(self.normalized) < 10000:
+                self.normalized[sql] = normalized
+        return normalized
+
+    def record(self, conn, sql, parameters, seconds, rows):
+        key = self.normalize(sql)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = StatementStats(key)
+            stats.timings.add(seconds)
+            if rows > 0:
+                stats.rows += rows
+            needs_plan = self.explain and stats.plan is None
+            if needs_plan:
+                stats.plan = []
+        if needs_plan and key.split(" ", 1)[0].upper() in EXPLAINABLE:
+            plan = self.query_plan(conn, sql, parameters)
+            with self.lock:
+                stats.plan = plan
+                stats.full_scans = full_scans(plan)
+
+    def add_rows(self, sql, rows):
+        # Rows read by fetchall/fetchmany, which the execute timing does not see
+        key = self.normalize(sql)
+        with self.lock:
+            stats = self.statements.get(key)
+            if stats is not None:
+                stats.rows += rows
+
+    def query_plan(self, conn, sql, parameters):
+        try:
+            rows = sqlite3.Connection.execute(conn, "EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+        except sqlite3.Error as error:
+            return [f"(no plan: {error})"]
+        return [row[-1] for row in rows]
+
+    def record_wait(self, kind, seconds):
+        with self.lock:
+            histogram = self.waits.get(kind)
+            if histogram is None:
+                histogram = self.waits[kind] = Histogram()
+            histogram.add(seconds)
+
+    def record_trace(self, sql):
+        self.trace.append((time.time(), sql))
+
+    def snapshot(self):
+        with self.lock:
+            statements = sorted((stats.as_dict() for stats in self.statements.values()),
+                                key=lambda stats: stats["total_ms"], reverse=True)
+            waits = {kind: histogram.as_dict() for kind, histogram in self.waits.items()}
+            trace = [{"time": moment, "sql": sql} for moment, sql in self.trace]
+        return {
+            "started": self.started,
+            "elapsed_s": time.time() - self.started,
+            "statements": statements,
+            "full_scans": [stats["sql"] for stats in statements if stats["full_scans"]],
+            "waits": waits,
+            "trace": trace,
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2, ensure_ascii=False)
+
+
+class ProfiledConnection(sqlite3.Connection):
+    # Without a profiler the overhead is one attribute check per statement
+    profiler = None
+
+    def execute(self, sql, parameters=()):
+        profiler = self.profiler
+        if profiler is None:
+            return super().execute(sql, parameters)
+        start = time.perf_counter()
+        cursor = super().execute(sql, parameters)
+        profiler.record(self, sql, parameters, time.perf_counter() - start, cursor.rowcount)
+        return cursor
+
+    def executemany(self, sql, seq_of_parameters):
+        profiler = self.profiler
+        if profiler is None:
+            return super().executemany(sql, seq_of_parameters)
+        if not isinstance(seq_of_parameters, (list, tuple)):
+            seq_of_parameters = list(seq_of_parameters)
+        start = time.perf_counter()
+        cursor = super().executemany(sql, seq_of_parameters)
+        profiler.record(self, sql, seq_of_parameters[0] if seq_of_parameters else (),
+                        time.perf_counter() - start, cursor.rowcount)
+        return cursor
+
+    # COMMIT is where the fsync happens, so it gets its own entry; "with conn" commits
+    # from C without going through commit(), hence __exit__ as well
+    def commit(self):
+        profiler = self.profiler
+        if profiler is None:
+            return super().commit()
+        start = time.perf_counter()
+        super().commit()
+        profiler.record(self, "COMMIT", (), time.perf_counter() - start, 0)
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        profiler = self.profiler
+        if profiler is None or not self.in_transaction:
+            return super().__exit__(exc_type, exc_value, traceback)
+        start = time.perf_counter()
+        result = super().__exit__(exc_type, exc_value, traceback)
+        profiler.record(self, "COMMIT" if exc_type is None else "ROLLBACK", (), time.perf_counter() - start, 0)
+        return result
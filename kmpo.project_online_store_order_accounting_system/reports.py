@@ -0,0 +1,69 @@
+from collections import namedtuple
+
+# Sales reports read the summary tables maintained by the triggers from migrations 6 and 7
+# (product_sales and daily_sales), so their cost depends on the number of groups and
+# not on the number of orders. Cancelled orders are not counted as revenue.
+
+SalesRow = namedtuple("SalesRow", ["key", "orders", "quantity", "revenue"])
+StockRow = namedtuple("StockRow", ["id", "name", "quantity"])
+
+NOT_CANCELLED = "status <> 'Cancelled'"
+
+
+class SalesReports:
+    def __init__(self, db):
+        self.db = db
+
+    def sales_rows(self, query, params=()):
+        return [SalesRow(*row) for row in self.db.fetch_all(query, params)]
+
+    def totals(self):
+        # product_sales has a row per order line, so the orders are counted in daily_sales (one per header)
+        row = self.db.fetch_one(f"""
+        SELECT (SELECT TOTAL(orders) FROM daily_sales WHERE {NOT_CANCELLED}), TOTAL(quantity), TOTAL(revenue)
+        FROM product_sales WHERE {NOT_CANCELLED}
+        """)
+        return SalesRow("Total", int(row[0]), int(row[1]), row[2])
+
+    def by_product(self, order_by, limit):
+        return self.sales_rows(f"""
+        SELECT COALESCE(products.name, '(deleted product ' || product_sales.product_id || ')'),
+               SUM(product_sales.orders), SUM(product_sales.quantity), SUM(product_sales.revenue)
+        FROM product_sales LEFT JOIN products ON products.id = product_sales.product_id
+        WHERE product_sales.{NOT_CANCELLED} AND product_sales.orders > 0
+        GROUP BY product_sales.product_id
+        ORDER BY SUM(product_sales.{order_by}) DESC LIMIT ?
+        """, (limit,))
+
+    def revenue_by_product(self, limit=-1):
+        return self.by_product("revenue", limit)
+
+    def revenue_by_status(self):
+        # Every status, cancelled orders included
+        return self.sales_rows("""
+        SELECT CASE status WHEN '' THEN '(none)' ELSE status END, SUM(orders), SUM(quantity), SUM(revenue)
+        FROM daily_sales WHERE orders > 0 GROUP BY status ORDER BY SUM(revenue) DESC
+        """)
+
+    def revenue_by_day(self, start=None, end=None):
+        conditions = [NOT_CANCELLED, "orders > 0"]
+        params = []
+        if start is not None:
+            conditions.append("day >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append("day <= ?")
+            params.append(end)
+        return self.sales_rows(f"""
+        SELECT day, SUM(orders), SUM(quantity), SUM(revenue)
+        FROM daily_sales WHERE {' AND '.join(conditions)} GROUP BY day ORDER BY day DESC
+        """, params)
+
+    def top_sellers(self, limit=10):
+        # By units sold
+        return self.by_product("quantity", limit)
+
+    def low_stock(self, threshold=5, limit=100):
+        return [StockRow(*row) for row in self.db.fetch_all(
+            "SELECT id, name, quantity FROM products WHERE quantity <= ? ORDER BY quantity, id LIMIT ?",
+            (threshold, limit))]
@@ -0,0 +1,344 @@
+from collections import namedtuple
+
+
+class OrderError(Exception):
+    pass
+
+
+class ProductNotFoundError(OrderError):
+    pass
+
+
+class InsufficientStockError(OrderError):
+    pass
+
+
+class OrderNotFoundError(OrderError):
+    pass
+
+
+class InvalidInputError(OrderError):
+    pass
+
+
+PlacedOrder = namedtuple("PlacedOrder", ["id", "order_number", "quantity", "price", "items"])
+Order = namedtuple("Order", ["id", "order_number", "quantity", "price", "status", "created_at", "items"])
+OrderItem = namedtuple("OrderItem", ["product_id", "product_name", "quantity", "unit_price", "price"])
+Product = namedtuple("Product", ["id", "name", "price", "quantity"])
+# A buffered change of one product: None keeps the name or price, quantity_change is added to the stock
+ProductEdit = namedtuple("ProductEdit", ["product_id", "name", "price", "quantity_change"])
+
+ORDER_STATUSES = ("Pending", "Completed", "Shipped", "Cancelled")
+
+# A cart is passed to SQLite as a VALUES list, two parameters per line
+MAX_CART_LINES = 400
+
+ORDER_SQL = "SELECT id, order_number, quantity, price, status, created_at FROM orders"
+
+ITEM_SQL = """
+SELECT order_items.order_id, order_items.product_id, products.name,
+       order_items.quantity, order_items.unit_price, order_items.price
+FROM order_items LEFT JOIN products ON products.id = order_items.product_id
+"""
+
+# Hot and archived orders together, see archive.py
+HISTORY_ORDER_SQL = "SELECT id, order_number, quantity, price, status, created_at FROM orders_history AS orders"
+HISTORY_ITEM_SQL = ITEM_SQL.replace("FROM order_items", "FROM order_items_history AS order_items")
+
+
+def check_product_edit(edit):
+    if edit.name is not None and not edit.name:
+        raise InvalidInputError("Product name must not be empty.")
+    if edit.price is not None and (not isinstance(edit.price, (int, float)) or isinstance(edit.price, bool) or edit.price < 0):
+        raise InvalidInputError("Price must be a non-negative number.")
+    if not isinstance(edit.quantity_change, int) or isinstance(edit.quantity_change, bool):
+        raise InvalidInputError("Quantity change must be an integer.")
+
+
+def check_quantity(quantity):
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity <= 0:
+        raise InvalidInputError("Quantity must be a positive integer.")
+
+
+def check_product_fields(name, price, quantity):
+    if not name:
+        raise InvalidInputError("Product name must not be empty.")
+    if not isinstance(price, (int, float)) or isinstance(price, bool) or price < 0:
+        raise InvalidInputError("Price must be a non-negative number.")
+    if not isinstance(quantity, int) or isinstance(quantity, bool) or quantity < 0:
+        raise InvalidInputError("Quantity must be a non-negative integer.")
+
+
+def merge_cart(items):
+    # [(product_id, quantity), ...] -> {product_id: quantity}; repeated products are added up
+    cart = {}
+    for product_id, quantity in items:
+        check_quantity(quantity)
+        cart[product_id] = cart.get(product_id, 0) + quantity
+    if not cart:
+        raise InvalidInputError("An order needs at least one product.")
+    if len(cart) > MAX_CART_LINES:
+        raise InvalidInputError(f"An order can have at most {MAX_CART_LINES} different products.")
+    return cart
+
+
+def cart_sql(cart):
+    # Subquery with the cart lines (position, product_id, quantity) in the order they were added
+    values = ", ".join("(?, ?, ?)" for _ in cart)
+    params = [value for position, (product_id, quantity) in enumerate(cart.items())
+              for value in (position, product_id, quantity)]
+    return f"(SELECT column1 AS position, column2 AS product_id, column3 AS quantity FROM (VALUES {values}))", params
+
+
+class OrderService:
+    def __init__(self, db):
+        self.db = db
+
+    def reserve_order_numbers(self, conn, count):
+        # Must be called inside a write transaction; the sequence row is locked with it.
+        # Numbers typed in by hand in EditOrderDialog may already be taken and are skipped.
+        numbers = []
+        while len(numbers) < count:
+            needed = count - len(numbers)
+            conn.execute("UPDATE sequences SET value = value + ? WHERE name = 'order_number'", (needed,))
+            last = conn.execute("SELECT value FROM sequences WHERE name = 'order_number'").fetchone()[0]
+            candidates = [f"ORD-{value}" for value in range(last - needed + 1, last + 1)]
+            taken = set()
+            for start in range(0, len(candidates), 500):
+                part = candidates[start:start + 500]
+                placeholders = ", ".join("?" * len(part))
+                taken.update(row[0] for row in conn.execute(
+                    f"SELECT order_number FROM orders WHERE order_number IN ({placeholders})", part))
+            numbers.extend(number for number in candidates if number not in taken)
+        return numbers
+
+    def next_order_number(self, conn):
+        return self.reserve_order_numbers(conn, 1)[0]
+
+    def check_cart(self, conn, cart, reserve):
+        # One query finds missing products and, when stock is reserved, lines with too little stock
+        source, params = cart_sql(cart)
+        shortage = "OR products.quantity < cart.quantity" if reserve else ""
+        problem = conn.execute(f"""
+            SELECT cart.product_id, products.id IS NULL FROM {source} AS cart
+            LEFT JOIN products ON products.id = cart.product_id
+            WHERE products.id IS NULL {shortage} ORDER BY cart.position LIMIT 1
+        """, params).fetchone()
+        if problem is None:
+            return
+        if problem[1]:
+            raise ProductNotFoundError(f"Product {problem[0]} does not exist.")
+        raise InsufficientStockError(f"Not enough of product {problem[0]} in stock to complete this order.")
+
+    def insert_items(self, conn, order_id, cart):
+        # Every line is priced at the current product price by one INSERT ... SELECT;
+        # the triggers on order_items add the lines up into the order totals
+        source, params = cart_sql(cart)
+        conn.execute(f"""
+            INSERT INTO order_items (order_id, product_id, quantity, unit_price, price)
+            SELECT ?, cart.product_id, cart.quantity, COALESCE(products.price, 0), COALESCE(products.price, 0) * cart.quantity
+            FROM {source} AS cart JOIN products ON products.id = cart.product_id ORDER BY cart.position
+        """, [order_id] + params)
+
+    def place_order(self, product_id, quantity):
+        return self.place_cart([(product_id, quantity)])
+
+    def place_cart(self, items):
+        # Stock check, a sale movement for every line and the order itself commit or roll back
+        # together; each step is one statement for the whole cart, whatever its size
+        cart = merge_cart(items)
+        with self.db.transaction() as conn:
+            self.check_cart(conn, cart, reserve=True)
+            order_number = self.next_order_number(conn)
+            order_id = conn.execute("INSERT INTO orders (order_number, status) VALUES (?, ?)",
+                                    (order_number, "Pending")).lastrowid
+            self.insert_items(conn, order_id, cart)
+
+            # The stock_movements triggers take the lines off products.quantity and refuse
+            # a sale that would oversell
+            source, params = cart_sql(cart)
+            conn.execute(f"""
+                INSERT INTO stock_movements (product_id, kind, quantity, order_id)
+                SELECT cart.product_id, 'sale', -cart.quantity, ? FROM {source} AS cart ORDER BY cart.position
+            """, [order_id] + params)
+            quantity, price = conn.execute("SELECT quantity, price FROM orders WHERE id = ?", (order_id,)).fetchone()
+            return PlacedOrder(order_id, order_number, quantity, price, self.order_items(conn, [order_id])[order_id])
+
+    def held_stock(self, conn, order_id):
+        # {product_id: units the order holds} by its movements; None for an order without any
+        # (placed before the ledger existed or imported as history), whose stock is left alone
+        rows = conn.execute("SELECT product_id, -SUM(quantity) FROM stock_movements WHERE order_id = ? GROUP BY product_id",
+                            (order_id,)).fetchall()
+        return {product_id: held for product_id, held in rows} if rows else None
+
+    def move_stock(self, conn, order_id, held, wanted):
+        # Records the difference between what the order holds and what it should hold:
+        # 'sale' for units taken, 'return' for units given back. Products deleted since are skipped.
+        changes = [(product_id, held.get(product_id, 0) - wanted.get(product_id, 0)) for product_id in held.keys() | wanted.keys()]
+        changes = sorted(change for change in changes if change[1])
+        for product_id, change in changes:
+            if change < 0 and conn.execute("SELECT COALESCE(quantity, 0) < ? FROM products WHERE id = ?",
+                                           (-change, product_id)).fetchone() == (1,):
+                raise InsufficientStockError(f"Not enough of product {product_id} in stock to complete this order.")
+        conn.executemany("""
+            INSERT INTO stock_movements (product_id, kind, quantity, order_id)
+            SELECT id, ?, ?, ? FROM products WHERE id = ?
+        """, [("return" if change > 0 else "sale", change, order_id, product_id) for product_id, change in changes])
+
+    def edit_order(self, order_number, items, status):
+        # A changed cart replaces the lines, repriced at the current product prices; items=None
+        # (a status-only edit) or the same cart keeps them and their prices, lines of deleted
+        # products included. Stock follows the lines: a cancelled order holds none, so
+        # cancelling returns it and reopening takes it again.
+        cart = None if items is None else merge_cart(items)
+        if status not in ORDER_STATUSES:
+            raise InvalidInputError(f"Unknown order status: {status}.")
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT id FROM orders WHERE order_number = ?", (order_number,)).fetchone()
+            if row is None:
+                raise OrderNotFoundError(f"Order {order_number} does not exist.")
+            lines = conn.execute("SELECT product_id, quantity FROM order_items WHERE order_id = ? ORDER BY id",
+                                 (row[0],)).fetchall()
+            changed = cart is not None and lines != list(cart.items())
+            if changed:
+                self.check_cart(conn, cart, reserve=False)
+            else:
+                # The stock the kept lines should hold; a deleted product holds none
+                cart = {}
+                for product_id, quantity in lines:
+                    if product_id is not None:
+                        cart[product_id] = cart.get(product_id, 0) + quantity
+            held = self.held_stock(conn, row[0])
+            if held is not None:
+                self.move_stock(conn, row[0], held, {} if status == "Cancelled" else cart)
+            if changed:
+                conn.execute("DELETE FROM order_items WHERE order_id = ?", (row[0],))
+            conn.execute("UPDATE orders SET status = ? WHERE id = ?", (status, row[0]))
+            if changed:
+                self.insert_items(conn, row[0], cart)
+
+    def delete_order(self, order_number):
+        # The stock the order holds goes back
+        with self.db.transaction() as conn:
+            row = conn.execute("SELECT id FROM orders WHERE order_number = ?", (order_number,)).fetchone()
+            if row is None:
+                raise OrderNotFoundError(f"Order {order_number} does not exist.")
+            held = self.held_stock(conn, row[0])
+            if held is not None:
+                self.move_stock(conn, row[0], held, {})
+            conn.execute("DELETE FROM orders WHERE id = ?", (row[0],))
+
+    def order_items(self, conn, order_ids, item_sql=ITEM_SQL):
+        # {order id: [OrderItem, ...]} for a page of orders in one query
+        items = {order_id: [] for order_id in order_ids}
+        for start in range(0, len(order_ids), 500):
+            part = order_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(part))
+            for row in conn.execute(f"{item_sql} WHERE order_items.order_id IN ({placeholders}) ORDER BY order_items.id", part):
+                items[row[0]].append(OrderItem(*row[1:]))
+        return items
+
+    def read_orders(self, query, params, item_sql=ITEM_SQL):
+        # Orders and their lines are read from the same snapshot
+        with self.db.reader() as conn:
+            rows = conn.execute(query, params).fetchall()
+            items = self.order_items(conn, [row[0] for row in rows], item_sql)
+        return [Order(*row, items[row[0]]) for row in rows]
+
+    def get_order(self, order_number, archived=False):
+        # archived=True also looks in the archive files; archived orders are read-only
+        orders = self.read_orders(f"{ORDER_SQL} WHERE order_number = ?", (order_number,))
+        if not orders and archived and self.db.archiver is not None:
+            orders = self.read_orders(f"{HISTORY_ORDER_SQL} WHERE order_number = ?", (order_number,), HISTORY_ITEM_SQL)
+        if not orders:
+            raise OrderNotFoundError(f"Order {order_number} does not exist.")
+        return orders[0]
+
+    def list_orders(self, after_id=0, limit=100, status=None):
+        # Keyset page in id order; pass the id of the last returned order to get the next page
+        if status is None:
+            return self.read_orders(f"{ORDER_SQL} WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+        return self.read_orders(f"{ORDER_SQL} WHERE status = ? AND id > ? ORDER BY id LIMIT ?",
+                                (status, after_id, limit))
+
+
+class ProductService:
+    def __init__(self, db):
+        self.db = db
+
+    def add_product(self, name, price, quantity):
+        check_product_fields(name, price, quantity)
+        with self.db.transaction() as conn:
+            cursor = conn.execute("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)", (name, price, quantity))
+            return Product(cursor.lastrowid, name, price, quantity)
+
+    def update_product(self, product_id, name, price, quantity, previous_quantity=None):
+        # The new quantity is recorded as an 'adjustment' movement. With previous_quantity (the
+        # quantity the user was shown) only the user's change is applied, so sales made while
+        # the product was being edited are not overwritten.
+        check_product_fields(name, price, quantity)
+        with self.db.transaction() as conn:
+            if not conn.execute("UPDATE products SET name = ?, price = ? WHERE id = ?", (name, price, product_id)).rowcount:
+                raise ProductNotFoundError(f"Product {product_id} does not exist.")
+            current = conn.execute("SELECT COALESCE(quantity, 0) FROM products WHERE id = ?", (product_id,)).fetchone()[0]
+            change = quantity - (current if previous_quantity is None else previous_quantity)
+            if current + change < 0:
+                raise InsufficientStockError(f"Only {current} of product {product_id} left in stock.")
+            if change:
+                conn.execute("INSERT INTO stock_movements (product_id, kind, quantity) VALUES (?, 'adjustment', ?)",
+                             (product_id, change))
+            return Product(product_id, name, price, current + change)
+
+    def apply_edits(self, edits, deleted_ids=(), note="bulk edit"):
+        # Any number of ProductEdits and deletions in one transaction and one commit. Quantity
+        # changes are 'adjustment' movements relative to the current stock, as in update_product;
+        # products deleted meanwhile are skipped. Returns (products updated, products deleted).
+        edits = list(edits)
+        for edit in edits:
+            check_product_edit(edit)
+        deleted_ids = set(deleted_ids)
+        edits = [edit for edit in edits if edit.product_id not in deleted_ids]
+        with self.db.transaction() as conn:
+            # Also run for quantity-only edits: the rowcount counts the products that still exist
+            updated = conn.executemany("UPDATE products SET name = COALESCE(?, name), price = COALESCE(?, price) WHERE id = ?",
+                                       [(edit.name, edit.price, edit.product_id) for edit in edits]).rowcount
+            moved = [(edit.quantity_change, note, edit.product_id) for edit in edits if edit.quantity_change]
+            conn.executemany("INSERT INTO stock_movements (product_id, kind, quantity, note) "
+                             "SELECT id, 'adjustment', ?, ? FROM products WHERE id = ?", moved)
+            taken = {product_id: change for change, _, product_id in moved if change < 0}
+            taken_ids = list(taken)
+            for start in range(0, len(taken_ids), 500):
+                part = taken_ids[start:start + 500]
+                short = conn.execute(f"SELECT id, quantity FROM products WHERE id IN ({', '.join('?' * len(part))}) "
+                                     f"AND quantity < 0 LIMIT 1", part).fetchone()
+                if short is not None:
+                    raise InsufficientStockError(f"Only {short[1] - taken[short[0]]} of product {short[0]} left in stock.")
+            deleted = conn.executemany("DELETE FROM products WHERE id = ?",
+                                       [(product_id,) for product_id in sorted(deleted_ids)]).rowcount
+            return max(updated, 0), max(deleted, 0)
+
+    def receive_stock(self, product_id, quantity, note=None):
+        check_quantity(quantity)
+        with self.db.transaction() as conn:
+            if not conn.execute("""
+                INSERT INTO stock_movements (product_id, kind, quantity, note) SELECT id, 'receipt', ?, ? FROM products WHERE id = ?
+            """, (quantity, note, product_id)).rowcount:
+                raise ProductNotFoundError(f"Product {product_id} does not exist.")
+            return Product(*conn.execute("SELECT id, name, price, quantity FROM products WHERE id = ?", (product_id,)).fetchone())
+
+    def delete_product(self, product_id):
+        # Order lines keep their product_id; reports show them as a deleted product.
+        # Its stock movements stay, closed by a 'removal' that brings their sum to zero.
+        with self.db.transaction() as conn:
+            if not conn.execute("DELETE FROM products WHERE id = ?", (product_id,)).rowcount:
+                raise ProductNotFoundError(f"Product {product_id} does not exist.")
+
+    def get_product(self, product_id):
+        row = self.db.fetch_one("SELECT id, name, price, quantity FROM products WHERE id = ?", (product_id,))
+        if row is None:
+            raise ProductNotFoundError(f"Product {product_id} does not exist.")
+        return Product(*row)
+
+    def list_products(self, after_id=0, limit=100):
+        return [Product(*row) for row in self.db.fetch_all(
+            "SELECT id, name, price, quantity FROM products WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))]
@@ -0,0 +1,399 @@
+import bisect
+import calendar
+import threading
+import time
+from array import array
+
+from database import INSERTED, UPDATED, DELETED, RESET
+from reports import SalesRow
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# In-process columnar copy of orders, their lines and the product names, for ad-hoc
+# analytics without a list of row tuples per query. Every column is an array.array
+# (8 bytes per number, 2 per status); statuses and product names are dictionary-encoded:
+# a row holds a small integer code and the strings are stored once. With NumPy installed
+# the filters and group-bys run over zero-copy views of the arrays (numpy.bincount),
+# otherwise over the same arrays in plain Python.
+#
+# refresh() only reads what changed since the previous one: orders and lines above the
+# rowid high-water marks, plus the orders and products that Database change events
+# reported as updated or deleted (which includes every order whose lines changed, since
+# the order_items triggers update the order totals). Changes made by other processes
+# send no events; reload() reads everything again.
+
+ORDER_SQL = """
+    SELECT id, COALESCE(quantity, 0), COALESCE(price, 0.0), COALESCE(status, ''),
+           COALESCE(CAST(strftime('%s', created_at) AS INTEGER), 0)
+    FROM orders
+"""
+ITEM_SQL = "SELECT id, order_id, COALESCE(product_id, 0), COALESCE(quantity, 0), COALESCE(price, 0.0) FROM order_items"
+PRODUCT_SQL = "SELECT id, name FROM products"
+
+# Reload instead of refreshing once this share of the rows are deleted or replaced ones
+MAX_DEAD_SHARE = 0.25
+
+
+def epoch_seconds(moment):
+    # "YYYY-mm-dd" or "YYYY-mm-dd HH:MM:SS" (UTC, as SQLite's CURRENT_TIMESTAMP) -> seconds
+    text_format = "%Y-%m-%d %H:%M:%S" if " " in moment else "%Y-%m-%d"
+    return calendar.timegm(time.strptime(moment, text_format))
+
+
+def deleted_product_name(product_id):
+    return f"(deleted product {product_id})"
+
+
+class OrderSnapshot:
+    def __init__(self, db, chunk_size=10000, use_numpy=True):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.numpy = numpy if use_numpy else None
+        self.lock = threading.RLock()
+        # Change events arrive on the writing thread and must not wait for a refresh
+        self.changes_lock = threading.Lock()
+        self.dirty_orders = set()
+        self.dirty_products = set()
+        self.clear()
+        db.subscribe(self.on_change)
+
+    def clear(self):
+        with self.lock:
+            self.stale = False
+            self.products_stale = True
+            self.order_high = 0
+            self.item_high = 0
+            # Orders, in id order (bisect finds an order's slot)
+            self.order_ids = array('q')
+            self.order_quantities = array('q')
+            self.order_prices = array('d')
+            self.order_statuses = array('H')
+            self.order_created = array('q')
+            self.order_live = array('B')
+            # Order lines; item_orders holds the slot of the line's order
+            self.item_orders = array('q')
+            self.item_products = array('q')
+            self.item_quantities = array('q')
+            self.item_prices = array('d')
+            self.item_live = array('B')
+            # Products: slot per product id, name code per slot
+            self.product_slots = {}
+            self.product_ids = array('q')
+            self.product_names = array('q')
+            # Dictionaries
+            self.statuses = []
+            self.status_codes = {}
+            self.names = []
+            self.name_codes = {}
+
+    def __len__(self):
+        return self.order_live.count(1)
+
+    def memory(self):
+        # Bytes held by the columns and the dictionaries' strings
+        columns = (self.order_ids, self.order_quantities, self.order_prices, self.order_statuses, self.order_created,
+                   self.order_live, self.item_orders, self.item_products, self.item_quantities, self.item_prices,
+                   self.item_live, self.product_ids, self.product_names)
+        strings = sum(len(text.encode("utf-8")) for text in self.statuses + self.names)
+        return sum(column.itemsize * len(column) for column in columns) + strings
+
+    # --- loading ------------------------------------------------------------
+
+    def on_change(self, change):
+        with self.changes_lock:
+            if change.kind == RESET:
+                if change.table == "orders":
+                    self.stale = True
+                else:
+                    self.products_stale = True
+            elif change.table == "orders" and change.kind in (INSERTED, UPDATED, DELETED):
+                # New orders above the high-water mark are read anyway
+                self.dirty_orders.add(change.rowid)
+            elif change.table == "products":
+                self.dirty_products.add(change.rowid)
+
+    def reload(self):
+        with self.lock:
+            self.clear()
+            return self.refresh()
+
+    def refresh(self):
+        # Returns (orders added, orders re-read)
+        with self.lock:
+            with self.changes_lock:
+                if self.stale:
+                    self.clear()
+                dirty_orders, self.dirty_orders = self.dirty_orders, set()
+                dirty_products, self.dirty_products = self.dirty_products, set()
+                all_products, self.products_stale = self.products_stale, False
+            with self.db.reader() as conn:
+                # One read transaction, so orders and lines come from the same snapshot; not on
+                # the writer, which other threads use
+                snapshot = conn is not self.db.conn and not conn.in_transaction
+                if snapshot:
+                    conn.execute("BEGIN")
+                try:
+                    self.read_products(conn, None if all_products else dirty_products)
+                    dirty = sorted(order_id for order_id in dirty_orders if order_id <= self.order_high)
+                    self.reread_orders(conn, dirty)
+                    added = self.read_new(conn, set(dirty))
+                finally:
+                    if snapshot:
+                        conn.execute("ROLLBACK")
+            dead = len(self.item_live) - self.item_live.count(1) + len(self.order_live) - self.order_live.count(1)
+            if dead > MAX_DEAD_SHARE * (len(self.item_live) + len(self.order_live)):
+                self.stale = True
+            return added, len(dirty)
+
+    def fetch_chunks(self, conn, query, params=()):
+        cursor = conn.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    def code(self, codes, values, value):
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    def product_slot(self, product_id, name=None):
+        slot = self.product_slots.get(product_id)
+        if slot is None:
+            slot = self.product_slots[product_id] = len(self.product_ids)
+            self.product_ids.append(product_id)
+            self.product_names.append(0)
+            if name is None:
+                name = deleted_product_name(product_id)
+        if name is not None:
+            self.product_names[slot] = self.code(self.name_codes, self.names, name)
+        return slot
+
+    def read_products(self, conn, product_ids):
+        # product_ids=None reads them all
+        if product_ids is None:
+            found = set()
+            for rows in self.fetch_chunks(conn, PRODUCT_SQL):
+                for product_id, name in rows:
+                    self.product_slot(product_id, name or "")
+                    found.add(product_id)
+            missing = set(self.product_slots) - found
+        else:
+            missing = set(product_ids)
+            ids = sorted(product_ids)
+            for start in range(0, len(ids), 500):
+                part = ids[start:start + 500]
+                for product_id, name in conn.execute(f"{PRODUCT_SQL} WHERE id IN ({', '.join('?' * len(part))})", part):
+                    self.product_slot(product_id, name or "")
+                    missing.discard(product_id)
+        for product_id in missing:
+            if product_id in self.product_slots:
+                self.product_slot(product_id, deleted_product_name(product_id))
+
+    def order_slot(self, order_id):
+        slot = bisect.bisect_left(self.order_ids, order_id)
+        if slot < len(self.order_ids) and self.order_ids[slot] == order_id:
+            return slot
+        return None
+
+    def append_item(self, order_slot, product_id, quantity, price):
+        self.item_orders.append(order_slot)
+        self.item_products.append(self.product_slot(product_id))
+        self.item_quantities.append(quantity)
+        self.item_prices.append(price)
+        self.item_live.append(1)
+
+    def reread_orders(self, conn, order_ids):
+        # Changed or deleted orders below the high-water mark: the header is overwritten in
+        # place and the lines are replaced
+        slots = {}
+        for start in range(0, len(order_ids), 500):
+            part = order_ids[start:start + 500]
+            placeholders = ", ".join("?" * len(part))
+            found = set()
+            for order_id, quantity, price, status, created in conn.execute(f"{ORDER_SQL} WHERE id IN ({placeholders})", part):
+                slot = self.order_slot(order_id)
+                if slot is None:
+                    # Written by another process below the high-water mark
+                    self.stale = True
+                    continue
+                self.order_quantities[slot] = quantity
+                self.order_prices[slot] = price
+                self.order_statuses[slot] = self.code(self.status_codes, self.statuses, status)
+                self.order_created[slot] = created
+                self.order_live[slot] = 1
+                found.add(order_id)
+                slots[order_id] = slot
+            for order_id in part:
+                slot = self.order_slot(order_id)
+                if order_id not in found and slot is not None:
+                    self.order_live[slot] = 0
+                    slots[order_id] = slot
+        if not slots:
+            return
+        self.kill_items(set(slots.values()))
+        ids = sorted(order_id for order_id, slot in slots.items() if self.order_live[slot])
+        for start in range(0, len(ids), 500):
+            part = ids[start:start + 500]
+            placeholders = ", ".join("?" * len(part))
+            for _, order_id, product_id, quantity, price in conn.execute(
+                    f"{ITEM_SQL} WHERE order_id IN ({placeholders}) ORDER BY id", part):
+                self.append_item(slots[order_id], product_id, quantity, price)
+
+    def kill_items(self, order_slots):
+        if self.numpy is not None:
+            items = self.numpy.frombuffer(self.item_orders, dtype=self.numpy.int64)
+            live = self.numpy.frombuffer(self.item_live, dtype=self.numpy.uint8)
+            live[self.numpy.isin(items, self.numpy.fromiter(order_slots, dtype=self.numpy.int64))] = 0
+            del items, live
+        else:
+            for index, slot in enumerate(self.item_orders):
+                if slot in order_slots:
+                    self.item_live[index] = 0
+
+    def read_new(self, conn, skipped_orders):
+        # Orders and lines above the high-water marks, a chunk of rows per column extend;
+        # lines of the orders re-read by reread_orders are already there
+        added = 0
+        for rows in self.fetch_chunks(conn, f"{ORDER_SQL} WHERE id > ? ORDER BY id", (self.order_high,)):
+            ids, quantities, prices, statuses, created = zip(*rows)
+            self.order_ids.extend(ids)
+            self.order_quantities.extend(quantities)
+            self.order_prices.extend(prices)
+            self.order_statuses.extend([self.code(self.status_codes, self.statuses, status) for status in statuses])
+            self.order_created.extend(created)
+            self.order_live.frombytes(b"\x01" * len(rows))
+            self.order_high = ids[-1]
+            added += len(rows)
+        # Lines nearly always belong to the latest orders; the slot of the previous line's
+        # order is tried before a bisect
+        last_order = last_slot = None
+        for rows in self.fetch_chunks(conn, f"{ITEM_SQL} WHERE id > ? ORDER BY id", (self.item_high,)):
+            slots = []
+            for row in rows:
+                if row[1] != last_order:
+                    last_order, last_slot = row[1], self.order_slot(row[1])
+                slots.append(None if last_order in skipped_orders else last_slot)
+            self.item_high = rows[-1][0]
+            if None in slots:
+                rows = [row for row, slot in zip(rows, slots) if slot is not None]
+                slots = [slot for slot in slots if slot is not None]
+                if not rows:
+                    continue
+            _, _, products, quantities, prices = zip(*rows)
+            self.item_orders.extend(slots)
+            known = self.product_slots
+            self.item_products.extend([known[product_id] if product_id in known else self.product_slot(product_id)
+                                       for product_id in products])
+            self.item_quantities.extend(quantities)
+            self.item_prices.extend(prices)
+            self.item_live.frombytes(b"\x01" * len(rows))
+        return added
+
+    # --- analytics ----------------------------------------------------------
+
+    def order_mask(self, statuses=None, start=None, end=None, min_price=None, max_price=None):
+        # Live orders matching every given condition; start/end are "YYYY-mm-dd[ HH:MM:SS]"
+        # (end is inclusive up to the second, a date alone means its first second)
+        codes = None if statuses is None else [self.status_codes[status] for status in statuses if status in self.status_codes]
+        low = None if start is None else epoch_seconds(start)
+        high = None if end is None else epoch_seconds(end)
+        if self.numpy is not None:
+            np = self.numpy
+            mask = np.frombuffer(self.order_live, dtype=np.uint8).astype(bool)
+            if codes is not None:
+                mask &= np.isin(np.frombuffer(self.order_statuses, dtype=np.uint16), codes)
+            if low is not None or high is not None:
+                created = np.frombuffer(self.order_created, dtype=np.int64)
+                if low is not None:
+                    mask &= created >= low
+                if high is not None:
+                    mask &= created <= high
+            if min_price is not None or max_price is not None:
+                prices = np.frombuffer(self.order_prices, dtype=np.float64)
+                if min_price is not None:
+                    mask &= prices >= min_price
+                if max_price is not None:
+                    mask &= prices <= max_price
+            return mask
+        codes = None if codes is None else set(codes)
+        return bytearray(
+            live and (codes is None or status in codes) and (low is None or created >= low) and (high is None or created <= high)
+            and (min_price is None or price >= min_price) and (max_price is None or price <= max_price)
+            for live, status, created, price in zip(self.order_live, self.order_statuses, self.order_created, self.order_prices))
+
+    def group(self, keys, size, mask, quantities, prices):
+        # (count, quantity, revenue) per key 0..size-1 over the masked rows
+        if self.numpy is not None:
+            np = self.numpy
+            keys = np.frombuffer(keys, dtype=np.uint16 if keys.typecode == 'H' else np.int64)[mask]
+            counts = np.bincount(keys, minlength=size)
+            quantity = np.bincount(keys, weights=np.frombuffer(quantities, dtype=np.int64)[mask], minlength=size)
+            revenue = np.bincount(keys, weights=np.frombuffer(prices, dtype=np.float64)[mask], minlength=size)
+            return [(int(count), int(units), float(total)) for count, units, total in zip(counts, quantity, revenue)]
+        totals = [[0, 0, 0.0] for _ in range(size)]
+        for selected, key, units, price in zip(mask, keys, quantities, prices):
+            if selected:
+                total = totals[key]
+                total[0] += 1
+                total[1] += units
+                total[2] += price
+        return [tuple(total) for total in totals]
+
+    def item_mask(self, **filters):
+        # Live lines of the orders matching the filters
+        orders = self.order_mask(**filters)
+        if self.numpy is not None:
+            np = self.numpy
+            return np.frombuffer(self.item_live, dtype=np.uint8).astype(bool) & orders[np.frombuffer(self.item_orders, dtype=np.int64)]
+        return bytearray(live and orders[slot] for live, slot in zip(self.item_live, self.item_orders))
+
+    def totals(self, **filters):
+        groups = self.by_status(**filters)
+        return SalesRow("Total", sum(row.orders for row in groups), sum(row.quantity for row in groups),
+                        sum(row.revenue for row in groups))
+
+    def by_status(self, **filters):
+        with self.lock:
+            groups = self.group(self.order_statuses, len(self.statuses), self.order_mask(**filters),
+                                self.order_quantities, self.order_prices)
+            rows = [SalesRow(status or "(none)", *group) for status, group in zip(self.statuses, groups) if group[0]]
+        return sorted(rows, key=lambda row: row.revenue, reverse=True)
+
+    def by_product(self, limit=None, **filters):
+        # Counts order lines, as product_sales does
+        with self.lock:
+            groups = self.group(self.item_products, len(self.product_ids), self.item_mask(**filters),
+                                self.item_quantities, self.item_prices)
+            rows = [SalesRow(self.names[self.product_names[slot]], *group) for slot, group in enumerate(groups) if group[0]]
+        rows.sort(key=lambda row: row.revenue, reverse=True)
+        return rows if limit is None else rows[:limit]
+
+    def by_day(self, **filters):
+        with self.lock:
+            mask = self.order_mask(**filters)
+            if self.numpy is not None:
+                np = self.numpy
+                days = np.frombuffer(self.order_created, dtype=np.int64)[mask] // 86400
+                values, keys = np.unique(days, return_inverse=True)
+                counts = np.bincount(keys, minlength=len(values))
+                quantity = np.bincount(keys, weights=np.frombuffer(self.order_quantities, dtype=np.int64)[mask], minlength=len(values))
+                revenue = np.bincount(keys, weights=np.frombuffer(self.order_prices, dtype=np.float64)[mask], minlength=len(values))
+                groups = {int(day): (int(count), int(units), float(total))
+                          for day, count, units, total in zip(values, counts, quantity, revenue)}
+            else:
+                groups = {}
+                for selected, created, units, price in zip(mask, self.order_created, self.order_quantities, self.order_prices):
+                    if selected:
+                        total = groups.setdefault(created // 86400, [0, 0, 0.0])
+                        total[0] += 1
+                        total[1] += units
+                        total[2] += price
+        return [SalesRow(time.strftime("%Y-%m-%d", time.gmtime(day * 86400)), *groups[day])
+                for day in sorted(groups, reverse=True)]
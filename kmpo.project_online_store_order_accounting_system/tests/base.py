@@ -0,0 +1,22 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from database import Database
+from services import OrderService
+
+
+class StoreTestCase(unittest.TestCase):
+    # A fresh database file per test, with two products in stock
+    PRODUCTS = [("Tea", 10.0, 100), ("Cup", 25.0, 100)]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.db = Database(os.path.join(self.directory, "test.db"))
+        self.db.execute_many("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)", self.PRODUCTS)
+        self.orders = OrderService(self.db)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
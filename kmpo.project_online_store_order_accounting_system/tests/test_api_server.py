@@ -0,0 +1,45 @@
+import asyncio
+import unittest
+
+from api_server import MAX_BODY, ApiServer
+from tests.base import StoreTestCase
+
+
+class ContentLengthTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.api = ApiServer(self.db)
+
+    def tearDown(self):
+        self.api.writes.close()
+        self.api.read_pool.shutdown(wait=True)
+        super().tearDown()
+
+    def status(self, content_length, body=b""):
+        async def request():
+            server = await asyncio.start_server(self.api.handle_connection, "127.0.0.1", 0)
+            async with server:
+                reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+                writer.write(f"POST /products HTTP/1.1\r\nContent-Length: {content_length}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                status_line = await reader.readline()
+                writer.close()
+                return int(status_line.split()[1])
+
+        return asyncio.run(request())
+
+    def test_invalid_length_is_rejected(self):
+        for value in ("abc", "-5", "+5", "1_0", "1.5"):
+            self.assertEqual(self.status(value), 400, value)
+
+    def test_length_above_maximum_is_rejected(self):
+        self.assertEqual(self.status(MAX_BODY + 1), 413)
+
+    def test_valid_length_reaches_the_route(self):
+        body = b'{"name": "Spoon", "price": 3.0, "quantity": 5}'
+        self.assertEqual(self.status(len(body), body), 201)
+        self.assertEqual(self.db.fetch_one("SELECT name FROM products WHERE id = 3")[0], "Spoon")
+
+
+if __name__ == "__main__":
+    unittest.main()
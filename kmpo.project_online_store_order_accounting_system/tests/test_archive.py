@@ -0,0 +1,92 @@
+import os
+import unittest
+
+from archive import ITEM_COLUMNS, MAX_ATTACHED, ORDER_COLUMNS, ArchiveError, OrderArchiver
+from tests.base import StoreTestCase
+
+
+class OrderArchiverTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.archiver = OrderArchiver(self.db, days=30, directory=os.path.join(self.directory, "archive"))
+
+    def archive(self, *placed):
+        # Finished long ago; a completed order keeps its stock, so the status is set directly
+        self.db.query(f"UPDATE orders SET status = 'Completed', created_at = '2020-01-01 10:00:00' "
+                      f"WHERE id IN ({', '.join('?' * len(placed))})", [order.id for order in placed])
+        return self.archiver.archive_all()
+
+    def stock(self):
+        return self.db.fetch_one("SELECT quantity FROM products WHERE id = 1")[0]
+
+    def test_archived_order_ids_are_not_given_out_again(self):
+        first, second, newest = (self.orders.place_cart([(1, 5)]) for _ in range(3))
+        self.assertEqual(self.archive(first, second), 2)
+        self.orders.delete_order(newest.order_number)
+        placed = self.orders.place_cart([(1, 1)])
+        self.assertGreater(placed.id, newest.id)
+        # The new order holds only its own unit, so cancelling it gives back just that
+        self.orders.edit_order(placed.order_number, [(1, 1)], "Cancelled")
+        self.assertEqual(self.stock(), 90)
+
+    def test_archived_line_ids_are_not_given_out_again(self):
+        old = self.orders.place_cart([(1, 1)])
+        self.orders.place_cart([(2, 1)])
+        # Edited late: the old order's new line gets the highest line id, and is archived with it
+        self.orders.edit_order(old.order_number, [(1, 2)], "Completed")
+        self.assertEqual(self.archive(old), 1)
+        newer = self.orders.place_cart([(2, 4)])
+        self.assertEqual(self.archive(newer), 1)
+        archived = self.db.fetch_all("SELECT order_id, product_id, quantity FROM order_items_history WHERE order_id = ?",
+                                     (old.id,))
+        self.assertEqual(archived, [(old.id, 1, 2)])
+
+    def test_reopened_archive_reserves_its_ids(self):
+        old = self.orders.place_cart([(1, 1)])
+        self.assertEqual(self.archive(old), 1)
+        # As after restoring a main file older than its archive
+        self.db.query("DELETE FROM sqlite_sequence")
+        OrderArchiver(self.db, days=30, directory=self.archiver.directory)
+        self.assertGreater(self.orders.place_cart([(1, 1)]).id, old.id)
+
+    def copy_to_archive(self, period, order_sql, item_sql, params=()):
+        # Writes rows straight into an archive file, as an earlier batch would have
+        archive = self.archiver.archive(period)
+        with archive:
+            archive.executemany(f"INSERT INTO orders ({ORDER_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                                self.db.fetch_all(order_sql, params))
+            archive.executemany(f"INSERT INTO order_items ({ITEM_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                                self.db.fetch_all(item_sql, params))
+
+    def test_order_copied_before_a_crash_is_not_copied_again(self):
+        placed = self.orders.place_cart([(1, 1), (2, 1)])
+        self.db.query("UPDATE orders SET status = 'Completed', created_at = '2020-01-01 10:00:00'")
+        # Committed to the archive file, but not yet deleted from the main file
+        self.copy_to_archive("2020", f"SELECT {ORDER_COLUMNS} FROM orders", f"SELECT {ITEM_COLUMNS} FROM order_items")
+        self.assertEqual(self.archiver.archive_all(), 1)
+        self.assertEqual(self.db.fetch_one("SELECT COUNT(*) FROM orders_history WHERE id = ?", (placed.id,))[0], 1)
+        self.assertEqual(self.db.fetch_one("SELECT COUNT(*) FROM order_items_history WHERE order_id = ?", (placed.id,))[0], 2)
+
+    def test_archived_row_is_never_overwritten(self):
+        placed = self.orders.place_cart([(1, 1)])
+        self.copy_to_archive("2020", f"SELECT id, 'ORD-OLD', quantity, price, status, created_at FROM orders",
+                             f"SELECT {ITEM_COLUMNS} FROM order_items")
+        self.db.query("UPDATE orders SET status = 'Completed', created_at = '2020-01-01 10:00:00'")
+        with self.assertRaises(ArchiveError):
+            self.archiver.archive_all()
+        self.assertEqual(self.db.fetch_one("SELECT order_number FROM orders WHERE id = ?", (placed.id,))[0],
+                         placed.order_number)
+        self.assertEqual(self.archiver.archive("2020").execute("SELECT order_number FROM orders").fetchall(), [("ORD-OLD",)])
+
+    def test_no_more_periods_than_can_be_attached(self):
+        for year in range(2010, 2011 + MAX_ATTACHED):
+            placed = self.orders.place_cart([(1, 1)])
+            self.db.query(f"UPDATE orders SET status = 'Completed', created_at = '{year}-01-01 10:00:00' WHERE id = ?",
+                          (placed.id,))
+        with self.assertRaises(ArchiveError):
+            self.archiver.archive_all()
+        self.assertEqual(self.archiver.periods, [])
+        self.assertEqual(self.db.fetch_one("SELECT COUNT(*) FROM orders")[0], MAX_ATTACHED + 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import gzip
+import json
+import os
+import sqlite3
+import unittest
+
+from archive import OrderArchiver
+from backup import MANIFEST, BackupError, BackupManager, check_integrity, file_sha256, read_manifest
+from database import Database
+from tests.base import StoreTestCase
+
+ORDERS_SQL = "SELECT id, order_number, quantity, price, status FROM orders ORDER BY id"
+
+
+class BackupRestoreTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_name = os.path.join(self.directory, "test.db")
+        archive_directory = os.path.join(self.directory, "archive")
+        archiver = OrderArchiver(self.db, days=30, directory=archive_directory)
+        old = self.orders.place_cart([(1, 2)])
+        self.db.query("UPDATE orders SET status = 'Completed', created_at = '2020-01-01 10:00:00' WHERE id = ?", (old.id,))
+        archiver.archive_all()
+        self.orders.place_cart([(1, 1), (2, 3)])
+        self.backups = BackupManager(self.db_name, directory=os.path.join(self.directory, "backups"),
+                                     archive_directory=archive_directory, pause=0)
+
+    def archived_orders(self):
+        rows = []
+        for path in sorted(os.listdir(self.backups.archive_directory)):
+            if path.endswith(".db"):
+                conn = sqlite3.connect(os.path.join(self.backups.archive_directory, path))
+                rows += conn.execute(ORDERS_SQL).fetchall()
+                conn.close()
+        return rows
+
+    def test_backup_and_restore_round_trip(self):
+        orders, archived = self.db.fetch_all(ORDERS_SQL), self.archived_orders()
+        self.assertEqual((len(orders), len(archived)), (1, 1))
+        snapshot = self.backups.create()
+
+        manifest = read_manifest(snapshot.path)
+        self.assertEqual([entry["name"] for entry in manifest["files"]][0], "test.db")
+        self.assertTrue(manifest["files"][1]["name"].startswith("archive/orders_"))
+        for entry in manifest["files"]:
+            compressed = os.path.join(snapshot.path, entry["file"])
+            self.assertTrue(entry["file"].endswith(".gz"))
+            self.assertEqual(file_sha256(compressed), entry["sha256"])
+            with gzip.open(compressed, "rb") as file:
+                self.assertEqual(len(file.read()), entry["size"])
+
+        # Changes made after the snapshot are undone by the restore
+        self.orders.place_cart([(2, 1)])
+        self.orders.delete_order(orders[0][1])
+        self.db.close()
+        self.backups.restore(snapshot.name)
+
+        check_integrity(self.db_name)
+        self.db = Database(self.db_name)
+        self.assertEqual(self.db.fetch_all(ORDERS_SQL), orders)
+        self.assertEqual(self.archived_orders(), archived)
+        # The files replaced by the restore were saved as a snapshot of their own
+        self.assertEqual(len(self.backups.snapshots()), 2)
+
+    def assertRestoreRejected(self, snapshot):
+        orders = self.db.fetch_all(ORDERS_SQL)
+        with self.assertRaises(BackupError):
+            self.backups.restore(snapshot.name)
+        self.assertEqual(self.db.fetch_all(ORDERS_SQL), orders)
+        self.assertEqual(len(self.backups.snapshots()), 1)
+
+    def test_archive_not_matching_its_checksum_is_rejected(self):
+        snapshot = self.backups.create()
+        compressed = os.path.join(snapshot.path, "test.db.gz")
+        with open(compressed, "r+b") as file:
+            file.seek(os.path.getsize(compressed) // 2)
+            byte = file.read(1)
+            file.seek(-1, os.SEEK_CUR)
+            file.write(bytes([byte[0] ^ 0xFF]))
+        self.assertRestoreRejected(snapshot)
+
+    def test_unreadable_archive_is_rejected(self):
+        # Damaged before the checksum was taken: a truncated gzip stream
+        snapshot = self.backups.create()
+        compressed = os.path.join(snapshot.path, "test.db.gz")
+        with open(compressed, "r+b") as file:
+            file.truncate(os.path.getsize(compressed) // 2)
+        manifest = read_manifest(snapshot.path)
+        manifest["files"][0]["sha256"] = file_sha256(compressed)
+        with open(os.path.join(snapshot.path, MANIFEST), "w", encoding="utf-8") as file:
+            json.dump(manifest, file)
+        self.assertRestoreRejected(snapshot)
+
+
+if __name__ == "__main__":
+    unittest.main()
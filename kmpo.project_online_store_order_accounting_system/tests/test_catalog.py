@@ -0,0 +1,49 @@
+import unittest
+
+from catalog import ProductCatalog
+from tests.base import StoreTestCase
+
+
+class ProductCatalogTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.catalog = ProductCatalog(self.db)
+
+    def test_update_refreshes_loaded_entry(self):
+        self.assertEqual([product.name for product in self.catalog.all()], ["Cup", "Tea"])
+        self.db.query("UPDATE products SET name = 'Green tea', price = 12.0 WHERE id = 1")
+        self.assertEqual(self.catalog.stale, {1})
+        self.assertEqual(self.catalog.get(1).price, 12.0)
+        self.assertEqual(self.catalog.find("Tea"), [])
+        self.assertEqual([product.id for product in self.catalog.find("Green tea")], [1])
+        self.assertFalse(self.catalog.stale)
+
+    def test_delete_drops_entry(self):
+        self.catalog.load()
+        self.db.query("DELETE FROM products WHERE id = 2")
+        self.assertIsNone(self.catalog.get(2))
+        self.assertEqual([product.name for product in self.catalog.all()], ["Tea"])
+
+    def test_bulk_edit_is_reread_in_one_query(self):
+        self.catalog.load()
+        with self.db.transaction():
+            self.db.query("UPDATE products SET quantity = quantity - 1")
+            self.db.query("INSERT INTO products (name, price, quantity) VALUES ('Spoon', 3.0, 5)")
+        self.assertEqual(self.catalog.stale, {1, 2, 3})
+        queries = []
+        fetch_all = self.db.fetch_all
+        self.db.fetch_all = lambda query, params=(): queries.append(query) or fetch_all(query, params)
+        products = self.catalog.all()
+        self.assertEqual(len(queries), 1)
+        self.assertEqual([(product.name, product.quantity) for product in products], [("Cup", 99), ("Spoon", 5), ("Tea", 99)])
+
+    def test_unloaded_catalog_ignores_untracked_rows(self):
+        self.db.query("UPDATE products SET price = 11.0 WHERE id = 1")
+        self.assertFalse(self.catalog.stale)
+        self.assertEqual(self.catalog.get(1).price, 11.0)
+        self.db.query("UPDATE products SET price = 9.0 WHERE id = 1")
+        self.assertEqual(self.catalog.get(1).price, 9.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
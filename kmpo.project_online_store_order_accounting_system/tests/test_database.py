@@ -0,0 +1,71 @@
+import threading
+import unittest
+
+from database import INSERTED, WriteQueue
+from tests.base import StoreTestCase
+
+
+def insert_product(db, name, fail=False):
+    db.query("INSERT INTO products (name, price, quantity) VALUES (?, 1.0, 1)", (name,))
+    if fail:
+        raise ValueError(name)
+
+
+class ChangeEventsTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = []
+        self.lock_free = []
+        self.db.subscribe(self.on_change)
+
+    def on_change(self, change):
+        self.events.append(change)
+        # The write lock must already be released: another thread can take it
+        other = threading.Thread(target=lambda: self.lock_free.append(self.take_write_lock()))
+        other.start()
+        other.join()
+
+    def take_write_lock(self):
+        if self.db.write_lock.acquire(timeout=1):
+            self.db.write_lock.release()
+            return True
+        return False
+
+    def product_id(self, name):
+        return self.db.fetch_one("SELECT id FROM products WHERE name = ?", (name,))[0]
+
+    def test_rolled_back_item_sends_no_events(self):
+        writes = WriteQueue(self.db)
+        try:
+            batch = [
+                writes.submit(insert_product, self.db, "Spoon"),
+                writes.submit(insert_product, self.db, "Fork", True),
+                writes.submit(insert_product, self.db, "Plate"),
+            ]
+            for future in batch:
+                future.exception()
+        finally:
+            writes.close()
+        self.assertIsNone(self.db.fetch_one("SELECT id FROM products WHERE name = 'Fork'"))
+        inserted = [change.rowid for change in self.events if change.table == "products" and change.kind == INSERTED]
+        self.assertEqual(inserted, [self.product_id("Spoon"), self.product_id("Plate")])
+
+    def test_listeners_run_outside_write_lock(self):
+        self.db.query("UPDATE products SET quantity = 5 WHERE name = 'Tea'")
+        with self.db.transaction():
+            insert_product(self.db, "Spoon")
+        self.assertTrue(self.events)
+        self.assertEqual(self.lock_free, [True] * len(self.events))
+
+    def test_listener_can_write(self):
+        def on_change(change):
+            if change.table == "products" and change.kind == INSERTED:
+                self.db.query("UPDATE products SET quantity = 7 WHERE id = ?", (change.rowid,))
+
+        self.db.subscribe(on_change)
+        insert_product(self.db, "Spoon")
+        self.assertEqual(self.db.fetch_one("SELECT quantity FROM products WHERE name = 'Spoon'")[0], 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
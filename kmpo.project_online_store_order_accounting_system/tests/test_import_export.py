@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import unittest
+
+from database import Database
+from import_export import export_table, import_orders, import_products
+from tests.base import StoreTestCase
+
+PRODUCTS_SQL = "SELECT id, name, price, quantity FROM products ORDER BY id"
+
+
+class ImportExportTest(StoreTestCase):
+    PRODUCTS = StoreTestCase.PRODUCTS + [('Mug, "large"', 7.5, 3), ("Чайник", 1200.0, 0)]
+
+    def path(self, name, text=None):
+        path = os.path.join(self.directory, name)
+        if text is not None:
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(text)
+        return path
+
+    def empty_database(self):
+        db = Database(self.path(f"copy{len(os.listdir(self.directory))}.db"))
+        self.addCleanup(db.close)
+        return db
+
+    def test_round_trip(self):
+        self.orders.place_cart([(1, 2), (3, 1)])
+        placed = self.orders.place_cart([(2, 4)])
+        self.orders.edit_order(placed.order_number, None, "Shipped")
+        for extension in ("csv", "jsonl"):
+            with self.subTest(extension=extension):
+                products, orders = self.path(f"products.{extension}"), self.path(f"orders.{extension}")
+                export_table(self.db, "products", products)
+                export_table(self.db, "orders", orders)
+                copy = self.empty_database()
+                self.assertEqual(import_products(copy, products, chunk_size=3).written, 4)
+                self.assertEqual(import_orders(copy, orders, chunk_size=2).written, 3)
+                self.assertEqual(copy.fetch_all(PRODUCTS_SQL), self.db.fetch_all(PRODUCTS_SQL))
+                exported = self.path(f"copy.{extension}")
+                export_table(copy, "orders", exported)
+                with open(orders, encoding="utf-8") as original, open(exported, encoding="utf-8") as result:
+                    self.assertEqual(result.read(), original.read())
+
+    def test_malformed_rows_are_skipped(self):
+        products = self.path("products.csv", "id,name,price,quantity\n,Spoon,3.0,5\n,Fork,cheap,5\n,Knife,4.0,many\n,Plate,\n")
+        progress = import_products(self.db, products)
+        self.assertEqual((progress.written, progress.skipped), (1, 3))
+        self.assertEqual([row[1] for row in self.db.fetch_all(PRODUCTS_SQL)], ["Tea", "Cup", 'Mug, "large"', "Чайник", "Spoon"])
+
+        orders = self.path("orders.jsonl", '{"order_number": "A-1", "product_id": 1, "quantity": 2, "price": 20.0}\n'
+                                           '{"order_number": "A-2", "product_id": 1, "price": 20.0}\n'
+                                           '{"order_number": "A-3", "product_id": 2, "quantity": "x", "price": 5.0}\n'
+                                           '\n'
+                                           '{"order_number": "A-4", "product_id": 2, "quantity": 1, "price": 25.0}\n')
+        progress = import_orders(self.db, orders)
+        self.assertEqual((progress.written, progress.skipped), (2, 2))
+        self.assertEqual(self.db.fetch_all("SELECT order_number, quantity, price FROM orders ORDER BY id"),
+                         [("A-1", 2, 20.0), ("A-4", 1, 25.0)])
+
+    def test_failed_chunk_is_rolled_back(self):
+        # The third line fails after the chunk already wrote its first order
+        self.db.query("CREATE TEMP TRIGGER reject_line BEFORE INSERT ON order_items WHEN new.quantity = 13 "
+                      "BEGIN SELECT RAISE(ABORT, 'rejected'); END")
+        orders = self.path("orders.csv", "order_number,product_id,quantity,price\n"
+                                         "B-1,1,1,10.0\nB-2,2,1,25.0\nB-3,1,2,20.0\nB-3,2,13,325.0\n")
+        with self.assertRaises(sqlite3.IntegrityError):
+            import_orders(self.db, orders, chunk_size=2)
+        # The first chunk was committed; nothing of the failed one remains
+        self.assertEqual([row[0] for row in self.db.fetch_all("SELECT order_number FROM orders ORDER BY id")], ["B-1", "B-2"])
+        self.assertEqual(self.db.fetch_one("SELECT COUNT(*) FROM order_items")[0], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
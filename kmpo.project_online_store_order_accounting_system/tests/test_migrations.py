@@ -0,0 +1,48 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from database import Database
+from migrations import LEGACY_CREATED_AT
+
+
+class LegacyOrdersTest(unittest.TestCase):
+    # A file from before the migrations: orders name their product and have no date
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        path = os.path.join(self.directory, "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE orders (id INTEGER PRIMARY KEY, order_number TEXT, product_name TEXT, "
+                     "quantity INTEGER, price REAL, status TEXT)")
+        conn.execute("CREATE TABLE products (id INTEGER PRIMARY KEY, name TEXT, price REAL)")
+        conn.execute("INSERT INTO products (name, price) VALUES ('Tea', 10.0)")
+        conn.executemany("INSERT INTO orders (order_number, product_name, quantity, price, status) VALUES (?, ?, ?, ?, ?)",
+                         [("ORD-1", "Tea", 2, 20.0, "Completed"), ("ORD-2", "Kettle", 1, 40.0, "Completed"),
+                          ("ORD-3", "Kettle", 2, 90.0, "Pending")])
+        conn.commit()
+        conn.close()
+        self.db = Database(path)
+
+    def tearDown(self):
+        self.db.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_unknown_product_name_is_kept(self):
+        self.assertEqual(self.db.fetch_all("SELECT name, price, quantity FROM products ORDER BY id"),
+                         [("Tea", 10.0, 0), ("Kettle", 45.0, 0)])
+        lines = self.db.fetch_all("""
+            SELECT orders.order_number, products.name FROM order_items
+            JOIN orders ON orders.id = order_items.order_id LEFT JOIN products ON products.id = order_items.product_id
+            ORDER BY orders.id""")
+        self.assertEqual(lines, [("ORD-1", "Tea"), ("ORD-2", "Kettle"), ("ORD-3", "Kettle")])
+
+    def test_legacy_orders_are_dated_as_such(self):
+        self.assertEqual(self.db.fetch_all("SELECT DISTINCT created_at FROM orders"), [(LEGACY_CREATED_AT,)])
+        self.assertEqual(self.db.fetch_all("SELECT day, status, orders FROM daily_sales ORDER BY status"),
+                         [(LEGACY_CREATED_AT[:10], "Completed", 2), (LEGACY_CREATED_AT[:10], "Pending", 1)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+
+from reports import SalesReports
+from tests.base import StoreTestCase
+
+
+class SalesTotalsTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reports = SalesReports(self.db)
+
+    def test_two_line_cart_is_one_order(self):
+        self.orders.place_cart([(1, 2), (2, 1)])
+        self.orders.place_cart([(1, 1)])
+        totals = self.reports.totals()
+        self.assertEqual(totals.orders, 2)
+        self.assertEqual(totals.quantity, 4)
+        self.assertAlmostEqual(totals.revenue, 55.0)
+
+    def test_cancelled_cart_is_not_counted(self):
+        placed = self.orders.place_cart([(1, 2), (2, 1)])
+        self.orders.place_cart([(2, 2)])
+        self.orders.edit_order(placed.order_number, [(1, 2), (2, 1)], "Cancelled")
+        totals = self.reports.totals()
+        self.assertEqual((totals.orders, totals.quantity), (1, 2))
+        self.assertAlmostEqual(totals.revenue, 50.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from tests.base import StoreTestCase
+
+
+class EditOrderTest(StoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.placed = self.orders.place_cart([(1, 2), (2, 1)])
+
+    def lines(self):
+        return self.db.fetch_all("SELECT id, product_id, quantity, price FROM order_items WHERE order_id = ? ORDER BY id",
+                                 (self.placed.id,))
+
+    def stock(self):
+        return [row[0] for row in self.db.fetch_all("SELECT quantity FROM products ORDER BY id")]
+
+    def test_status_only_edit_keeps_lines(self):
+        lines = self.lines()
+        self.db.query("UPDATE products SET price = 12.0 WHERE id = 1")
+        self.orders.edit_order(self.placed.order_number, [(1, 2), (2, 1)], "Shipped")
+        self.assertEqual(self.lines(), lines)
+        self.assertEqual(self.db.fetch_one("SELECT status FROM orders WHERE id = ?", (self.placed.id,))[0], "Shipped")
+
+    def test_cancel_and_reopen_moves_stock_only(self):
+        lines = self.lines()
+        self.orders.edit_order(self.placed.order_number, [(1, 2), (2, 1)], "Cancelled")
+        self.assertEqual(self.stock(), [100, 100])
+        self.orders.edit_order(self.placed.order_number, [(1, 2), (2, 1)], "Pending")
+        self.assertEqual(self.stock(), [98, 99])
+        self.assertEqual(self.lines(), lines)
+
+    def test_changed_cart_replaces_lines(self):
+        self.orders.edit_order(self.placed.order_number, [(1, 3)], "Pending")
+        self.assertEqual([line[1:] for line in self.lines()], [(1, 3, 30.0)])
+        self.assertEqual(self.stock(), [97, 100])
+
+
+    def test_status_only_edit_keeps_unlinked_line(self):
+        # A legacy line whose product could not be linked during migration
+        self.db.query("UPDATE order_items SET product_id = NULL WHERE order_id = ? AND product_id = 2", (self.placed.id,))
+        lines = self.lines()
+        self.orders.edit_order(self.placed.order_number, None, "Shipped")
+        self.assertEqual(self.lines(), lines)
+        self.orders.edit_order(self.placed.order_number, None, "Cancelled")
+        self.assertEqual(self.lines(), lines)
+        self.assertEqual(self.stock(), [100, 100])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from snapshot import OrderSnapshot
+from tests.base import StoreTestCase
+
+STATUS_SQL = """
+    SELECT COALESCE(status, ''), COUNT(*), SUM(COALESCE(quantity, 0)), SUM(COALESCE(price, 0.0))
+    FROM orders GROUP BY 1
+"""
+PRODUCT_SQL = """
+    SELECT products.name, COUNT(*), SUM(order_items.quantity), SUM(order_items.price)
+    FROM order_items JOIN products ON products.id = order_items.product_id
+    GROUP BY order_items.product_id
+"""
+
+
+class IncrementalRefreshTest(StoreTestCase):
+    PRODUCTS = StoreTestCase.PRODUCTS + [("Spoon", 3.0, 100)]
+
+    def setUp(self):
+        super().setUp()
+        self.placed = [self.orders.place_cart(cart).order_number for cart in ([(1, 2), (2, 1)], [(2, 3)], [(3, 1), (1, 1)], [(3, 4)])]
+        # Enough untouched orders that the deletes below stay under MAX_DEAD_SHARE
+        for number in range(16):
+            self.orders.place_cart([(number % 3 + 1, 1)])
+        self.snapshots = [OrderSnapshot(self.db), OrderSnapshot(self.db, chunk_size=2, use_numpy=False)]
+        for snapshot in self.snapshots:
+            snapshot.refresh()
+
+    def assertMatchesSql(self):
+        # Compared after every refresh against an aggregate over the live tables
+        by_status = {status or "(none)": (count, quantity, round(revenue, 2))
+                     for status, count, quantity, revenue in self.db.fetch_all(STATUS_SQL)}
+        by_product = {name: (count, quantity, round(revenue, 2)) for name, count, quantity, revenue in self.db.fetch_all(PRODUCT_SQL)}
+        for snapshot in self.snapshots:
+            with self.subTest(numpy=snapshot.numpy is not None):
+                # An incremental refresh, not a reload from a cleared snapshot
+                self.assertFalse(snapshot.stale)
+                snapshot.refresh()
+                self.assertEqual({row.key: (row.orders, row.quantity, round(row.revenue, 2)) for row in snapshot.by_status()}, by_status)
+                self.assertEqual({row.key: (row.orders, row.quantity, round(row.revenue, 2)) for row in snapshot.by_product()}, by_product)
+                self.assertEqual(len(snapshot), sum(row[0] for row in by_status.values()))
+
+    def test_inserts_above_the_mark(self):
+        self.orders.place_cart([(1, 5)])
+        self.orders.place_cart([(2, 1), (3, 2)])
+        self.assertMatchesSql()
+
+    def test_status_updates_below_the_mark(self):
+        self.orders.edit_order(self.placed[0], None, "Shipped")
+        self.orders.edit_order(self.placed[2], None, "Cancelled")
+        self.assertMatchesSql()
+
+    def test_line_edits_below_the_mark(self):
+        self.orders.edit_order(self.placed[1], [(2, 1), (1, 4)], "Pending")
+        self.orders.edit_order(self.placed[3], [(1, 1)], "Shipped")
+        self.assertMatchesSql()
+
+    def test_deletes_below_the_mark(self):
+        self.orders.delete_order(self.placed[0])
+        self.orders.delete_order(self.placed[2])
+        self.assertMatchesSql()
+
+    def test_mixed_changes_across_refreshes(self):
+        self.orders.delete_order(self.placed[1])
+        new = self.orders.place_cart([(1, 1), (2, 1)]).order_number
+        self.assertMatchesSql()
+        self.orders.edit_order(new, None, "Shipped")
+        self.orders.edit_order(self.placed[0], [(3, 2)], "Pending")
+        self.orders.delete_order(self.placed[3])
+        self.orders.place_cart([(3, 3)])
+        self.assertMatchesSql()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,13 +1,79 @@
-from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QPushButton, QWidget, QMessageBox, QDialog, QLineEdit, QComboBox, QLabel, QDialogButtonBox, QTableWidget, QTableWidgetItem
-from PyQt6.QtGui import QIntValidator
-from database import Database
+from functools import partial
+from PyQt6.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QPushButton, QWidget, QMessageBox, QDialog, QLineEdit, QComboBox, QLabel, QDialogButtonBox, QTableView, QAbstractItemView, QFileDialog, QProgressDialog, QTabWidget, QTableWidget, QTableWidgetItem, QSpinBox, QCheckBox, QInputDialog
+from datetime import datetime, timezone
+from PyQt6.QtCore import Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QIntValidator, QDoubleValidator
+from database import Database, WriteQueue
+from db_worker import DatabaseExecutor
+from catalog import get_catalog
+from models import OrdersTableModel, ProductsTableModel
+from services import OrderService, ProductService, ProductNotFoundError, InsufficientStockError, ORDER_STATUSES
+# import_export, reports, archive, backup, inventory  ui_products    :     
+
+class DatabaseDialog(QDialog):
+    #   :       ,
+    #      
+    def __init__(self, db, executor):
+        super().__init__()
+        self.db = db
+        self.executor = executor
+
+    def set_busy(self, busy):
+        self.buttons.setEnabled(not busy)
+
+    def run(self, function, *args, on_result=None, error_title="Database Error"):
+        self.set_busy(True)
+
+        def done(result):
+            self.set_busy(False)
+            if on_result is not None:
+                on_result(result)
+
+        def failed(error):
+            self.set_busy(False)
+            QMessageBox.warning(self, error_title, str(error))
+
+        self.executor.submit(function, *args, on_result=done, on_error=failed)
+
+    def load_products(self):
+        #       ;      ,    
+        catalog = get_catalog(self.db)
+        if catalog.loaded and not catalog.stale:
+            self.products_loaded(catalog.all())
+        else:
+            self.run(catalog.all, on_result=self.products_loaded)
+
+    def products_loaded(self, products):
+        self.product_combobox.setPlaceholderText("")
+        for product in products:
+            self.product_combobox.addItem(product.name, product.id)
+
+    def saved(self, result):
+        #    ,   
+        super().accept()
 
 class MainApp(QMainWindow):
-    def __init__(self):
-        super().__init__()
+    #  /    
+    progress_reported = pyqtSignal(str)
 
-        #   
-        self.db = Database('store.db')
+    def __init__(self, query_profile=False):
+        super().__init__()
+        self.query_profile = query_profile
+
+        #   ;        .
+        #         (start_background)
+        self.db = Database('store.db', create_schema=False)
+        self.executor = DatabaseExecutor(self.db)
+        self.executor.busy_changed.connect(self.show_loading)
+        #          ,    
+        self.order_service = OrderService(self.db)
+        self.product_service = ProductService(self.db)
+        #      :     commit
+        self.write_queue = WriteQueue(self.db)
+        # ,  ,     ,     (schema_ready)
+        self.archiver = None
+        self.backups = None
+        self.stock_ledger = None
 
         #  
         self.setWindowTitle("Order Management System")
@@ -18,15 +84,55 @@ class MainApp(QMainWindow):
 
         self.layout = QVBoxLayout()
 
+        #  :     ,    
+        search_layout = QHBoxLayout()
+        self.number_search_input = QLineEdit()
+        self.number_search_input.setPlaceholderText("Order number starts with")
+        search_layout.addWidget(self.number_search_input)
+
+        self.status_filter_combobox = QComboBox()
+        self.status_filter_combobox.addItem("All statuses", None)
+        for status in ORDER_STATUSES:
+            self.status_filter_combobox.addItem(status, status)
+        search_layout.addWidget(self.status_filter_combobox)
+
+        self.product_search_input = QLineEdit()
+        self.product_search_input.setPlaceholderText("Product name")
+        search_layout.addWidget(self.product_search_input)
+
+        self.min_price_input = QLineEdit()
+        self.min_price_input.setPlaceholderText("Min price")
+        self.min_price_input.setValidator(QDoubleValidator(0, 1e12, 2))
+        search_layout.addWidget(self.min_price_input)
+
+        self.max_price_input = QLineEdit()
+        self.max_price_input.setPlaceholderText("Max price")
+        self.max_price_input.setValidator(QDoubleValidator(0, 1e12, 2))
+        search_layout.addWidget(self.max_price_input)
+        self.layout.addLayout(search_layout)
+
+        #       ,      
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(300)
+        self.search_timer.timeout.connect(self.apply_search)
+        for line_edit in (self.number_search_input, self.product_search_input, self.min_price_input, self.max_price_input):
+            line_edit.textChanged.connect(self.search_timer.start)
+        self.status_filter_combobox.currentIndexChanged.connect(self.search_timer.start)
+
         #     
-        self.orders_table = QTableWidget()
-        self.orders_table.setColumnCount(5)  # 5 : , , , , 
-        self.orders_table.setHorizontalHeaderLabels(["Order Number", "Product", "Quantity", "Price(rubles)", "Status"])
+        #        (5 : , , , , )
+        self.orders_model = OrdersTableModel(self.db, executor=self.executor)
+        #      schema_ready,     
+        self.orders_table = QTableView()
+        self.orders_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        #        ;        
+        self.orders_table.horizontalHeader().setSortIndicator(-1, Qt.SortOrder.AscendingOrder)
+        self.orders_table.horizontalHeader().setSortIndicatorClearable(True)
+        self.orders_table.setSortingEnabled(True)
+        self.orders_table.horizontalHeader().sortIndicatorChanged.connect(self.sort_indicator_changed)
         self.layout.addWidget(self.orders_table)
 
-        #   
-        self.update_orders_list()
-
         #  
         self.add_order_button = QPushButton("Add Order")
         self.add_order_button.clicked.connect(self.add_order)
@@ -44,81 +150,255 @@ class MainApp(QMainWindow):
         self.manage_products_button.clicked.connect(self.manage_products)
         self.layout.addWidget(self.manage_products_button)
 
-        container.setLayout(self.layout)
+        self.reports_button = QPushButton("Reports")
+        self.reports_button.clicked.connect(self.show_reports)
+        self.layout.addWidget(self.reports_button)
 
-    def update_orders_list(self):
-        orders = self.db.fetch_all("SELECT order_number, product_name, quantity, price, status FROM orders")
-        self.orders_table.setRowCount(len(orders))
+        container.setLayout(self.layout)
+        #    ,     (schema_ready)
+        container.setEnabled(False)
+
+        #     CSV/JSONL
+        file_menu = self.menuBar().addMenu("File")
+        for table in ("products", "orders"):
+            file_menu.addAction(f"Import {table.capitalize()}...", partial(self.import_table, table))
+        file_menu.addSeparator()
+        for table in ("products", "orders"):
+            file_menu.addAction(f"Export {table.capitalize()}...", partial(self.export_table, table))
+        file_menu.addSeparator()
+        # ,  schema_ready  
+        self.archive_action = file_menu.addAction("Archive Old Orders", self.archive_orders)
+        self.archive_action.setEnabled(False)
+        # ,  schema_ready    
+        self.back_up_action = file_menu.addAction("Back Up Now", self.back_up)
+        self.back_up_action.setEnabled(False)
+        # ,  schema_ready    
+        self.reconcile_action = file_menu.addAction("Reconcile Stock", self.reconcile_stock)
+        self.reconcile_action.setEnabled(False)
+        diagnostics_menu = self.menuBar().addMenu("Diagnostics")
+        diagnostics_menu.addAction("Query Profile...", self.show_diagnostics)
+        self.menuBar().setEnabled(False)
+
+        #       ,      
+        QTimer.singleShot(0, self.start_background)
+
+    def start_background(self):
+        #    ()    -      
+        #   ;      
+        self.executor.submit(self.db.open_schema, on_result=self.schema_ready, on_error=self.schema_failed)
+        self.statusBar().showMessage("Opening database...")
+
+    def schema_failed(self, error):
+        QMessageBox.critical(self, "Database Error", f"The database could not be opened: {error}")
+        self.close()
+
+    def schema_ready(self, version):
+        from archive import OrderArchiver
+        from backup import BackupManager
+        from inventory import StockLedger
+
+        self.centralWidget().setEnabled(True)
+        self.menuBar().setEnabled(True)
+        #  --query-profile      ,  -  
+        #  Diagnostics;          
+        if self.query_profile:
+            self.db.enable_profiling()
+        #        
+        self.orders_table.setModel(self.orders_model)
+        self.update_orders_list()
 
-        for row, order in enumerate(orders):
-            for col, data in enumerate(order):
-                #     2   
-                if col == 3:  #   
-                    data = "{:.2f}".format(data)
-                self.orders_table.setItem(row, col, QTableWidgetItem(str(data)))
+        #      90       ;
+        #    ,      orders_history
+        self.archiver = OrderArchiver(self.db, days=90)
+        self.archiver.start()
+        self.archive_action.setEnabled(True)
+        #       ,   ;  7 
+        self.backups = BackupManager(self.db.connections.db_name, archive_directory=self.archiver.directory)
+        self.backups.start()
+        self.back_up_action.setEnabled(True)
+        #             
+        self.stock_ledger = StockLedger(self.db)
+        self.stock_ledger.start()
+        self.reconcile_action.setEnabled(True)
+        #    ,     
+        self.executor.submit(get_catalog(self.db).load)
 
+    def update_orders_list(self):
+        self.orders_model.reload()
+
+    def apply_search(self):
+        def price(line_edit):
+            text = line_edit.text().replace(",", ".")
+            try:
+                return float(text) if text else None
+            except ValueError:
+                return None
+
+        self.orders_model.set_search(number_prefix=self.number_search_input.text().strip(),
+                                     status=self.status_filter_combobox.currentData(),
+                                     product=self.product_search_input.text(),
+                                     min_price=price(self.min_price_input),
+                                     max_price=price(self.max_price_input))
+
+    def sort_indicator_changed(self, column, order):
+        #   :    ,   
+        if column in self.orders_model.unsortable_columns:
+            sort_column = self.orders_model.sort_column
+            descending = self.orders_model.descending
+            self.orders_table.horizontalHeader().setSortIndicator(
+                -1 if sort_column is None else sort_column,
+                Qt.SortOrder.DescendingOrder if descending else Qt.SortOrder.AscendingOrder)
+
+    def show_loading(self, busy):
+        if busy:
+            self.statusBar().showMessage("Loading...")
+        else:
+            self.statusBar().clearMessage()
 
     def add_order(self):
-        dialog = AddOrderDialog(self.db)
+        dialog = AddOrderDialog(self.db, self.executor)
         if dialog.exec() == QDialog.DialogCode.Accepted:
-            product_id = dialog.selected_product_id
-            quantity = dialog.selected_quantity
-            product_data = self.db.fetch_one("SELECT id, name, quantity FROM products WHERE id = ?", (product_id,))
-
-            if product_data:
-                available_quantity = product_data[2]
-                if available_quantity < quantity:
-                    QMessageBox.warning(self, "Insufficient Product", "Not enough product in stock to complete this order.")
-                else:
-                    #   
-                    order_number = dialog.selected_order_number
-                    product_name = product_data[1]
-                    price = dialog.selected_price
-                    total_price = price * quantity
-
-                    self.db.query("INSERT INTO orders (order_number, product_name, quantity, price, status) VALUES (?, ?, ?, ?, ?)",
-                                  (order_number, product_name, quantity, total_price, "Pending"))
-
-                    #     
-                    self.db.query("UPDATE products SET quantity = quantity - ? WHERE id = ?", (quantity, product_id))
-
-                    #   
-                    self.update_orders_list()
-
-                    QMessageBox.information(self, "Order Added", "Order has been successfully added!")
-            else:
-                QMessageBox.warning(self, "Product Error", "The selected product does not exist.")
+            #  ,          
+            #    
+            future = self.write_queue.submit(self.order_service.place_cart, dialog.cart_items())
+            self.executor.track(future, on_result=self.order_placed, on_error=self.order_failed)
+
+    def order_placed(self, order):
+        QMessageBox.information(self, "Order Added", "Order has been successfully added!")
+
+    def order_failed(self, error):
+        if isinstance(error, ProductNotFoundError):
+            QMessageBox.warning(self, "Product Error", str(error))
+        elif isinstance(error, InsufficientStockError):
+            QMessageBox.warning(self, "Insufficient Product", str(error))
+        else:
+            QMessageBox.warning(self, "Database Error", str(error))
 
     def edit_order(self):
-        dialog = EditOrderDialog(self.db)
+        dialog = EditOrderDialog(self.db, self.executor, self.order_service)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             QMessageBox.information(self, "Order Edited", "Order has been successfully edited!")
-            self.update_orders_list()
 
     def delete_order(self):
-        dialog = DeleteOrderDialog(self.db)
+        dialog = DeleteOrderDialog(self.db, self.executor, self.order_service)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             QMessageBox.information(self, "Order Deleted", "Order has been successfully deleted!")
-            self.update_orders_list()
 
     def manage_products(self):
-        dialog = ManageProductsDialog(self.db)
+        dialog = ManageProductsDialog(self.db, self.executor, self.product_service)
+        dialog.exec()
+
+    def show_reports(self):
+        dialog = ReportsDialog(self.db, self.executor)
+        dialog.exec()
+
+    def show_diagnostics(self):
+        dialog = DiagnosticsDialog(self.db)
         dialog.exec()
 
+    def closeEvent(self, event):
+        if self.stock_ledger is not None:
+            self.stock_ledger.close()
+        if self.backups is not None:
+            self.backups.close()
+        if self.archiver is not None:
+            self.archiver.close()
+        self.write_queue.close()
+        self.executor.shutdown()
+        super().closeEvent(event)
+
+    def run_with_progress(self, title, function, *args):
+        from import_export import Progress
+
+        dialog = QProgressDialog(title, None, 0, 0, self)
+        dialog.setWindowTitle(title)
+        dialog.setMinimumDuration(0)
+        self.progress_reported.connect(dialog.setLabelText)
+
+        #     ,       
+        progress = Progress(lambda progress: self.progress_reported.emit(
+            f"{progress.rows} rows, {progress.rate:.0f} rows/s"), interval=0.2)
+
+        def finish():
+            self.progress_reported.disconnect(dialog.setLabelText)
+            dialog.close()
+
+        def done(result):
+            finish()
+            QMessageBox.information(self, f"{title} Finished",
+                                    f"{progress.written} rows written, {progress.skipped} skipped in {progress.elapsed:.1f}s "
+                                    f"({progress.rate:.0f} rows/s).")
+
+        def failed(error):
+            finish()
+            QMessageBox.warning(self, f"{title} Error", str(error))
+
+        self.executor.submit(partial(function, *args, progress=progress), on_result=done, on_error=failed)
+
+    def archive_orders(self):
+        #    ,     ,    
+        self.run_with_progress("Archive", self.archiver.archive_all)
+
+    def back_up(self):
+        def done(snapshot):
+            self.statusBar().clearMessage()
+            QMessageBox.information(self, "Backup Finished",
+                                    f"Snapshot {snapshot.name} saved ({snapshot.size / 1024 / 1024:.1f} MB compressed).")
+
+        def failed(error):
+            self.statusBar().clearMessage()
+            QMessageBox.warning(self, "Backup Error", str(error))
+
+        self.statusBar().showMessage("Backing up...")
+        self.executor.submit(self.backups.create, on_result=done, on_error=failed)
+
+    def reconcile_stock(self):
+        #  :  ,   ;    'correction'
+        def done(mismatches):
+            self.statusBar().clearMessage()
+            if not mismatches:
+                QMessageBox.information(self, "Stock Reconciled", "Stock ledger matches every product balance.")
+                return
+            lines = "\n".join(f"Product {mismatch.product_id}: balance {mismatch.balance}, ledger {mismatch.ledger}"
+                              for mismatch in mismatches[:20])
+            QMessageBox.warning(self, "Stock Reconciled",
+                                f"{len(mismatches)} products did not match their ledger and were corrected:\n{lines}")
+
+        self.statusBar().showMessage("Reconciling stock...")
+        self.executor.submit(partial(self.stock_ledger.reconcile, full=True, fix=True), on_result=done,
+                             on_error=lambda error: QMessageBox.warning(self, "Reconcile Error", str(error)))
+
+    def import_table(self, table):
+        from import_export import IMPORTERS
+
+        path, _ = QFileDialog.getOpenFileName(self, f"Import {table}", "", "Data files (*.csv *.jsonl *.ndjson)")
+        if path:
+            self.run_with_progress("Import", IMPORTERS[table], self.db, path)
+
+    def export_table(self, table):
+        from import_export import export_table
+
+        path, _ = QFileDialog.getSaveFileName(self, f"Export {table}", f"{table}.csv", "CSV (*.csv);;JSON Lines (*.jsonl)")
+        if path:
+            self.run_with_progress("Export", export_table, self.db, table, path)
+
 
 class ManageProductsDialog(QDialog):
-    def __init__(self, db):
+    def __init__(self, db, executor, product_service):
         super().__init__()
         self.db = db
+        self.executor = executor
+        self.product_service = product_service
         self.setWindowTitle("Manage Products")
         self.setGeometry(250, 250, 600, 400)
 
         self.layout = QVBoxLayout()
 
         #     
-        self.products_table = QTableWidget()
-        self.products_table.setColumnCount(4)  # 4 : ID, , , 
-        self.products_table.setHorizontalHeaderLabels(["ID", "Product Name", "Price(rubles)", "Quantity"])
+        self.products_model = ProductsTableModel(self.db, executor=self.executor)  # 4 : ID, , , 
+        self.products_table = QTableView()
+        self.products_table.setModel(self.products_model)
+        self.products_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self.layout.addWidget(self.products_table)
 
         #    
@@ -134,39 +414,45 @@ class ManageProductsDialog(QDialog):
         self.delete_product_button.clicked.connect(self.delete_selected_product)
         self.layout.addWidget(self.delete_product_button)
 
+        self.receive_stock_button = QPushButton("Receive Stock")
+        self.receive_stock_button.clicked.connect(self.receive_stock)
+        self.layout.addWidget(self.receive_stock_button)
+
+        self.stock_history_button = QPushButton("Stock History")
+        self.stock_history_button.clicked.connect(self.show_stock_history)
+        self.layout.addWidget(self.stock_history_button)
+
+        #    :        
+        self.bulk_edit_button = QPushButton("Bulk Edit...")
+        self.bulk_edit_button.clicked.connect(self.bulk_edit)
+        self.layout.addWidget(self.bulk_edit_button)
+
         self.load_products()
         self.setLayout(self.layout)
 
     def load_products(self):
         #      
-        products = self.db.fetch_all("SELECT id, name, price, quantity FROM products")
-        self.products_table.setRowCount(len(products))
-
-        for row, product in enumerate(products):
-            for col, data in enumerate(product):
-                self.products_table.setItem(row, col, QTableWidgetItem(str(data)))
+        self.products_model.reload()
 
     def edit_selected_product(self):
         #   
-        current_row = self.products_table.currentRow()
+        current_row = self.products_table.currentIndex().row()
         if current_row != -1:
-            product_id = int(self.products_table.item(current_row, 0).text())  #  ID 
-            dialog = EditProductDialog(self.db, product_id)  #   
-            if dialog.exec() == QDialog.DialogCode.Accepted:
-                self.load_products()  #   
+            product_id = self.products_model.row_id(current_row)  #  ID 
+            dialog = EditProductDialog(self.db, self.executor, self.product_service, product_id)  #   
+            dialog.exec()  #         
         else:
             QMessageBox.warning(self, "No Selection", "Please select a product to edit.")
 
     def add_product(self):
-        dialog = AddProductDialog(self.db)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_products()  #   
+        dialog = AddProductDialog(self.db, self.executor, self.product_service)
+        dialog.exec()  #          
 
     def delete_selected_product(self):
         #   
-        current_row = self.products_table.currentRow()
+        current_row = self.products_table.currentIndex().row()
         if current_row != -1:
-            product_id = self.products_table.item(current_row, 0).text()  #  ID 
+            product_id = self.products_model.row_id(current_row)  #  ID 
             reply = QMessageBox.question(
                 self,
                 "Confirm Delete",
@@ -174,17 +460,43 @@ class ManageProductsDialog(QDialog):
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             if reply == QMessageBox.StandardButton.Yes:
-                self.db.query("DELETE FROM products WHERE id = ?", (product_id,))
-                self.load_products()
+                self.executor.submit(self.product_service.delete_product, product_id,
+                                     on_error=lambda error: QMessageBox.warning(self, "Database Error", str(error)))
         else:
             QMessageBox.warning(self, "No Selection", "Please select a product to delete.")
 
+    def receive_stock(self):
+        #        'receipt'   
+        current_row = self.products_table.currentIndex().row()
+        if current_row == -1:
+            QMessageBox.warning(self, "No Selection", "Please select a product to receive.")
+            return
+        product_id = self.products_model.row_id(current_row)
+        quantity, ok = QInputDialog.getInt(self, "Receive Stock", f"Units of product {product_id} received:", 1, 1, 10 ** 9)
+        if ok:
+            self.executor.submit(self.product_service.receive_stock, product_id, quantity,
+                                 on_error=lambda error: QMessageBox.warning(self, "Database Error", str(error)))
+
+    def show_stock_history(self):
+        current_row = self.products_table.currentIndex().row()
+        if current_row != -1:
+            dialog = StockHistoryDialog(self.db, self.executor, self.products_model.row_id(current_row))
+            dialog.exec()
+        else:
+            QMessageBox.warning(self, "No Selection", "Please select a product to show its stock history.")
 
+    def bulk_edit(self):
+        from ui_products import ProductManager
 
-class AddProductDialog(QDialog):
-    def __init__(self, db):
-        super().__init__()
-        self.db = db
+        dialog = ProductManager(self.db, self.executor, self.product_service)
+        dialog.exec()  #          
+
+
+
+class AddProductDialog(DatabaseDialog):
+    def __init__(self, db, executor, product_service):
+        super().__init__(db, executor)
+        self.product_service = product_service
         self.setWindowTitle("Add Product")
         self.setGeometry(250, 250, 400, 300)
 
@@ -195,10 +507,11 @@ class AddProductDialog(QDialog):
 
         self.product_price_input = QLineEdit()
         self.product_price_input.setPlaceholderText("Price(rubles)")
+        self.product_price_input.setValidator(QDoubleValidator(0, 1e12, 2))
 
         self.product_quantity_input = QLineEdit()
         self.product_quantity_input.setPlaceholderText("Quantity")
-        self.product_quantity_input.setValidator(QIntValidator())
+        self.product_quantity_input.setValidator(QIntValidator(0, 10 ** 9))
 
         self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         self.buttons.accepted.connect(self.accept)
@@ -216,32 +529,33 @@ class AddProductDialog(QDialog):
 
     def accept(self):
         name = self.product_name_input.text()
-        price = self.product_price_input.text()
         quantity = self.product_quantity_input.text()
-
-        if name and price and quantity.isdigit():
-            self.db.query("INSERT INTO products (name, price, quantity) VALUES (?, ?, ?)",
-                          (name, float(price), int(quantity)))
-            super().accept()
+        #       ,     "."
+        try:
+            price = float(self.product_price_input.text().replace(",", "."))
+        except ValueError:
+            price = None
+
+        if name and price is not None and quantity.isdigit():
+            self.run(self.product_service.add_product, name, price, int(quantity), on_result=self.saved)
         else:
             QMessageBox.warning(self, "Input Error", "Please fill in all fields correctly.")
 
-class EditProductDialog(QDialog):
-    def __init__(self, db, product_id):
-        super().__init__()
-        self.db = db
+class EditProductDialog(DatabaseDialog):
+    def __init__(self, db, executor, product_service, product_id):
+        super().__init__(db, executor)
+        self.product_service = product_service
         self.product_id = product_id
+        self.shown_quantity = None
         self.setWindowTitle("Edit Product")
         self.setGeometry(250, 250, 400, 300)
 
         self.layout = QVBoxLayout()
 
-        #      
-        product = self.db.fetch_one("SELECT name, price, quantity FROM products WHERE id = ?", (self.product_id,))
-        
-        self.product_name_input = QLineEdit(product[0])
-        self.product_price_input = QLineEdit(str(product[1]))
-        self.product_quantity_input = QLineEdit(str(product[2]))
+        self.product_name_input = QLineEdit()
+        self.product_name_input.setPlaceholderText("Loading...")
+        self.product_price_input = QLineEdit()
+        self.product_quantity_input = QLineEdit()
         self.product_quantity_input.setValidator(QIntValidator())
 
         self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
@@ -258,42 +572,131 @@ class EditProductDialog(QDialog):
         self.layout.addWidget(self.buttons)
         self.setLayout(self.layout)
 
+        #       (      )
+        self.run(get_catalog(self.db).get, self.product_id, on_result=self.product_loaded)
+
+    def product_loaded(self, product):
+        self.product_name_input.setPlaceholderText("Product Name")
+        if product is None:
+            QMessageBox.warning(self, "Product Error", "Product not found.")
+            self.reject()
+            return
+        self.product_name_input.setText(product.name)
+        self.product_price_input.setText(str(product.price))
+        self.product_quantity_input.setText(str(product.quantity))
+        #        ,
+        #  ,    ,  
+        self.shown_quantity = product.quantity
+
     def accept(self):
         name = self.product_name_input.text()
         price = self.product_price_input.text()
         quantity = self.product_quantity_input.text()
 
         if name and price and quantity.isdigit():
-            self.db.query("UPDATE products SET name = ?, price = ?, quantity = ? WHERE id = ?",
-                          (name, float(price), int(quantity), self.product_id))
-            super().accept()
+            self.run(self.product_service.update_product, self.product_id, name, float(price), int(quantity),
+                     self.shown_quantity, on_result=self.saved)
         else:
             QMessageBox.warning(self, "Input Error", "Please fill in all fields correctly.")
 
-class AddOrderDialog(QDialog):
-    def __init__(self, db):
-        super().__init__()
-        self.db = db
-        self.selected_product_id = None
-        self.selected_quantity = None
-        self.setWindowTitle("Add Order")
-        self.setGeometry(250, 250, 400, 300)
+class CartDialog(DatabaseDialog):
+    #    :    ,    .
+    #      ,    OrderService  
+    def __init__(self, db, executor):
+        super().__init__(db, executor)
+        self.products = {}
+        #  : [id , ]   
+        self.cart = []
+        #    ;      
+        self.cart_changed = False
 
         self.layout = QVBoxLayout()
 
         self.product_combobox = QComboBox()
-        self.products = self.db.fetch_all("SELECT id, name, price FROM products")
-        for product in self.products:
-            self.product_combobox.addItem(product[1], product[0])
+        self.product_combobox.setPlaceholderText("Loading...")
 
         self.quantity_input = QLineEdit()
         self.quantity_input.setValidator(QIntValidator())
         self.quantity_input.setPlaceholderText("Quantity")
 
-        self.layout.addWidget(QLabel("Product:"))
-        self.layout.addWidget(self.product_combobox)
-        self.layout.addWidget(QLabel("Quantity:"))
-        self.layout.addWidget(self.quantity_input)
+        self.add_item_button = QPushButton("Add to Cart")
+        self.add_item_button.clicked.connect(self.add_item)
+
+        self.items_table = QTableWidget(0, 4)
+        self.items_table.setHorizontalHeaderLabels(["Product", "Quantity", "Unit Price(rubles)", "Price(rubles)"])
+        self.items_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.items_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+
+        self.remove_item_button = QPushButton("Remove Selected")
+        self.remove_item_button.clicked.connect(self.remove_item)
+
+        self.total_label = QLabel()
+
+    def add_cart_widgets(self):
+        item_layout = QHBoxLayout()
+        item_layout.addWidget(self.product_combobox, 3)
+        item_layout.addWidget(self.quantity_input, 1)
+        item_layout.addWidget(self.add_item_button)
+        self.layout.addWidget(QLabel("Product and quantity:"))
+        self.layout.addLayout(item_layout)
+        self.layout.addWidget(self.items_table)
+        self.layout.addWidget(self.remove_item_button)
+        self.layout.addWidget(self.total_label)
+        self.show_cart()
+
+    def products_loaded(self, products):
+        self.products = {product.id: product for product in products}
+        super().products_loaded(products)
+        self.show_cart()
+
+    def add_item(self):
+        product_id = self.product_combobox.currentData()
+        quantity = self.quantity_input.text()
+        if product_id is None or not quantity.isdigit() or int(quantity) <= 0:
+            QMessageBox.warning(self, "Input Error", "Please select a product and enter a valid quantity.")
+            return
+        #        
+        for item in self.cart:
+            if item[0] == product_id:
+                item[1] += int(quantity)
+                break
+        else:
+            self.cart.append([product_id, int(quantity)])
+        self.cart_changed = True
+        self.quantity_input.clear()
+        self.show_cart()
+
+    def remove_item(self):
+        rows = sorted({index.row() for index in self.items_table.selectedIndexes()}, reverse=True)
+        for row in rows:
+            del self.cart[row]
+        self.cart_changed = self.cart_changed or bool(rows)
+        self.show_cart()
+
+    def show_cart(self):
+        self.items_table.setRowCount(len(self.cart))
+        total = 0.0
+        for row, (product_id, quantity) in enumerate(self.cart):
+            product = self.products.get(product_id)
+            unit_price = product.price if product is not None and product.price is not None else 0.0
+            total += unit_price * quantity
+            values = [product.name if product is not None else f"Product {product_id}", str(quantity),
+                      "{:.2f}".format(unit_price), "{:.2f}".format(unit_price * quantity)]
+            for column, value in enumerate(values):
+                self.items_table.setItem(row, column, QTableWidgetItem(value))
+        self.items_table.resizeColumnsToContents()
+        self.total_label.setText(f"Items: {len(self.cart)}, total: {total:.2f} rubles")
+
+    def cart_items(self):
+        return [(product_id, quantity) for product_id, quantity in self.cart]
+
+class AddOrderDialog(CartDialog):
+    def __init__(self, db, executor):
+        super().__init__(db, executor)
+        self.setWindowTitle("Add Order")
+        self.setGeometry(250, 250, 500, 450)
+
+        self.add_cart_widgets()
 
         self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
         self.buttons.accepted.connect(self.accept)
@@ -302,50 +705,39 @@ class AddOrderDialog(QDialog):
         self.layout.addWidget(self.buttons)
         self.setLayout(self.layout)
 
-    def accept(self):
-        selected_product = self.product_combobox.currentData()
-        quantity = self.quantity_input.text()
+        self.load_products()
 
-        if selected_product and quantity.isdigit() and int(quantity) > 0:
-            self.selected_product_id = selected_product
-            self.selected_quantity = int(quantity)
-
-            product = self.db.fetch_one("SELECT name, price FROM products WHERE id = ?", (self.selected_product_id,))
-            if product:
-                self.selected_price = product[1]
-                self.selected_order_number = f"ORD-{self.db.fetch_one('SELECT COUNT(*) FROM orders')[0] + 1}"
-                super().accept()
-            else:
-                QMessageBox.warning(self, "Product Error", "Product not found.")
+    def accept(self):
+        #      OrderService  ,     
+        if self.cart:
+            super().accept()
         else:
-            QMessageBox.warning(self, "Input Error", "Please enter a valid quantity.")
-
-class EditOrderDialog(QDialog):
-    def __init__(self, db):
-        super().__init__()
-        self.db = db
+            QMessageBox.warning(self, "Input Error", "Please add at least one product to the order.")
+
+class EditOrderDialog(CartDialog):
+    def __init__(self, db, executor, order_service):
+        super().__init__(db, executor)
+        self.order_service = order_service
+        #  ,     
+        self.loaded_order_number = None
+        #   ,        
+        self.unlinked_lines = 0
         self.setWindowTitle("Edit Order")
-        self.setGeometry(250, 250, 400, 300)
-
-        self.layout = QVBoxLayout()
+        self.setGeometry(250, 250, 500, 500)
 
         self.order_number_input = QLineEdit()
-        self.product_combobox = QComboBox()
-        self.quantity_input = QLineEdit()
+        self.load_order_button = QPushButton("Load")
+        self.load_order_button.clicked.connect(self.load_order)
+        self.order_number_input.returnPressed.connect(self.load_order)
         self.status_combobox = QComboBox()
+        self.status_combobox.addItems(ORDER_STATUSES)
 
-        self.products = self.db.fetch_all("SELECT id, name FROM products")
-        for product in self.products:
-            self.product_combobox.addItem(product[1], product[0])
-
-        self.status_combobox.addItems(["Pending", "Completed", "Shipped", "Cancelled"])
-
+        order_layout = QHBoxLayout()
+        order_layout.addWidget(self.order_number_input)
+        order_layout.addWidget(self.load_order_button)
         self.layout.addWidget(QLabel("Order Number:"))
-        self.layout.addWidget(self.order_number_input)
-        self.layout.addWidget(QLabel("Product:"))
-        self.layout.addWidget(self.product_combobox)
-        self.layout.addWidget(QLabel("Quantity:"))
-        self.layout.addWidget(self.quantity_input)
+        self.layout.addLayout(order_layout)
+        self.add_cart_widgets()
         self.layout.addWidget(QLabel("Status:"))
         self.layout.addWidget(self.status_combobox)
 
@@ -356,25 +748,50 @@ class EditOrderDialog(QDialog):
         self.layout.addWidget(self.buttons)
         self.setLayout(self.layout)
 
+        self.load_products()
+
+    def load_order(self):
+        order_number = self.order_number_input.text().strip()
+        if order_number:
+            self.run(self.order_service.get_order, order_number, on_result=self.order_loaded, error_title="Order Error")
+
+    def order_loaded(self, order):
+        self.loaded_order_number = order.order_number
+        self.cart = [[item.product_id, item.quantity] for item in order.items if item.product_id is not None]
+        self.cart_changed = False
+        self.unlinked_lines = len(order.items) - len(self.cart)
+        self.status_combobox.setCurrentText(order.status or ORDER_STATUSES[0])
+        self.show_cart()
+
     def accept(self):
-        order_number = self.order_number_input.text()
-        product_id = self.product_combobox.currentData()
-        quantity = self.quantity_input.text()
+        order_number = self.order_number_input.text().strip()
         status = self.status_combobox.currentText()
 
-        if order_number and product_id and quantity and status:
-            product = self.db.fetch_one("SELECT price FROM products WHERE id = ?", (product_id,))
-            price = product[0] if product else 0.0
-            self.db.query("UPDATE orders SET order_number = ?, product_name = ?, quantity = ?, price = ?, status = ? WHERE order_number = ?",
-                          (order_number, self.product_combobox.currentText(), int(quantity), price * int(quantity), status, order_number))
-            super().accept()
+        if order_number != self.loaded_order_number:
+            QMessageBox.warning(self, "Input Error", "Please load the order before editing it.")
+        elif not self.cart_changed and status:
+            #   :       
+            self.run(self.order_service.edit_order, order_number, None, status,
+                     on_result=self.saved, error_title="Order Error")
+        elif self.cart and status:
+            if self.unlinked_lines:
+                reply = QMessageBox.question(
+                    self, "Unknown Products",
+                    f"{self.unlinked_lines} lines of this order refer to products that no longer exist "
+                    f"and will be removed. Save the changed order?",
+                    QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+                if reply != QMessageBox.StandardButton.Yes:
+                    return
+            #   ,   OrderService    
+            self.run(self.order_service.edit_order, order_number, self.cart_items(), status,
+                     on_result=self.saved, error_title="Order Error")
         else:
-            QMessageBox.warning(self, "Input Error", "Please fill in all fields.")
+            QMessageBox.warning(self, "Input Error", "Please add at least one product to the order.")
 
-class DeleteOrderDialog(QDialog):
-    def __init__(self, db):
-        super().__init__()
-        self.db = db
+class DeleteOrderDialog(DatabaseDialog):
+    def __init__(self, db, executor, order_service):
+        super().__init__(db, executor)
+        self.order_service = order_service
         self.setWindowTitle("Delete Order")
         self.setGeometry(250, 250, 300, 200)
 
@@ -394,11 +811,260 @@ class DeleteOrderDialog(QDialog):
     def accept(self):
         order_number = self.order_number_input.text()
         if order_number:
-            self.db.query("DELETE FROM orders WHERE order_number = ?", (order_number,))
-            super().accept()
+            self.run(self.order_service.delete_order, order_number, on_result=self.saved, error_title="Order Error")
         else:
             QMessageBox.warning(self, "Input Error", "Please enter a valid order number.")
 
+class StockHistoryDialog(DatabaseDialog):
+    #   ,   ;    
+    #    
+    MOVEMENTS = 500
+
+    def __init__(self, db, executor, product_id):
+        super().__init__(db, executor)
+        from inventory import StockLedger
+
+        self.ledger = StockLedger(db)
+        self.product_id = product_id
+        self.setWindowTitle(f"Stock History: Product {product_id}")
+        self.setGeometry(200, 200, 700, 500)
+
+        self.layout = QVBoxLayout()
+        self.movements_table = QTableWidget(0, 6)
+        self.movements_table.setHorizontalHeaderLabels(["ID", "Time", "Kind", "Quantity", "Order ID", "Note"])
+        self.movements_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.layout.addWidget(self.movements_table)
+
+        balance_layout = QHBoxLayout()
+        self.moment_input = QLineEdit(datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S"))
+        self.moment_input.setPlaceholderText("YYYY-MM-DD HH:MM:SS")
+        balance_layout.addWidget(QLabel("Balance at (UTC):"))
+        balance_layout.addWidget(self.moment_input)
+        self.balance_label = QLabel()
+        balance_layout.addWidget(self.balance_label, 1)
+        self.layout.addLayout(balance_layout)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.balance_button = self.buttons.addButton("Show Balance", QDialogButtonBox.ButtonRole.ActionRole)
+        self.balance_button.clicked.connect(self.load_balance)
+        self.buttons.rejected.connect(self.reject)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+        self.run(self.ledger.movements, product_id, None, self.MOVEMENTS, on_result=self.movements_loaded)
+
+    def movements_loaded(self, movements):
+        self.movements_table.setRowCount(len(movements))
+        for row, movement in enumerate(movements):
+            values = [movement.id, movement.created_at, movement.kind, movement.quantity,
+                      "" if movement.order_id is None else movement.order_id, movement.note or ""]
+            for column, value in enumerate(values):
+                self.movements_table.setItem(row, column, QTableWidgetItem(str(value)))
+        self.movements_table.resizeColumnsToContents()
+
+    def load_balance(self):
+        moment = self.moment_input.text().strip()
+        self.run(self.ledger.balance_at, self.product_id, moment,
+                 on_result=lambda balance: self.balance_label.setText(f"{balance} units"))
+
+
+class ReportsDialog(DatabaseDialog):
+    #    ,     ,
+    #        
+    def __init__(self, db, executor):
+        super().__init__(db, executor)
+        from reports import SalesReports
+
+        self.reports = SalesReports(db)
+        self.setWindowTitle("Reports")
+        self.setGeometry(200, 200, 700, 500)
+
+        self.layout = QVBoxLayout()
+
+        self.totals_label = QLabel("Loading...")
+        self.layout.addWidget(self.totals_label)
+
+        self.tabs = QTabWidget()
+        self.tables = {}
+        sales_headers = ["Orders", "Quantity", "Revenue(rubles)"]
+        for name, title, headers in (("by_product", "By Product", ["Product"] + sales_headers),
+                                     ("by_status", "By Status", ["Status"] + sales_headers),
+                                     ("by_day", "By Day", ["Day"] + sales_headers),
+                                     ("top_sellers", "Top Sellers", ["Product"] + sales_headers),
+                                     ("low_stock", "Low Stock", ["ID", "Product Name", "Quantity"])):
+            table = QTableWidget(0, len(headers))
+            table.setHorizontalHeaderLabels(headers)
+            table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+            self.tables[name] = table
+            self.tabs.addTab(table, title)
+        self.layout.addWidget(self.tabs)
+
+        #       
+        self.layout.addWidget(QLabel("Low stock threshold:"))
+        self.threshold_input = QSpinBox()
+        self.threshold_input.setRange(0, 1000000)
+        self.threshold_input.setValue(5)
+        self.layout.addWidget(self.threshold_input)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.refresh_button = self.buttons.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        self.refresh_button.clicked.connect(self.load_reports)
+        self.buttons.rejected.connect(self.reject)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+        self.load_reports()
+
+    def collect_reports(self, threshold):
+        #    
+        return {
+            "totals": self.reports.totals(),
+            "by_product": self.reports.revenue_by_product(limit=1000),
+            "by_status": self.reports.revenue_by_status(),
+            "by_day": self.reports.revenue_by_day(),
+            "top_sellers": self.reports.top_sellers(),
+            "low_stock": self.reports.low_stock(threshold),
+        }
+
+    def load_reports(self):
+        self.run(self.collect_reports, self.threshold_input.value(), on_result=self.reports_loaded)
+
+    def reports_loaded(self, reports):
+        totals = reports.pop("totals")
+        self.totals_label.setText(f"Orders: {totals.orders}, units sold: {totals.quantity}, "
+                                  f"revenue: {totals.revenue:.2f} rubles (cancelled orders excluded)")
+        for name, rows in reports.items():
+            table = self.tables[name]
+            table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                for column, value in enumerate(values):
+                    #    2   
+                    text = "{:.2f}".format(value) if isinstance(value, float) else str(value)
+                    table.setItem(row, column, QTableWidgetItem(text))
+            table.resizeColumnsToContents()
+
+class DiagnosticsDialog(QDialog):
+    #  :     ,  ,
+    #     ;    
+    STATEMENT_HEADERS = ["Statement", "Calls", "Total(ms)", "Avg(ms)", "p50(ms)", "p99(ms)", "Max(ms)", "Rows", "Full Scan"]
+    WAIT_HEADERS = ["Wait", "Count", "Total(ms)", "p50(ms)", "p99(ms)", "Max(ms)"]
+
+    def __init__(self, db):
+        super().__init__()
+        self.db = db
+        #        
+        self.profiler = db.profiler or db.enable_profiling()
+        self.setWindowTitle("Query Profile")
+        self.setGeometry(150, 150, 1000, 600)
+
+        self.layout = QVBoxLayout()
+        self.summary_label = QLabel()
+        self.layout.addWidget(self.summary_label)
+
+        options = QHBoxLayout()
+        self.full_scans_only_checkbox = QCheckBox("Full scans only")
+        self.full_scans_only_checkbox.toggled.connect(self.refresh)
+        options.addWidget(self.full_scans_only_checkbox)
+        #  (sqlite3.set_trace_callback)    
+        self.trace_checkbox = QCheckBox("Trace statements")
+        self.trace_checkbox.setChecked(db.connections.trace is not None)
+        self.trace_checkbox.toggled.connect(self.toggle_trace)
+        options.addWidget(self.trace_checkbox)
+        options.addStretch()
+        self.layout.addLayout(options)
+
+        self.tabs = QTabWidget()
+        self.statements_table = self.create_table(self.STATEMENT_HEADERS)
+        self.statements_table.itemSelectionChanged.connect(self.show_plan)
+        self.tabs.addTab(self.statements_table, "Statements")
+        self.waits_table = self.create_table(self.WAIT_HEADERS)
+        self.tabs.addTab(self.waits_table, "Lock Waits")
+        self.trace_table = self.create_table(["Time", "Statement"])
+        self.tabs.addTab(self.trace_table, "Trace")
+        self.layout.addWidget(self.tabs)
+
+        #    
+        self.plan_label = QLabel()
+        self.plan_label.setWordWrap(True)
+        self.plan_label.setTextInteractionFlags(Qt.TextInteractionFlag.TextSelectableByMouse)
+        self.layout.addWidget(self.plan_label)
+
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Close)
+        self.refresh_button = self.buttons.addButton("Refresh", QDialogButtonBox.ButtonRole.ActionRole)
+        self.refresh_button.clicked.connect(self.refresh)
+        self.reset_button = self.buttons.addButton("Reset", QDialogButtonBox.ButtonRole.ResetRole)
+        self.reset_button.clicked.connect(self.reset)
+        self.save_button = self.buttons.addButton("Save JSON...", QDialogButtonBox.ButtonRole.ActionRole)
+        self.save_button.clicked.connect(self.save)
+        self.buttons.rejected.connect(self.reject)
+        self.layout.addWidget(self.buttons)
+        self.setLayout(self.layout)
+
+        self.statements = []
+        self.refresh()
+
+    def create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        return table
+
+    def fill_table(self, table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                text = "{:.3f}".format(value) if isinstance(value, float) else str(value)
+                table.setItem(row, column, QTableWidgetItem(text))
+        table.resizeColumnsToContents()
+
+    def refresh(self):
+        #     ,     
+        snapshot = self.profiler.snapshot()
+        self.statements = snapshot["statements"]
+        if self.full_scans_only_checkbox.isChecked():
+            self.statements = [stats for stats in self.statements if stats["full_scans"]]
+        self.summary_label.setText(f"{len(snapshot['statements'])} statements over {snapshot['elapsed_s']:.0f}s, "
+                                   f"{len(snapshot['full_scans'])} with full table scans")
+
+        self.fill_table(self.statements_table, [
+            [stats["sql"][:200], stats["count"], stats["total_ms"], stats["avg_ms"], stats["p50_ms"],
+             stats["p99_ms"], stats["max_ms"], stats["rows"], ", ".join(stats["full_scans"])]
+            for stats in self.statements])
+        self.statements_table.setColumnWidth(0, min(self.statements_table.columnWidth(0), 450))
+        self.fill_table(self.waits_table, [
+            [kind, stats["count"], stats["total_ms"], stats["p50_ms"], stats["p99_ms"], stats["max_ms"]]
+            for kind, stats in snapshot["waits"].items()])
+        self.fill_table(self.trace_table, [
+            [datetime.fromtimestamp(entry["time"]).strftime("%H:%M:%S.%f")[:-3], entry["sql"][:300]]
+            for entry in reversed(snapshot["trace"])])
+        self.plan_label.clear()
+
+    def show_plan(self):
+        rows = self.statements_table.selectionModel().selectedRows()
+        if not rows:
+            self.plan_label.clear()
+            return
+        stats = self.statements[rows[0].row()]
+        plan = "\n".join(stats["plan"] or ["(no plan)"])
+        self.plan_label.setText(f"{stats['sql']}\n\n{plan}")
+
+    def toggle_trace(self, enabled):
+        self.db.set_trace(self.profiler.record_trace if enabled else None)
+
+    def reset(self):
+        self.profiler.reset()
+        self.refresh()
+
+    def save(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Save Query Profile", "query_profile.json", "JSON (*.json)")
+        if path:
+            try:
+                self.profiler.dump(path)
+            except OSError as error:
+                QMessageBox.warning(self, "Save Error", str(error))
+
 if __name__ == '__main__':
     app = QApplication([])
     window = MainApp()
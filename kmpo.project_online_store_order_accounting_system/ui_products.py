@@ -1,80 +1,162 @@
-from PyQt6.QtWidgets import QDialog, QVBoxLayout, QTableWidget, QTableWidgetItem, QPushButton, QLineEdit, QLabel, QFormLayout, QDialogButtonBox
+from PyQt6.QtCore import QTimer
+from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTableView, QAbstractItemView, QPushButton, QLineEdit, QLabel, QDialogButtonBox, QMessageBox, QCheckBox, QInputDialog
+from models import ProductEditorModel
+from ui_main import AddProductDialog
 
 class ProductManager(QDialog):
-    def __init__(self, db):
+    # Bulk catalog editor: cells are edited in place and bulk changes apply to the selected
+    # rows (or to every product matching the filter); nothing is written until Save, which
+    # sends all of it to ProductService.apply_edits as one transaction
+    def __init__(self, db, executor, product_service):
         super().__init__()
         self.db = db
+        self.executor = executor
+        self.product_service = product_service
         self.setWindowTitle("Product Management")
-        self.setGeometry(200, 200, 600, 400)
+        self.setGeometry(200, 200, 800, 600)
 
         self.layout = QVBoxLayout()
 
-        # Table to display products
-        self.product_table = QTableWidget()
-        self.product_table.setColumnCount(3)
-        self.product_table.setHorizontalHeaderLabels(["Name", "Price", "Stock"])
+        # Filter by the start of the name (a range on the name index), applied after a pause in typing
+        self.name_filter_input = QLineEdit()
+        self.name_filter_input.setPlaceholderText("Name starts with")
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(300)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.name_filter_input.textChanged.connect(self.filter_timer.start)
+        self.layout.addWidget(self.name_filter_input)
+
+        # Table to display products; pages are fetched as the table is scrolled
+        self.products_model = ProductEditorModel(self.db, executor=self.executor)
+        self.products_model.edits_changed.connect(self.show_pending)
+        self.product_table = QTableView()
+        self.product_table.setModel(self.products_model)
+        self.product_table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self.product_table.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.product_table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked
+                                           | QAbstractItemView.EditTrigger.EditKeyPressed
+                                           | QAbstractItemView.EditTrigger.AnyKeyPressed)
+        self.layout.addWidget(self.product_table)
+
+        # Bulk changes of the selected products
+        self.all_matching_checkbox = QCheckBox("Apply to all products matching the filter, not only the selected ones")
+        self.layout.addWidget(self.all_matching_checkbox)
+        bulk_layout = QHBoxLayout()
+        for title, handler in (("Set Price...", self.set_price), ("Change Price %...", self.change_price),
+                               ("Set Stock...", self.set_stock), ("Add Stock...", self.add_stock),
+                               ("Delete", self.delete_products)):
+            button = QPushButton(title)
+            button.clicked.connect(handler)
+            bulk_layout.addWidget(button)
+        self.layout.addLayout(bulk_layout)
 
         # Button to add a product
         self.add_product_btn = QPushButton("Add Product")
         self.add_product_btn.clicked.connect(self.add_product)
-
-        # Add widgets to layout
-        self.layout.addWidget(self.product_table)
         self.layout.addWidget(self.add_product_btn)
 
+        # Pending changes and the buttons to save or discard them
+        self.pending_label = QLabel()
+        self.layout.addWidget(self.pending_label)
+        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Save | QDialogButtonBox.StandardButton.Discard
+                                        | QDialogButtonBox.StandardButton.Close)
+        self.buttons.button(QDialogButtonBox.StandardButton.Save).clicked.connect(self.save)
+        self.buttons.button(QDialogButtonBox.StandardButton.Discard).clicked.connect(self.products_model.discard)
+        self.buttons.rejected.connect(self.reject)
+        self.layout.addWidget(self.buttons)
+
         self.setLayout(self.layout)
+        self.show_pending()
         self.load_products()
 
     def load_products(self):
-        products = self.db.fetch_all("SELECT name, price, stock FROM products")
-        self.product_table.setRowCount(len(products))
-        for row_idx, product in enumerate(products):
-            for col_idx, value in enumerate(product):
-                self.product_table.setItem(row_idx, col_idx, QTableWidgetItem(str(value)))
-
-    def add_product(self):
-        # Open the product adding dialog
-        dialog = AddProductDialog(self.db)
-        if dialog.exec() == QDialog.DialogCode.Accepted:
-            self.load_products()  # Reload the product list after adding a new product
-
-class AddProductDialog(QDialog):
-    def __init__(self, db):
-        super().__init__()
-        self.db = db
-        self.setWindowTitle("Add New Product")
-        self.setGeometry(250, 250, 400, 300)
-
-        self.layout = QFormLayout()
-
-        # Fields for product details
-        self.product_name_input = QLineEdit()
-        self.product_price_input = QLineEdit()
-        self.product_stock_input = QLineEdit()
+        self.products_model.reload()
 
-        # Form layout to arrange the input fields
-        self.layout.addRow("Product Name:", self.product_name_input)
-        self.layout.addRow("Price:", self.product_price_input)
-        self.layout.addRow("Stock Quantity:", self.product_stock_input)
+    def apply_filter(self):
+        self.products_model.set_name_prefix(self.name_filter_input.text())
 
-        # Buttons for confirming or cancelling
-        self.buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
-        self.buttons.accepted.connect(self.accept)
-        self.buttons.rejected.connect(self.reject)
-
-        self.layout.addWidget(self.buttons)
-        self.setLayout(self.layout)
-
-    def accept(self):
-        # Get data from inputs
-        name = self.product_name_input.text()
-        price = self.product_price_input.text()
-        stock = self.product_stock_input.text()
-
-        if name and price and stock:
-            # Insert new product into the database
-            self.db.query("INSERT INTO products (name, price, stock) VALUES (?, ?, ?)", (name, float(price), int(stock)))
-            super().accept()
+    def show_pending(self):
+        edited, deleted = self.products_model.pending_count()
+        if self.products_model.saving is not None:
+            self.pending_label.setText("Saving...")
+        elif edited or deleted:
+            self.pending_label.setText(f"{edited} products changed, {deleted} marked for deletion (not saved yet)")
         else:
-            # If fields are empty, show an error message
-            QMessageBox.warning(self, "Input Error", "Please fill in all fields.")
+            self.pending_label.setText("No unsaved changes")
+        self.buttons.button(QDialogButtonBox.StandardButton.Save).setEnabled(bool(edited or deleted))
+        self.buttons.button(QDialogButtonBox.StandardButton.Discard).setEnabled(bool(edited or deleted))
+
+    def with_products(self, action):
+        # Calls action with the ids of the selected products, or of every matching product
+        if self.all_matching_checkbox.isChecked():
+            self.products_model.matching_ids(action)
+            return
+        rows = self.product_table.selectionModel().selectedRows()
+        if not rows:
+            QMessageBox.warning(self, "No Selection", "Please select the products to change.")
+            return
+        action([self.products_model.row_id(index.row()) for index in rows])
+
+    def set_price(self):
+        price, ok = QInputDialog.getDouble(self, "Set Price", "New price (rubles):", 0, 0, 1e12, 2)
+        if ok:
+            self.with_products(lambda product_ids: self.products_model.stage(product_ids, price=price))
+
+    def change_price(self):
+        percent, ok = QInputDialog.getDouble(self, "Change Price", "Change in percent (negative to lower):", 0, -100, 1000, 2)
+        if ok and percent:
+            self.with_products(lambda product_ids: self.products_model.stage(product_ids, percent=percent))
+
+    def set_stock(self):
+        quantity, ok = QInputDialog.getInt(self, "Set Stock", "Units in stock:", 0, 0, 10 ** 9)
+        if ok:
+            self.with_products(lambda product_ids: self.products_model.stage(product_ids, quantity=quantity))
+
+    def add_stock(self):
+        change, ok = QInputDialog.getInt(self, "Add Stock", "Units to add (negative to remove):", 0, -10 ** 9, 10 ** 9)
+        if ok and change:
+            self.with_products(lambda product_ids: self.products_model.stage(product_ids, change=change))
+
+    def delete_products(self):
+        def confirm(product_ids):
+            reply = QMessageBox.question(self, "Confirm Delete",
+                                         f"Mark {len(product_ids)} products for deletion? They are deleted on Save.",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply == QMessageBox.StandardButton.Yes:
+                self.products_model.stage_deletions(product_ids)
+
+        self.with_products(confirm)
+
+    def save(self):
+        edits, deleted_ids = self.products_model.take_pending()
+        if not edits and not deleted_ids:
+            self.products_model.finish_saving(True)
+            return
+
+        def done(result):
+            self.products_model.finish_saving(True)
+            updated, deleted = result
+            self.pending_label.setText(f"Saved: {updated} products changed, {deleted} deleted")
+
+        def failed(error):
+            self.products_model.finish_saving(False)
+            QMessageBox.warning(self, "Save Error", f"Nothing was saved: {error}")
+
+        self.show_pending()
+        self.executor.submit(self.product_service.apply_edits, edits, deleted_ids, on_result=done, on_error=failed)
+
+    def add_product(self):
+        # Open the product adding dialog; the new row reaches the table through the change event
+        dialog = AddProductDialog(self.db, self.executor, self.product_service)
+        dialog.exec()
+
+    def reject(self):
+        if self.products_model.saving is not None:
+            return
+        if any(self.products_model.pending_count()):
+            reply = QMessageBox.question(self, "Unsaved Changes", "Close and discard the unsaved changes?",
+                                         QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No)
+            if reply != QMessageBox.StandardButton.Yes:
+                return
+        super().reject()